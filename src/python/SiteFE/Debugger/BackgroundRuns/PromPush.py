@@ -14,7 +14,8 @@ import traceback
 from prometheus_client import CollectorRegistry, Gauge, Info, push_to_gateway
 from SiteRMLibs.BaseDebugAction import BaseDebugAction
 from SiteRMLibs.GitConfig import getGitConfig
-from SiteRMLibs.MainUtilities import evaldict, getDBConn, getVal, isValFloat
+from SiteRMLibs.MainUtilities import evaldict, getDBConn, getVal
+from SiteRMLibs.SNMPCounters import LABEL_KEYS, getSNMPCounters
 
 
 class PromPush(BaseDebugAction):
@@ -118,32 +119,27 @@ class PromPush(BaseDebugAction):
         self.promLabels["hostname"] = hostname
         for item in snmpData:
             out = evaldict(item.get("output", {}))
-            for key, val in out.items():
-                if key == "macs":
-                    for (
-                        key1,
-                        val1,
-                    ) in val.get("vlans", {}).items():
-                        for index, macaddr in enumerate(val1):
-                            self.snmpLabels["numb"] = index
-                            self.snmpLabels["vlan"] = key1
-                            if self.__filterOutput(
-                                self.requestdict.get("filter", {}).get("mac", {}),
-                                self.snmpLabels,
-                            ):
-                                macState.labels(**self.snmpLabels).info({"macaddress": macaddr})
-                    continue
-                self.promLabels["ifDescr"] = val.get("ifDescr", "")
-                self.promLabels["ifType"] = val.get("ifType", "")
-                self.promLabels["ifAlias"] = val.get("ifAlias", "")
-                for key1 in mibs:
-                    if key1 in val and isValFloat(val[key1]):
-                        self.promLabels["Key"] = key1
-                        if self.__filterOutput(
-                            self.requestdict.get("filter", {}).get("snmp", {}),
-                            self.promLabels,
-                        ):
-                            snmpGauge.labels(**self.promLabels).set(val[key1])
+            for key1, val1 in out.get("macs", {}).get("vlans", {}).items():
+                for index, macaddr in enumerate(val1):
+                    self.snmpLabels["numb"] = index
+                    self.snmpLabels["vlan"] = key1
+                    if self.__filterOutput(
+                        self.requestdict.get("filter", {}).get("mac", {}),
+                        self.snmpLabels,
+                    ):
+                        macState.labels(**self.snmpLabels).info({"macaddress": macaddr})
+        # Interface counters (last values) from SNMP counters store
+        for item in getSNMPCounters(self.dbI, hostname=hostname):
+            if item["metric"] not in mibs:
+                continue
+            for key in LABEL_KEYS:
+                self.promLabels[key] = item["labels"].get(key, "")
+            self.promLabels["Key"] = item["metric"]
+            if self.__filterOutput(
+                self.requestdict.get("filter", {}).get("snmp", {}),
+                self.promLabels,
+            ):
+                snmpGauge.labels(**self.promLabels).set(item["lastvalue"])
         self.__pushToGateway(registry)
         self.logMessage(f"Pushed SNMP data for {hostname}")
         self.jsonout["exitCode"] = 0
@@ -8,22 +8,20 @@ Authors:
 Date: 2021/12/01
 """
 
-import copy
 import os
 import time
 from datetime import datetime, timezone
 
-from rdflib import Graph
-from rdflib.compare import graph_diff, isomorphic
 from SiteFE.LookUpService.modules.deltainfo import DeltaInfo
 from SiteFE.LookUpService.modules.nodeinfo import NodeInfo
+from SiteFE.LookUpService.modules.partitions import ModelPartitions, PartitionGraph
 from SiteFE.LookUpService.modules.rdfhelper import RDFHelper
 from SiteFE.LookUpService.modules.switchinfo import SwitchInfo
 from SiteFE.PolicyService.policyService import PolicyService
 from SiteFE.ProvisioningService.provisioningService import ProvisioningService
 from SiteRMLibs.Backends.main import Switch
 from SiteRMLibs.BWService import BWService
-from SiteRMLibs.CustomExceptions import NoOptionError, NoSectionError
+from SiteRMLibs.CustomExceptions import NoOptionError, NoSectionError, NotFoundError
 from SiteRMLibs.GitConfig import getGitConfig
 from SiteRMLibs.ipaddr import normalizedip
 from SiteRMLibs.MainUtilities import (
@@ -31,8 +29,8 @@ from SiteRMLibs.MainUtilities import (
     externalCommand,
     firstRunCheck,
     generateHash,
+    generateModelDigest,
     getActiveDeltas,
-    getCurrentModel,
     getDBConn,
     getLoggingObject,
     getSiteNameFromConfig,
@@ -41,6 +39,7 @@ from SiteRMLibs.MainUtilities import (
     parseRDFFile,
 )
 from SiteRMLibs.timing import Timing
+from SiteRMLibs.VlanSet import VlanSet
 from SiteRMLibs.Warnings import Warnings
 
 
@@ -148,10 +147,16 @@ class LookUpService(SwitchInfo, NodeInfo, DeltaInfo, RDFHelper, BWService, Timin
         self.firstRun = True
         self._addedTriples = set()
         self.modelDiffCounter = 0
+        self.modelParts = ModelPartitions()
+        self._partitionEffects = None
+        self.partStats = {"rebuilt": 0, "reused": 0}
+        # Digest and triples of last known model (kept in memory for change detection)
+        self.modelState = {"digest": None, "triples": frozenset()}
 
     def __clean(self):
         """Clean params of LookUpService"""
         self._addedTriples = set()
+        self.partStats = {"rebuilt": 0, "reused": 0}
         # Clean errors after 100 cycles
         # pylint: disable=E1101
         self.runcount += 1
@@ -162,10 +167,49 @@ class LookUpService(SwitchInfo, NodeInfo, DeltaInfo, RDFHelper, BWService, Timin
         """Call to refresh thread for this specific class and reset parameters"""
         self.config = getGitConfig()
         self.switch = Switch(self.config, self.sitename)
+        # Config change might change prefixes, port names, metadata. Rebuild all partitions.
+        self.modelParts.reset()
         self.police.refreshthread()
         self.provision.refreshthread()
         self.multiworker.refreshthread()
 
+    def addWarning(self, warning):
+        """Record Alarm (and remember it for partition reuse)."""
+        self._recordEffect("addWarning", warning)
+        super().addWarning(warning)
+
+    def _recordEffect(self, method, *args):
+        """Record side effect of partition build, so it can be replayed if partition is reused."""
+        if self._partitionEffects is not None:
+            self._partitionEffects.append((method,) + args)
+
+    def _buildPartition(self, name, inputs, call, *args):
+        """Build model partition, or reuse it if its inputs did not change.
+        All triples emitted by call are kept in a separate graph and spliced into
+        long-lived model graph.
+        """
+        hashNum = self.modelParts.contentHash(inputs)
+        if self.modelParts.reuse(name, hashNum, self):
+            self.partStats["reused"] += 1
+            return
+        self.newGraph = PartitionGraph()
+        self._addedTriples = set()
+        self._partitionEffects = []
+        try:
+            call(*args)
+            added, removed = self.modelParts.splice(name, hashNum, self.newGraph, self._partitionEffects)
+            self.logger.debug(f"Partition {name} rebuilt. Added triples: {added}, Removed triples: {removed}")
+            self.partStats["rebuilt"] += 1
+        finally:
+            self.newGraph = self.modelParts.graph
+            self._addedTriples = set()
+            self._partitionEffects = None
+
+    def _prunePartitions(self, prefix):
+        """Remove partitions which are not present anymore (host, switch or delta removed)."""
+        for name in self.modelParts.prune(prefix):
+            self.logger.info(f"Partition {name} removed from model")
+
     def _getIPURIs(self, indict, host, iptype):
         """Get All IP URIs if any"""
         if "hasNetworkAddress" in indict and f"{iptype}-address" in indict["hasNetworkAddress"]:
@@ -200,24 +244,39 @@ class LookUpService(SwitchInfo, NodeInfo, DeltaInfo, RDFHelper, BWService, Timin
                             self.URIs["vlans"][host].setdefault(port, {})
                             self.URIs["vlans"][host][port][int(vlan)] = reqDict["uri"]
                             # Add vlan into used vlans list
-                            self.usedVlans["deltas"].setdefault(host, [])
-                            if int(vlan) not in self.usedVlans["deltas"][host]:
-                                self.usedVlans["deltas"][host].append(int(vlan))
+                            self.usedVlans["deltas"].setdefault(host, VlanSet()).add(int(vlan))
                     self._getIPURIs(reqDict, host, "ipv4")
                     self._getIPURIs(reqDict, host, "ipv6")
 
-    def checkForModelDiff(self, saveName):
+    def _getModelDigest(self, model):
+        """Get digest of model stored in DB. Models inserted before digest was recorded are parsed
+        from file once and the digest is written back to the model row."""
+        if model.get("digest"):
+            return model["digest"]
+        try:
+            model["digest"] = generateModelDigest(parseRDFFile(model["fileloc"]).serialize(format="ntriples"))
+        except NotFoundError as ex:
+            self.logger.error(f"Failed to parse model {model['fileloc']}. Error: {ex}")
+            return None
+        self.dbI.update("models", [{"id": model["id"], "digest": model["digest"]}])
+        return model["digest"]
+
+    def checkForModelDiff(self, digest):
         """Check if models are different."""
-        currentModel, currentGraph = getCurrentModel(self, False)
-        if not currentModel or not currentGraph:
-            self.logger.error("Current model or graph is empty. Cannot compare.")
+        currentModel = self.dbI.get("models", orderby=["insertdate", "DESC"], limit=1)
+        if not currentModel:
+            self.logger.error("Current model is empty. Cannot compare.")
             return False, None
-        newGraph = parseRDFFile(saveName)
-        modequal = isomorphic(currentGraph, newGraph)
-        if not modequal:
-            _, removed, added = graph_diff(currentGraph, newGraph)
-            self.logger.info("Model differences detected. Added: %s, Removed: %s", added, removed)
-        return isomorphic(currentGraph, newGraph), currentModel
+        modequal = self._getModelDigest(currentModel[0]) == digest
+        newTriples = frozenset(self.newGraph)
+        if not modequal and self.modelState["digest"] == currentModel[0].get("digest"):
+            # Previous model triples are in memory, diff costs only O(changes)
+            added = newTriples - self.modelState["triples"]
+            removed = self.modelState["triples"] - newTriples
+            self.logger.info(f"Model differences detected. Added: {len(added)}, Removed: {len(removed)}")
+            self.logger.debug(f"Added triples: {added}, Removed triples: {removed}")
+        self.modelState = {"digest": digest, "triples": newTriples}
+        return modequal, currentModel
 
     def getModelSavePath(self):
         """Get Model Save Location."""
@@ -278,6 +337,7 @@ class LookUpService(SwitchInfo, NodeInfo, DeltaInfo, RDFHelper, BWService, Timin
         """Record System IPs."""
         if key not in ["ipv4", "ipv6"]:
             return
+        self._recordEffect("recordSystemIPs", switchName, key, val)
         self.usedIPs["system"].setdefault(switchName, {"ipv4": [], "ipv6": []})
         for item in val:
             if "address" not in item or "masklen" not in item:
@@ -288,15 +348,9 @@ class LookUpService(SwitchInfo, NodeInfo, DeltaInfo, RDFHelper, BWService, Timin
 
     def filterOutAvailbVlans(self, hostname, vlanrange):
         """Filter out available vlans for a hostname."""
-        tmprange = copy.deepcopy(vlanrange)
-        if hostname in self.usedVlans.get("deltas", {}):
-            for vlan in self.usedVlans["deltas"][hostname]:
-                if vlan in tmprange:
-                    tmprange.remove(vlan)
-        if hostname in self.usedVlans.get("system", {}):
-            for vlan in self.usedVlans["system"][hostname]:
-                if vlan in tmprange:
-                    tmprange.remove(vlan)
+        tmprange = VlanSet(vlanrange)
+        tmprange -= self.usedVlans.get("deltas", {}).get(hostname, VlanSet())
+        tmprange -= self.usedVlans.get("system", {}).get(hostname, VlanSet())
         return tmprange
 
     def checkVlansWarnings(self):
@@ -306,10 +360,9 @@ class LookUpService(SwitchInfo, NodeInfo, DeltaInfo, RDFHelper, BWService, Timin
         for host, vlans in self.usedVlans["system"].items():
             if host in self.config.config.get("MAIN", {}):
                 # Means it is a switch (host check remains for Agents itself)
-                all_vlan_range_list = self.config.config.get("MAIN", {}).get(host, {}).get("all_vlan_range_list", [])
-                for vlan in vlans:
-                    if vlan in all_vlan_range_list and vlan not in self.usedVlans["deltas"].get(host, []):
-                        self.addWarning(f"Vlan {vlan} is configured manually on {host}. It comes not from delta.Either deletion did not happen or was manually configured.")
+                all_vlan_range_list = VlanSet(self.config.config.get("MAIN", {}).get(host, {}).get("all_vlan_range_list", []))
+                for vlan in (vlans & all_vlan_range_list) - self.usedVlans["deltas"].get(host, VlanSet()):
+                    self.addWarning(f"Vlan {vlan} is configured manually on {host}. It comes not from delta.Either deletion did not happen or was manually configured.")
         # Add switchwarnings (in case any exists)
         # pylint: disable=E1101
         self.warnings += self.switch.getWarnings()
@@ -348,7 +401,8 @@ class LookUpService(SwitchInfo, NodeInfo, DeltaInfo, RDFHelper, BWService, Timin
         self.usedIPs = {"deltas": {}, "system": {}}  # Reset used IPs.
         for key in ["vsw", "kube", "singleport"]:
             self._getUniqueVlanURIs(key)
-        self.newGraph = Graph()
+        # Model graph is long-lived, and only partitions which inputs changed are re-emitted.
+        self.newGraph = self.modelParts.graph
         # ==================================================================================
         # Define Basic MRML Prefixes
         # ==================================================================================
@@ -356,7 +410,7 @@ class LookUpService(SwitchInfo, NodeInfo, DeltaInfo, RDFHelper, BWService, Timin
         # ==================================================================================
         # Define Topology Site
         # ==================================================================================
-        self.defineTopology()
+        self._buildPartition("topology", [self.prefixes], self.defineTopology)
         self.hosts = {}
         # ==================================================================================
         # Define Node inside yaml
@@ -377,23 +431,28 @@ class LookUpService(SwitchInfo, NodeInfo, DeltaInfo, RDFHelper, BWService, Timin
         self.logger.info(f"Used vlans: {self.usedVlans}")
         # ==================================================================================
         # Start Policy Service and apply any changes (if any)
+        # PolicyService records activating deltas in an overlay, long-lived model graph is not modified.
         # ==================================================================================
-        changesApplied = self.police.startworklookup(self.newGraph, self.usedIPs, self.usedVlans)
+        usedVlans = {key: {host: vlans.toList() for host, vlans in vals.items()} for key, vals in self.usedVlans.items()}
+        changesApplied = self.police.startworklookup(self.newGraph, self.usedIPs, usedVlans)
         self.logger.info(f"Changes there recorded in db: {changesApplied}")
         self.activeDeltas = getActiveDeltas(self)
         self.addDeltaInfo()
+        self.logger.info(f"Model partitions rebuilt: {self.partStats['rebuilt']}, reused: {self.partStats['reused']}")
 
         saveName = self.getModelSavePath()
         self.saveModel(saveName, onlymaster=True)
         serialized = self.newGraph.serialize(format="ntriples")
         hashNum = generateHash(serialized)
+        digest = generateModelDigest(serialized)
 
         self.logger.info("Checking if new model is different from previous")
-        modelsEqual, modelinDB = self.checkForModelDiff(saveName)
+        modelsEqual, modelinDB = self.checkForModelDiff(digest)
         lastKnownModel = {
             "uid": hashNum,
             "insertdate": getUTCnow(),
             "fileloc": saveName,
+            "digest": digest,
         }
         updateNeeded = False
         if modelsEqual:
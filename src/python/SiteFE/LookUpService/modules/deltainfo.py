@@ -173,6 +173,11 @@ class DeltaInfo:
                 )
                 self._addParams(ipdict, ipdict.get("uri", ""), True)
 
+    def _recordVlanURI(self, hostname, port, vlan, uri):
+        """Record vlan uri (if not yet known) for host port"""
+        self._recordEffect("_recordVlanURI", hostname, port, vlan, uri)
+        self.URIs["vlans"].setdefault(hostname, {}).setdefault(port, {}).setdefault(int(vlan), uri)
+
     def addvswInfo(self, vswDict, uri):
         """Add vsw Info from params"""
         self._addParams(vswDict, uri)
@@ -185,7 +190,7 @@ class DeltaInfo:
                 if portDict.get("hasLabel", {}).get("labeltype", None) == "ethernet#vlan":
                     vlan = str(portDict["hasLabel"]["value"])
                     if "uri" in portDict and self.checkIfStarted(portDict):
-                        self.URIs["vlans"].setdefault(key, {}).setdefault(port, {}).setdefault(int(vlan), portDict["uri"])
+                        self._recordVlanURI(key, port, vlan, portDict["uri"])
                     portDict["uri"] = self._addVlanPort(
                         hostname=key,
                         portName=port,
@@ -271,24 +276,57 @@ class DeltaInfo:
                                 }
                                 self._addRouteEntry(**netadd)
 
+    def __deltaPartitionInputs(self, *deltaDicts):
+        """Get all inputs which define delta partition content"""
+        hostnames = set()
+        for deltaDict in deltaDicts:
+            for key, val in deltaDict.items():
+                if key != "_params" and isinstance(val, dict):
+                    hostnames.add(key)
+        return [
+            deltaDicts,
+            {hostname: self.URIs["vlans"].get(hostname, {}) for hostname in sorted(hostnames)},
+            self.URIs["ips"],
+            sorted(self.switch.switches["output"].keys()),
+        ]
+
+    def __addVswPartition(self, host, subnet, vswDict):
+        """Add Virtual Switching delta to model partition"""
+        svcService = self._addSwitchingService(hostname=host, vsw=host)
+        subnetUri = subnet.split(svcService)[1]
+        uri = self._addSwitchingSubnet(hostname=host, vsw=host, subnet=subnetUri)
+        self.addvswInfo(vswDict, uri)
+
+    def __addRoutingPartition(self):
+        """Add Routing Service deltas to model partition"""
+        self.addRouteTables()
+        self.addRoutes()
+
     def addDeltaInfo(self):
         """Append all deltas to Model."""
+        output = self.activeDeltas.get("output", {})
         # Virtual Switching Info
-        for host, vals in self.activeDeltas.get("output", {}).get("SubnetMapping", {}).items():
+        for host, vals in output.get("SubnetMapping", {}).items():
             for subnet in vals.get("providesSubnet", {}).keys():
-                svcService = self._addSwitchingService(hostname=host, vsw=host)
-                subnetUri = subnet.split(svcService)[1]
-                uri = self._addSwitchingSubnet(hostname=host, vsw=host, subnet=subnetUri)
-                self.addvswInfo(
-                    self.activeDeltas.get("output", {}).get("vsw", {}).get(subnet, {}),
-                    uri,
+                vswDict = output.get("vsw", {}).get(subnet, {})
+                self._buildPartition(
+                    f"delta:vsw:{host}:{subnet}",
+                    self.__deltaPartitionInputs(vswDict),
+                    self.__addVswPartition,
+                    host,
+                    subnet,
+                    vswDict,
                 )
         # Add Kube Info (for hosts without vsw)
-        for urn, vals in self.activeDeltas.get("output", {}).get("kube", {}).items():
-            self.addvswInfo(vals, urn)
+        for urn, vals in output.get("kube", {}).items():
+            self._buildPartition(f"delta:kube:{urn}", self.__deltaPartitionInputs(vals), self.addvswInfo, vals, urn)
         # Add Single port info
-        for urn, vals in self.activeDeltas.get("output", {}).get("singleport", {}).items():
-            self.addvswInfo(vals, urn)
+        for urn, vals in output.get("singleport", {}).items():
+            self._buildPartition(f"delta:singleport:{urn}", self.__deltaPartitionInputs(vals), self.addvswInfo, vals, urn)
         # Routing Service Info
-        self.addRouteTables()
-        self.addRoutes()
+        self._buildPartition(
+            "delta:rst",
+            self.__deltaPartitionInputs(output.get("RoutingMapping", {}), output.get("rst", {})),
+            self.__addRoutingPartition,
+        )
+        self._prunePartitions("delta:")
@@ -12,6 +12,7 @@ Date: 2021/12/01
 
 from SiteRMLibs.CustomExceptions import NoOptionError
 from SiteRMLibs.MainUtilities import getAllHosts, getFileContentAsJson, strtolist
+from SiteRMLibs.VlanSet import VlanSet
 
 
 def ignoreInterface(intfKey, intfDict, hostinfo):
@@ -54,9 +55,32 @@ class NodeInfo:
                     vlanid = vlanDict.get("vlanid", None)
                     if vlanid is None:
                         continue
-                    self.usedVlans["system"].setdefault(nodeDict["hostname"], [])
-                    if vlanid not in self.usedVlans["system"][nodeDict["hostname"]]:
-                        self.usedVlans["system"][nodeDict["hostname"]].append(vlanid)
+                    self.usedVlans["system"].setdefault(nodeDict["hostname"], VlanSet()).add(vlanid)
+
+    def __hostPartitionInputs(self, nodeDict):
+        """Get all inputs which define host partition content (dates excluded)"""
+        hostname = nodeDict["hostname"]
+        hostinfo = {key: val for key, val in nodeDict["hostinfo"].items() if key not in ["insertdate", "updatedate"]}
+        return [
+            hostname,
+            hostinfo,
+            str(self.usedVlans["deltas"].get(hostname, VlanSet())),
+            str(self.usedVlans["system"].get(hostname, VlanSet())),
+            self.usedIPs["deltas"].get(hostname, {}),
+            self.URIs["vlans"].get(hostname, {}),
+            self.URIs["ips"],
+        ]
+
+    def __addHostPartition(self, nodeDict):
+        """Add all Host information to model partition"""
+        # ==================================================================================
+        # General Node Information
+        # ==================================================================================
+        self.defineNodeInformation(nodeDict)
+        # ==================================================================================
+        # Define Host Information and all it's interfaces.
+        # ==================================================================================
+        self.defineHostInfo(nodeDict, nodeDict["hostinfo"])
 
     def addNodeInfo(self):
         """Add Agent Node Information"""
@@ -68,13 +92,15 @@ class NodeInfo:
             # ==================================================================================
             self.__recordHostUsedVlans(nodeDict)
             # ==================================================================================
-            # General Node Information
-            # ==================================================================================
-            self.defineNodeInformation(nodeDict)
+            # Node partition (rebuilt only if host information changed)
             # ==================================================================================
-            # Define Host Information and all it's interfaces.
-            # ==================================================================================
-            self.defineHostInfo(nodeDict, nodeDict["hostinfo"])
+            self._buildPartition(
+                f"host:{nodeDict['hostname']}",
+                self.__hostPartitionInputs(nodeDict),
+                self.__addHostPartition,
+                nodeDict,
+            )
+        self._prunePartitions("host:")
 
     def addIntfInfo(self, hostname, inputDict, prefixuri):
         """This will add all information about specific interface."""
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# pylint: disable=line-too-long
+"""
+    Model partitions. Keeps a long-lived MRML graph which is assembled
+    from independent partitions (topology, each host, each switch, each delta).
+    Each partition is keyed by a content hash of its inputs, so only partitions
+    whose inputs changed are re-emitted and spliced into the graph.
+    Values written with Graph.set are single valued: if several partitions set
+    the same (subject, predicate), the partition built last in the cycle wins
+    (same as when all partitions were written into one graph).
+
+Authors:
+  Justas Balcas jbalcas (at) es (dot) net
+
+Date: 2026/10/17
+"""
+
+import simplejson as json
+from rdflib import Graph
+from SiteRMLibs.MainUtilities import generateMD5
+
+
+class PartitionGraph(Graph):
+    """Graph of one partition, which remembers (subject, predicate) pairs written with set."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.setPairs = set()
+
+    def set(self, triple):
+        """Set single value of (subject, predicate) and remember the pair."""
+        self.setPairs.add((triple[0], triple[1]))
+        return super().set(triple)
+
+
+class ModelPartitions:
+    """Long-lived graph assembled from content hashed partitions."""
+
+    def __init__(self):
+        self.graph = Graph()
+        self.partitions = {}
+        self.refcount = {}
+        self.touched = set()
+        # Single valued (subject, predicate) pairs: owners (partitions which set it),
+        # build order of partitions and triples hidden by partition built later.
+        self.setowners = {}
+        self.order = {}
+        self.counter = 0
+        self.hidden = set()
+
+    def reset(self):
+        """Drop all partitions and start with an empty graph."""
+        self.__init__()
+
+    @staticmethod
+    def contentHash(inputs):
+        """Generate stable hash of partition inputs."""
+        return generateMD5(json.dumps(inputs, sort_keys=True, default=str))
+
+    def isCurrent(self, name, hashNum):
+        """Check if partition exists and was built from the same inputs."""
+        if name in self.partitions and self.partitions[name]["hash"] == hashNum:
+            self.touched.add(name)
+            self._resolve(name)
+            return True
+        return False
+
+    def getEffects(self, name):
+        """Get side effects recorded while partition was built."""
+        return self.partitions.get(name, {}).get("effects", [])
+
+    def reuse(self, name, hashNum, target):
+        """Reuse partition if it was built from the same inputs: side effects recorded
+        while it was built are replayed on target (method name and arguments)."""
+        if not self.isCurrent(name, hashNum):
+            return False
+        for effect in self.getEffects(name):
+            getattr(target, effect[0])(*effect[1:])
+        return True
+
+    def _retain(self, triple):
+        """Add triple to graph (if first partition to emit it)."""
+        if triple not in self.refcount:
+            self.refcount[triple] = 0
+            if triple not in self.hidden:
+                self.graph.add(triple)
+        self.refcount[triple] += 1
+
+    def _release(self, triple):
+        """Remove triple from graph (if last partition which emitted it)."""
+        self.refcount[triple] -= 1
+        if self.refcount[triple] <= 0:
+            del self.refcount[triple]
+            self.hidden.discard(triple)
+            self.graph.remove(triple)
+
+    def _show(self, triple):
+        """Show previously hidden triple"""
+        if triple in self.hidden:
+            self.hidden.discard(triple)
+            if triple in self.refcount:
+                self.graph.add(triple)
+
+    def _hide(self, triple):
+        """Hide triple (value of single valued pair set by partition built later)"""
+        if triple not in self.hidden and triple in self.refcount:
+            self.hidden.add(triple)
+            self.graph.remove(triple)
+
+    def _resolve(self, name):
+        """Partition was built (or reused) last, so all its triples are visible
+        and it wins over other partitions for pairs it set."""
+        self.counter += 1
+        self.order[name] = self.counter
+        partition = self.partitions[name]
+        for triple in self.hidden & partition["triples"]:
+            self._show(triple)
+        for pair, objs in partition["setvalues"].items():
+            for other in self.setowners.get(pair, set()) - {name}:
+                for obj in self.partitions[other]["setvalues"][pair] - objs:
+                    self._hide((pair[0], pair[1], obj))
+
+    def _disown(self, name, pairs):
+        """Remove partition as owner of pairs. Partition built last of remaining owners wins."""
+        for pair in pairs:
+            owners = self.setowners.get(pair, set())
+            owners.discard(name)
+            if not owners:
+                self.setowners.pop(pair, None)
+                continue
+            winner = max(owners, key=lambda owner: self.order.get(owner, 0))
+            for obj in self.partitions[winner]["setvalues"][pair]:
+                self._show((pair[0], pair[1], obj))
+
+    def splice(self, name, hashNum, partGraph, effects=None):
+        """Replace partition triples inside long-lived graph. Returns (added, removed) counts."""
+        newTriples = frozenset(partGraph)
+        setPairs = getattr(partGraph, "setPairs", set())
+        setvalues = {pair: set() for pair in setPairs}
+        for triple in newTriples:
+            if (triple[0], triple[1]) in setvalues:
+                setvalues[(triple[0], triple[1])].add(triple[2])
+        oldPartition = self.partitions.get(name, {})
+        oldTriples = oldPartition.get("triples", frozenset())
+        removed = oldTriples - newTriples
+        added = newTriples - oldTriples
+        for triple in removed:
+            self._release(triple)
+        for triple in added:
+            self._retain(triple)
+        self.partitions[name] = {
+            "hash": hashNum,
+            "triples": newTriples,
+            "effects": effects or [],
+            "setvalues": {pair: frozenset(objs) for pair, objs in setvalues.items()},
+        }
+        self._disown(name, set(oldPartition.get("setvalues", {})) - setPairs)
+        for pair in setPairs:
+            self.setowners.setdefault(pair, set()).add(name)
+        self.touched.add(name)
+        self._resolve(name)
+        return len(added), len(removed)
+
+    def drop(self, name):
+        """Remove partition and all its triples from graph."""
+        partition = self.partitions.pop(name, None)
+        if not partition:
+            return
+        for triple in partition["triples"]:
+            self._release(triple)
+        self._disown(name, partition["setvalues"])
+        self.order.pop(name, None)
+
+    def prune(self, prefix):
+        """Drop partitions under prefix which were not built or reused since last prune."""
+        dropped = [name for name in self.partitions if name.startswith(prefix) and name not in self.touched]
+        for name in dropped:
+            self.drop(name)
+        self.touched = {name for name in self.touched if not name.startswith(prefix)}
+        return dropped
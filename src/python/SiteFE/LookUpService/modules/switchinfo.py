@@ -13,6 +13,7 @@ Date: 2021/12/01
 from SiteRMLibs.CustomExceptions import NoOptionError, NoSectionError
 from SiteRMLibs.ipaddr import validMRMLName
 from SiteRMLibs.MainUtilities import strtolist
+from SiteRMLibs.VlanSet import VlanSet
 
 
 class SwitchInfo:
@@ -291,8 +292,39 @@ class SwitchInfo:
             for _portName, portSwitch in list(switchDict.items()):
                 vlanid = portSwitch.get("value", None)
                 if vlanid:
-                    self.usedVlans["system"].setdefault(switchName, [])
-                    self.usedVlans["system"][switchName].append(int(vlanid))
+                    self.usedVlans["system"].setdefault(switchName, VlanSet()).add(int(vlanid))
+
+    @staticmethod
+    def __sliceSwitchInfo(switchInfo, switchName):
+        """Get switch information only for a single switch"""
+        out = {"nametomac": switchInfo.get("nametomac", {})}
+        for key in ["ports", "vlans", "lldp", "routes"]:
+            out[key] = {}
+            if switchName in switchInfo.get(key, {}):
+                out[key][switchName] = switchInfo[key][switchName]
+        return out
+
+    def __switchPartitionInputs(self, switchName, switchPart):
+        """Get all inputs which define switch partition content"""
+        # Bandwidth service parameters depend on active delta reservations on the switch
+        vswDeltas = {uri: vals[switchName] for uri, vals in self.activeDeltas.get("output", {}).get("vsw", {}).items() if switchName in vals}
+        return [
+            switchName,
+            switchPart,
+            str(self.usedVlans["deltas"].get(switchName, VlanSet())),
+            str(self.usedVlans["system"].get(switchName, VlanSet())),
+            self.usedIPs["deltas"].get(switchName, {}),
+            self.URIs["vlans"].get(switchName, {}),
+            self.URIs["ips"],
+            vswDeltas,
+        ]
+
+    def __addSwitchPartition(self, switchPart):
+        """Add all Switch information to model partition"""
+        self._addSwitchPortInfo("ports", switchPart)
+        self._addSwitchVlanInfo("vlans", switchPart)
+        self._addSwitchLldpInfo(switchPart)
+        self._addSwitchRoutes(switchPart)
 
     def addSwitchInfo(self):
         """Add All Switch information from switch Backends plugin."""
@@ -300,7 +332,15 @@ class SwitchInfo:
         switchInfo = self.switch.getinfo()
         # Add Switch information to
         self.__recordSwitchUsedVlans(switchInfo)
-        self._addSwitchPortInfo("ports", switchInfo)
-        self._addSwitchVlanInfo("vlans", switchInfo)
-        self._addSwitchLldpInfo(switchInfo)
-        self._addSwitchRoutes(switchInfo)
+        switchNames = set()
+        for key in ["ports", "vlans", "lldp", "routes"]:
+            switchNames.update(switchInfo.get(key, {}).keys())
+        for switchName in sorted(switchNames):
+            switchPart = self.__sliceSwitchInfo(switchInfo, switchName)
+            self._buildPartition(
+                f"switch:{switchName}",
+                self.__switchPartitionInputs(switchName, switchPart),
+                self.__addSwitchPartition,
+                switchPart,
+            )
+        self._prunePartitions("switch:")
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""Conflict index of active configuration
+
+Index is built once from active (old) configuration and used by
+ConflictChecker to find only resources which can conflict with new
+request (same vlan on host, overlapping IP prefix, same port), instead
+of comparing new request against every active delta.
+
+Authors:
+  Justas Balcas jbalcas (at) es (dot) net
+
+Date: 2026/10/17
+"""
+
+from bisect import bisect_left, bisect_right
+from ipaddress import IPv4Network, IPv6Network
+
+
+def _normalize_ip(ip):
+    """Normalize IP to list"""
+    if ip is None:
+        return []
+    if isinstance(ip, (list, tuple, set)):
+        return list(ip)
+    return [ip]
+
+
+class PrefixIndex:
+    """Index of IP networks. Finds all networks which contain or are contained in a given network."""
+
+    def __init__(self, iptype):
+        self.netclass = IPv4Network if iptype == "ipv4" else IPv6Network
+        self.maxlen = 32 if iptype == "ipv4" else 128
+        # (prefixlen, network address) -> [payload]. Walk over present prefix lengths is a trie path lookup.
+        self.prefixes = {}
+        self.prefixlens = set()
+        # Sorted (start, end, prefixlen, payload id) for lookup of networks contained in a given network
+        self.ranges = []
+        self.starts = []
+        self.payloads = []
+        self._sorted = True
+
+    def parse(self, ipval):
+        """Parse network. Returns None if not valid network for this ip type."""
+        try:
+            return self.netclass(ipval, False)
+        except ValueError:
+            return None
+
+    def add(self, ipval, payload):
+        """Add network with payload to index."""
+        net = self.parse(ipval)
+        if not net:
+            return
+        self.prefixes.setdefault((net.prefixlen, int(net.network_address)), []).append(payload)
+        self.prefixlens.add(net.prefixlen)
+        self.ranges.append((int(net.network_address), int(net.broadcast_address), net.prefixlen, len(self.payloads)))
+        self.payloads.append(payload)
+        self._sorted = False
+
+    def overlapping(self, ipval):
+        """Get payloads of all networks which overlap (contain or are contained in) ipval."""
+        net = self.parse(ipval)
+        if not net:
+            return []
+        if not self._sorted:
+            self.ranges.sort()
+            self.starts = [item[0] for item in self.ranges]
+            self._sorted = True
+        out = []
+        netint = int(net.network_address)
+        # Networks which contain ipval (or are equal to it)
+        for prefixlen in self.prefixlens:
+            if prefixlen > net.prefixlen:
+                continue
+            mask = ((1 << prefixlen) - 1) << (self.maxlen - prefixlen)
+            out.extend(self.prefixes.get((prefixlen, netint & mask), []))
+        # Networks contained in ipval
+        for idx in range(bisect_left(self.starts, netint), bisect_right(self.starts, int(net.broadcast_address))):
+            if self.ranges[idx][2] > net.prefixlen:
+                out.append(self.payloads[self.ranges[idx][3]])
+        return out
+
+
+class ConflictIndex:
+    """Index of active configuration resources used for conflict checks."""
+
+    def __init__(self, checker, oldConfig):
+        self.checker = checker
+        self.windows = {}
+        # hostname -> {vlan: [(svcitem, oldID)]}
+        self.vlans = {}
+        # (hostname, iptype) -> PrefixIndex with payload (svcitem, oldID, ip)
+        self.ips = {}
+        # (hostname, interface) -> [(svcitem, oldID, bandwidth)]
+        self.bandwidth = {}
+        # (hostname, iptype, key) -> PrefixIndex with payload (svcitem, oldID, rststats)
+        self.rst = {}
+        self.items = {}
+        for svcitem in ["vsw", "singleport", "kube"]:
+            for oldID, oldItems in oldConfig.get(svcitem, {}).items():
+                self._addSvcItem(svcitem, oldID, oldItems)
+        for oldID, oldItems in oldConfig.get("rst", {}).items():
+            self._addRSTItem("rst", oldID, oldItems)
+
+    def _getPrefixIndex(self, store, key, iptype):
+        """Get (or create) prefix index"""
+        if key not in store:
+            store[key] = PrefixIndex(iptype)
+        return store[key]
+
+    def _addSvcItem(self, svcitem, oldID, oldItems):
+        """Add vsw, singleport, kube item to index"""
+        if not isinstance(oldItems, dict):
+            return
+        self.items[(svcitem, oldID)] = oldItems
+        for oldHost, oldHostItems in oldItems.items():
+            if oldHost == "_params" or not isinstance(oldHostItems, dict):
+                continue
+            for item in self.checker._getVlanIPs(oldHostItems, bwstats=True):
+                self.vlans.setdefault(oldHost, {}).setdefault(item["vlan"], []).append((svcitem, oldID))
+                for iptype in ["ipv4", "ipv6"]:
+                    for ipval in _normalize_ip(item.get(f"{iptype}-address", "")):
+                        self._getPrefixIndex(self.ips, (oldHost, iptype), iptype).add(ipval, (svcitem, oldID, ipval))
+                if "bandwidth" in item:
+                    self.bandwidth.setdefault((oldHost, item["interface"]), []).append((svcitem, oldID, item["bandwidth"]))
+
+    def _addRSTItem(self, svcitem, oldID, oldItems):
+        """Add rst item to index"""
+        if not isinstance(oldItems, dict):
+            return
+        self.items[(svcitem, oldID)] = oldItems
+        for oldHost, oldHostItems in oldItems.items():
+            if oldHost == "_params" or not isinstance(oldHostItems, dict):
+                continue
+            oStats = self.checker._getRSTIPs(oldHostItems)
+            for iptype, ipstats in oStats.items():
+                for key in ["nextHop", "routeFrom"]:
+                    for ipval in _normalize_ip(ipstats.get(key, "")):
+                        self._getPrefixIndex(self.rst, (oldHost, iptype, key), iptype).add(ipval, (svcitem, oldID, ipstats))
+
+    def timeOverlap(self, connItems, svcitem, oldID):
+        """Check if old item overlaps in time with new request"""
+        if (svcitem, oldID) not in self.windows:
+            self.windows[(svcitem, oldID)] = self.checker.getTimeRanges(self.items[(svcitem, oldID)])
+        return self.checker._overlap_count(self.checker.getTimeRanges(connItems), self.windows[(svcitem, oldID)]) > 0
+
+    def vlanUsers(self, hostname, vlan):
+        """Get all (svcitem, oldID) which use vlan on the host"""
+        return self.vlans.get(hostname, {}).get(vlan, [])
+
+    def ipUsers(self, hostname, iptype, ipval):
+        """Get all (svcitem, oldID, ip) with IP overlapping ipval on the host"""
+        if (hostname, iptype) not in self.ips:
+            return []
+        out = []
+        for ipitem in _normalize_ip(ipval):
+            out.extend(self.ips[(hostname, iptype)].overlapping(ipitem))
+        return out
+
+    def portBandwidth(self, hostname, portName):
+        """Get all (svcitem, oldID, bandwidth) on host port"""
+        return self.bandwidth.get((hostname, portName), [])
+
+    def rstUsers(self, hostname, iptype, key, ipval):
+        """Get all (svcitem, oldID, rststats) with route key (nextHop, routeFrom) overlapping ipval on the host"""
+        if (hostname, iptype, key) not in self.rst:
+            return []
+        out = []
+        for ipitem in _normalize_ip(ipval):
+            out.extend(self.rst[(hostname, iptype, key)].overlapping(ipitem))
+        return out
@@ -12,6 +12,7 @@ import itertools
 from pprint import pprint
 
 from deepdiff import DeepDiff
+from SiteFE.PolicyService.conflictindex import ConflictIndex, _normalize_ip
 from SiteRMLibs.BWService import BWService
 from SiteRMLibs.CustomExceptions import (
     NoOptionError,
@@ -27,15 +28,6 @@ from SiteRMLibs.MainUtilities import getLoggingObject, getUTCnow
 from SiteRMLibs.timing import Timing
 
 
-def _normalize_ip(ip):
-    """Normalize IP to list"""
-    if ip is None:
-        return []
-    if isinstance(ip, (list, tuple, set)):
-        return list(ip)
-    return [ip]
-
-
 class ConflictChecker(Timing, BWService):
     """Conflict Checker"""
 
@@ -47,6 +39,13 @@ class ConflictChecker(Timing, BWService):
         self.oldid = ""
         self.logger.info("Conflict Checker initialized")
         self.checkmethod = ""
+        self.index = None
+
+    def _getIndex(self, oldConfig):
+        """Get conflict index of old config (built once per conflict check)"""
+        if self.index is None:
+            self.index = ConflictIndex(self, oldConfig)
+        return self.index
 
     @staticmethod
     def checkOverlap(inrange, ipval, iptype):
@@ -287,24 +286,16 @@ class ConflictChecker(Timing, BWService):
     def _bwOverlapCalculation(self, hostname, portName, connItems, oldConfig):
         """Calculate overlapping bandwidth used on device port"""
         usedBW = 0
-        for svcitem in ["vsw", "singleport", "kube"]:
-            for oldID, oldItems in oldConfig.get(svcitem, {}).items():
-                # connID == oldID was checked in step3. Skipping it
-                if oldID == self.newid:
-                    continue
-                self.oldid = oldID
-                if self._checkIfOverlap(connItems, oldItems):
-                    # If 2 items overlap, and have same host for config
-                    # Check that vlans and IPs are not overlapping
-                    for oldHost, oldHostItems in oldItems.items():
-                        if hostname != oldHost:
-                            continue
-                        for item in self._getVlanIPs(oldHostItems, bwstats=True):
-                            if portName != item.get("interface", ""):
-                                continue
-                            if "bandwidth" in item:
-                                usedBW += item["bandwidth"]
-                            self.logger.debug(f"Used BW on {hostname} {portName} by {self.oldid}: {item['bandwidth']} Mbps")
+        index = self._getIndex(oldConfig)
+        for svcitem, oldID, bandwidth in index.portBandwidth(hostname, portName):
+            # connID == oldID was checked in step3. Skipping it
+            if oldID == self.newid:
+                continue
+            self.oldid = oldID
+            # If 2 items overlap in time, count bandwidth used on the same port
+            if index.timeOverlap(connItems, svcitem, oldID):
+                usedBW += bandwidth
+                self.logger.debug(f"Used BW on {hostname} {portName} by {self.oldid}: {bandwidth} Mbps")
         self.logger.info(f"Total used BW on {hostname} {portName}: {usedBW} Mbps")
         return usedBW
 
@@ -394,31 +385,24 @@ class ConflictChecker(Timing, BWService):
 
     def _checkIPOverlaps(self, nStats, connItems, hostname, oldConfig):
         """Check if IP Overlaps"""
-        for svcitem in ["vsw", "singleport", "kube"]:
-            for oldID, oldItems in oldConfig.get(svcitem, {}).items():
+        index = self._getIndex(oldConfig)
+        # Only items which use same vlan or overlapping IPs on the same host are checked
+        # If 2 items also overlap in time - raise error
+        if nStats.get("vlan", None):
+            for svcitem, oldID in index.vlanUsers(hostname, nStats["vlan"]):
                 # connID == oldID was checked in step3. Skipping it
                 if oldID == self.newid:
                     continue
                 self.oldid = oldID
-                # Check if 2 items overlap
-                if self._checkIfOverlap(connItems, oldItems):
-                    # If 2 items overlap, and have same host for config
-                    # Check that vlans and IPs are not overlapping
-                    for oldHost, oldHostItems in oldItems.items():
-                        if hostname != oldHost:
-                            continue
-                        for item in self._getVlanIPs(oldHostItems):
-                            self._checkIfVlanOverlap(nStats, item)
-                            self._checkIfIPOverlap(
-                                nStats.get("ipv6-address", ""),
-                                item.get("ipv6-address", ""),
-                                "ipv6",
-                            )
-                            self._checkIfIPOverlap(
-                                nStats.get("ipv4-address", ""),
-                                item.get("ipv4-address", ""),
-                                "ipv4",
-                            )
+                if index.timeOverlap(connItems, svcitem, oldID):
+                    self._checkIfVlanOverlap(nStats, {"vlan": nStats["vlan"]})
+        for iptype in ["ipv6", "ipv4"]:
+            for svcitem, oldID, ipval in index.ipUsers(hostname, iptype, nStats.get(f"{iptype}-address", "")):
+                if oldID == self.newid:
+                    continue
+                self.oldid = oldID
+                if index.timeOverlap(connItems, svcitem, oldID):
+                    self._checkIfIPOverlap(nStats.get(f"{iptype}-address", ""), ipval, iptype)
 
     @staticmethod
     def _checkSystemIPOverlap(nStats, hostname, oldConfig):
@@ -570,24 +554,23 @@ class ConflictChecker(Timing, BWService):
 
     def _comparewithOldConfig(self, nStats, connItems, hostname, oldConfig):
         """Compare new config with old config"""
-        for oldID, oldItems in oldConfig.get(self.checkmethod, {}).items():
-            # connID == oldID was checked in step3. Skipping it
-            self.oldid = oldID
-            if oldID == self.newid:
-                continue
-            # Check if 2 items overlap
-            if self._checkIfOverlap(connItems, oldItems):
-                # If 2 items overlap, and have same host for config
-                # Check that vlans and IPs are not overlapping
-                if oldItems.get(hostname, {}):
-                    oStats = self._getRSTIPs(oldItems[hostname])
-                    for key in ["ipv4", "ipv6"]:
-                        self._checkIfIPOverlap(
-                            nStats.get(key, {}).get("nextHop", ""),
-                            oStats.get(key, {}).get("nextHop", ""),
-                            key,
-                        )
-                        self._checkRSTIPOverlap(nStats.get(key, {}), oStats.get(key, {}), key)
+        index = self._getIndex(oldConfig)
+        # Only routes with overlapping nextHop or routeFrom on the same host are checked
+        # If 2 items also overlap in time - check that IPs are not overlapping
+        for key in ["ipv4", "ipv6"]:
+            for svcitem, oldID, oStats in index.rstUsers(hostname, key, "nextHop", nStats.get(key, {}).get("nextHop", "")):
+                # connID == oldID was checked in step3. Skipping it
+                if oldID == self.newid:
+                    continue
+                self.oldid = oldID
+                if index.timeOverlap(connItems, svcitem, oldID):
+                    self._checkIfIPOverlap(nStats[key]["nextHop"], oStats.get("nextHop", ""), key)
+            for svcitem, oldID, oStats in index.rstUsers(hostname, key, "routeFrom", nStats.get(key, {}).get("routeFrom", "")):
+                if oldID == self.newid:
+                    continue
+                self.oldid = oldID
+                if index.timeOverlap(connItems, svcitem, oldID):
+                    self._checkRSTIPOverlap(nStats.get(key, {}), oStats, key)
 
     def checkrst(self, cls, rstitems, oldConfig, newDelta=False):
         """Check rst Service"""
@@ -620,12 +603,16 @@ class ConflictChecker(Timing, BWService):
         """Check conflicting resources and not allow them"""
         if newConfig == oldConfig:
             return False
-        for dkey, ditems in newConfig.items():
-            self.checkmethod = dkey
-            if dkey in ["vsw", "singleport", "kube"]:
-                self.checkvsw(cls, ditems, oldConfig, newDelta)
-            elif dkey == "rst":
-                self.checkrst(cls, ditems, oldConfig, newDelta)
+        self.index = ConflictIndex(self, oldConfig)
+        try:
+            for dkey, ditems in newConfig.items():
+                self.checkmethod = dkey
+                if dkey in ["vsw", "singleport", "kube"]:
+                    self.checkvsw(cls, ditems, oldConfig, newDelta)
+                elif dkey == "rst":
+                    self.checkrst(cls, ditems, oldConfig, newDelta)
+        finally:
+            self.index = None
         return False
 
     def checkActiveConfig(self, activeConfig):
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Copy-on-write overlay graph over shared base model
+
+Reads go through to the base graph, while all changes (delta additions
+and reductions) are recorded only in the overlay. This allows to evaluate
+many candidate deltas against one base model without copying it.
+
+Authors:
+  Justas Balcas jbalcas (at) es (dot) net
+
+Date: 2026/10/17
+"""
+
+from rdflib import Graph
+
+
+class OverlayGraph:
+    """Overlay graph which records additions and reductions on top of base graph."""
+
+    def __init__(self, base):
+        self.base = base
+        self.added = Graph()
+        self.removed = set()
+
+    def fork(self):
+        """Get new overlay with same changes (base graph is shared, not copied)."""
+        newOverlay = OverlayGraph(self.base)
+        newOverlay.added += self.added
+        newOverlay.removed = set(self.removed)
+        return newOverlay
+
+    def add(self, triple):
+        """Add triple to overlay."""
+        if triple in self.removed:
+            self.removed.discard(triple)
+        elif triple not in self.base:
+            self.added.add(triple)
+        return self
+
+    def remove(self, triple):
+        """Remove triple (only concrete triples supported)."""
+        if triple in self.added:
+            self.added.remove(triple)
+        elif triple in self.base:
+            self.removed.add(triple)
+        return self
+
+    def __iadd__(self, other):
+        for triple in other:
+            self.add(triple)
+        return self
+
+    def __isub__(self, other):
+        for triple in other:
+            self.remove(triple)
+        return self
+
+    def triples(self, pattern):
+        """Get all triples matching pattern (base without reductions, plus additions)."""
+        for triple in self.base.triples(pattern):
+            if triple not in self.removed:
+                yield triple
+        yield from self.added.triples(pattern)
+
+    def __iter__(self):
+        return self.triples((None, None, None))
+
+    def __contains__(self, triple):
+        if triple in self.added:
+            return True
+        return triple not in self.removed and triple in self.base
+
+    def __len__(self):
+        return len(self.base) - len(self.removed) + len(self.added)
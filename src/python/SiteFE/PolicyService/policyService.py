@@ -24,6 +24,7 @@ from rdflib import URIRef
 from rdflib.plugins.parsers.notation3 import BadSyntax
 from SiteFE.LookUpService.modules.rdfhelper import RDFHelper  # TODO: Move to general
 from SiteFE.PolicyService.deltachecks import ConflictChecker
+from SiteFE.PolicyService.overlaygraph import OverlayGraph
 from SiteFE.PolicyService.stateMachine import StateMachine
 from SiteRMLibs.Backends.main import Switch
 from SiteRMLibs.BWService import BWService
@@ -33,7 +34,7 @@ from SiteRMLibs.CustomExceptions import (
     ServiceNotReady,
     WrongIPAddress,
 )
-from SiteRMLibs.DefaultParams import DELTA_COMMIT_TIMEOUT
+from SiteRMLibs.DefaultParams import DELTA_COMMIT_TIMEOUT, DELTA_PARSE_CACHE_SIZE
 from SiteRMLibs.GitConfig import getGitConfig
 from SiteRMLibs.MainUtilities import (
     contentDB,
@@ -41,6 +42,7 @@ from SiteRMLibs.MainUtilities import (
     decodebase64,
     dictSearch,
     evaldict,
+    generateMD5,
     getActiveDeltas,
     getAllHosts,
     getCurrentModel,
@@ -52,6 +54,7 @@ from SiteRMLibs.MainUtilities import (
     getVal,
     normalizePipeStrings,
     parseRDFFile,
+    parseRDFString,
     writeActiveDeltas,
 )
 from SiteRMLibs.timing import Timing
@@ -108,6 +111,8 @@ class PolicyService(RDFHelper, Timing, BWService):
         self.singleport = False
         self.startend = {}
         self._addedTriples = set()
+        self.baseModel = {"uid": None, "graph": None}
+        self.deltaCache = {}
         defbw = self.convertForBWService(self.config[self.sitename]["default_params"]["bw"])
         self.defaultBW = {
             "availableCapacity": defbw,
@@ -292,14 +297,14 @@ class PolicyService(RDFHelper, Timing, BWService):
 
     @staticmethod
     def queryGraph(graphIn, sub=None, pre=None, obj=None, search=None, allowMultiple=True):
-        """Search inside the graph based on provided parameters."""
-        foundItems = []
-        for _sIn, pIn, oIn in graphIn.triples((sub, pre, obj)):
-            if search:
-                if search == pIn:
-                    foundItems.append(oIn)
-            else:
-                foundItems.append(oIn)
+        """Search inside the graph based on provided parameters.
+        search is bound as predicate in the triple pattern, so lookup uses the graph
+        subject/predicate index instead of scanning all subject triples."""
+        if search:
+            if pre and pre != search:
+                return []
+            pre = search
+        foundItems = [oIn for _sIn, _pIn, oIn in graphIn.triples((sub, pre, obj))]
         if not allowMultiple:
             if len(foundItems) > 1:
                 raise Exception(f"Search returned multiple entries. Not Supported. Out: {foundItems}")
@@ -791,21 +796,22 @@ class PolicyService(RDFHelper, Timing, BWService):
         self.currentActive = getActiveDeltas(self)
         self.newActive = copy.deepcopy(self.currentActive)
         modelParseRan = False
+        # Base model is shared and not modified. Deltas are recorded only in overlay.
+        currentGraph = OverlayGraph(currentGraph)
         for delta in self.dbI.get(
             "deltas",
             limit=10,
             search=[["state", "activating"], ["modadd", "add"]],
             orderby=["insertdate", "ASC"],
         ):
-            gCopy = copy.deepcopy(currentGraph)
             # Deltas keep string in DB, so we need to eval that
             # 1. Get delta content for reduction, addition
-            # 2. Add into model and see if it overlaps with any
+            # 2. Add into candidate overlay and see if it overlaps with any
             delta["content"] = evaldict(delta["content"])
-            # 3. Add to current graph
-            currentGraph = self._addDeltasToModel(currentGraph, delta["content"])
+            # 3. Add to candidate graph (current graph is kept as is, in case delta fails)
+            candidateGraph = self._addDeltasToModel(currentGraph.fork(), delta["content"], delta["uid"])
             # Now we parse new model and generate new currentActive config
-            self.newActive["output"] = self.parseModel(currentGraph)
+            self.newActive["output"] = self.parseModel(candidateGraph)
             modelParseRan = True
             # Now we ready to check if any of deltas overlap
             # if they do - means new delta should not be added
@@ -814,17 +820,16 @@ class PolicyService(RDFHelper, Timing, BWService):
                 self.conflictChecker.checkConflicts(self, self.newActive["output"], self.currentActive["output"], False)
                 self.stateMachine.modelstatechanger(self.dbI, "added", **delta)
                 changesApplied = True
+                currentGraph = candidateGraph
             except (OverlapException, WrongIPAddress, ServiceNotReady) as ex:
                 self.stateMachine.modelstatechanger(self.dbI, "failed", **delta)
                 # If delta apply failed we return right away without writing new Active config
+                # Candidate graph is dropped, current graph is the original before failure.
                 self.logger.debug(f"There was failure applying delta. Failure {ex}")
-                # Overwrite back the model with original before failure.
-                currentGraph = copy.deepcopy(gCopy)
             except Exception as ex:
                 self.logger.error(f"Unexpected error during delta application: {ex}")
                 self.logger.error(f"Full traceback: {traceback.format_exc()}")
                 self.stateMachine.modelstatechanger(self.dbI, "failed", **delta)
-                currentGraph = copy.deepcopy(gCopy)
 
         if not modelParseRan:
             self.newActive["output"] = self.parseModel(currentGraph)
@@ -946,17 +951,26 @@ class PolicyService(RDFHelper, Timing, BWService):
             fullpath = os.path.join(fnewdir, fname)
             self.logger.info(f"Processing delta {fullpath}")
             out = self.acceptDelta(fullpath)
-            # Write output to a new file in finished directory
-            self.siteDB.saveContent(os.path.join(ffinishdir, fname), out)
+            # Write output to a new file in finished directory (only if submitter waits for it)
+            if out.get("wait", True):
+                self.siteDB.saveContent(os.path.join(ffinishdir, fname), out)
             self.siteDB.removeFile(fullpath)
             speedup = True
         self.logger.info("Component PolicyService Finished")
         return speedup
 
+    def _getBaseModel(self):
+        """Get current model from DB as overlay. Parsed model is kept until new model is saved in DB."""
+        currentModel = self.dbI.get("models", orderby=["insertdate", "DESC"], limit=1)
+        if not currentModel or currentModel[0]["uid"] != self.baseModel["uid"]:
+            currentModel, currentGraph = getCurrentModel(self, True)
+            self.baseModel = {"uid": currentModel[0]["uid"], "graph": currentGraph}
+        return OverlayGraph(self.baseModel["graph"])
+
     def deltaToModel(self, currentGraph, deltaPath, action):
         """Add delta to current Model. If no delta provided, returns current Model"""
         if not currentGraph:
-            _, currentGraph = getCurrentModel(self, True)
+            currentGraph = self._getBaseModel()
             self._refreshHosts()
             self.getSavedPrefixes()
         if deltaPath and action:
@@ -969,7 +983,22 @@ class PolicyService(RDFHelper, Timing, BWService):
                 raise Exception(f"Unknown delta action. Action submitted {action}")
         return currentGraph
 
-    def _addDeltasToModel(self, currentGraph, deltaContent):
+    def _parseDelta(self, uid, action, value):
+        """Parse delta content. Parsed triples are cached by delta uid and content hash."""
+        key = (uid, action, generateMD5(value))
+        if key in self.deltaCache:
+            return self.deltaCache[key]
+        try:
+            gIn = parseRDFString(value)
+        except NotFoundError:
+            # Content might be base64 encoded
+            gIn = parseRDFString(decodebase64(value))
+        self.deltaCache[key] = frozenset(gIn)
+        while len(self.deltaCache) > DELTA_PARSE_CACHE_SIZE:
+            del self.deltaCache[next(iter(self.deltaCache))]
+        return self.deltaCache[key]
+
+    def _addDeltasToModel(self, currentGraph, deltaContent, uid=None):
         """Add deltas to current graph."""
         for key, value in deltaContent.items():
             if not value:
@@ -977,14 +1006,10 @@ class PolicyService(RDFHelper, Timing, BWService):
             if key not in ["reduction", "addition"]:
                 continue
             self.logger.debug(f"Adding Content {value} for key {key}")
-            with tempfile.NamedTemporaryFile(delete=False, mode="w+") as fd:
-                tmpFile = fd.name
-                try:
-                    fd.write(value)
-                except ValueError:
-                    fd.write(decodebase64(value))
-            currentGraph = self.deltaToModel(currentGraph, tmpFile, key)
-            os.unlink(tmpFile)
+            if key == "reduction":
+                currentGraph -= self._parseDelta(uid, key, value)
+            else:
+                currentGraph += self._parseDelta(uid, key, value)
         return currentGraph
 
     def _addAllPendingDeltas(self, currentGraph):
@@ -1000,7 +1025,7 @@ class PolicyService(RDFHelper, Timing, BWService):
         ):
             delta["content"] = evaldict(delta["content"])
             self.logger.debug(f"Adding delta {delta['uid']} to current graph")
-            currentGraph = self._addDeltasToModel(currentGraph, delta["content"])
+            currentGraph = self._addDeltasToModel(currentGraph, delta["content"], delta["uid"])
         # We also need to add all committing, committed, activating
         for state in ["committing", "committed", "activating"]:
             self.logger.info(f"Adding all {state} deltas to the current graph")
@@ -1010,7 +1035,7 @@ class PolicyService(RDFHelper, Timing, BWService):
             for delta in self.dbI.get("deltas", search=[["state", state]], limit=50):
                 delta["content"] = evaldict(delta["content"])
                 self.logger.debug(f"Adding delta {delta['uid']} to current graph")
-                currentGraph = self._addDeltasToModel(currentGraph, delta["content"])
+                currentGraph = self._addDeltasToModel(currentGraph, delta["content"], delta["uid"])
         return currentGraph
 
     def acceptDelta(self, deltapath):
@@ -1018,7 +1043,7 @@ class PolicyService(RDFHelper, Timing, BWService):
         self._refreshHosts()
         currentGraph = self.deltaToModel(None, None, None)
         currentGraph = self._addAllPendingDeltas(currentGraph)
-        activeDeltasDB = getActiveDeltas(self)
+        activeDeltasDB = getActiveDeltas(self, ["usedIPs", "usedVLANs"])
         self.currentActive = {"output": {}}
         self.currentActive["output"] = self.parseModel(currentGraph)
         # We need to take used IPs and VLANs from activeDeltasDB
@@ -1027,13 +1052,20 @@ class PolicyService(RDFHelper, Timing, BWService):
         self.newActive = {"output": {}}
         fileContent = self.siteDB.getFileContentAsJson(deltapath)
         self.logger.info(f"Called Accept Delta. Content Location: {deltapath}")
-        self.siteDB.removeFile(deltapath)
         toDict = dict(fileContent)
         toDict["State"] = "accepting"
         toDict["Type"] = "submission"
         toDict["modadd"] = "idle"
         try:
-            self._addDeltasToModel(currentGraph, toDict.get("content", {}))
+            return self._acceptDelta(currentGraph, toDict)
+        finally:
+            # Remove only once delta is stored in DB (REST reports pending file as accepting until then)
+            self.siteDB.removeFile(deltapath)
+
+    def _acceptDelta(self, currentGraph, toDict):
+        """Check delta for conflicts and store it in DB as accepted or failed."""
+        try:
+            self._addDeltasToModel(currentGraph, toDict.get("content", {}), toDict.get("ID"))
             self.newActive["output"] = self.parseModel(currentGraph)
             try:
                 self.conflictChecker.checkConflicts(self, self.newActive["output"], self.currentActive["output"], True)
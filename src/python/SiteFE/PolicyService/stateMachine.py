@@ -24,6 +24,9 @@ import json
 from SiteRMLibs.DefaultParams import DELTA_COMMIT_TIMEOUT, DELTA_REMOVE_TIMEOUT
 from SiteRMLibs.MainUtilities import getLoggingObject, getUTCnow
 
+# Delta columns needed for state transitions (delta content is not loaded)
+DELTA_STATE_COLUMNS = ["id", "uid", "state", "insertdate", "updatedate", "modadd"]
+
 
 class StateMachine:
     """State machine for Frontend and policy service."""
@@ -91,6 +94,7 @@ class StateMachine:
                 ["insertdate", "<", getUTCnow() - DELTA_COMMIT_TIMEOUT],
             ],
             limit=50,
+            columns=DELTA_STATE_COLUMNS,
         ):
             self.logger.info(f"Delta {dbentry['uid']} is in accepted state for more than {DELTA_COMMIT_TIMEOUT} seconds. Changing to remove state.")
             self.stateChangerDelta(dbObj, "remove", **dbentry)
@@ -103,7 +107,7 @@ class StateMachine:
         """Committing state Check."""
         # it should change state only if there are no activating deltas right now
         # Otherwise print message that I have to wait
-        activating_deltas = dbObj.get("deltas", search=[["state", "activating"]])
+        activating_deltas = dbObj.get("deltas", search=[["state", "activating"]], columns=DELTA_STATE_COLUMNS)
 
         for delta in activating_deltas:
             if delta["updatedate"] < int(getUTCnow() - 180):
@@ -113,18 +117,18 @@ class StateMachine:
             self.logger.info("There are deltas still in activating state.")
             return None
 
-        for delta in dbObj.get("deltas", search=[["state", "committing"]]):
+        for delta in dbObj.get("deltas", search=[["state", "committing"]], columns=DELTA_STATE_COLUMNS):
             self.stateChangerDelta(dbObj, "committed", **delta)
             self.modelstatechanger(dbObj, "add", **delta)
 
     def committed(self, dbObj):
         """Committed state Check."""
-        for delta in dbObj.get("deltas", search=[["state", "committed"]]):
+        for delta in dbObj.get("deltas", search=[["state", "committed"]], columns=DELTA_STATE_COLUMNS):
             self.stateChangerDelta(dbObj, "activating", **delta)
 
     def activating(self, dbObj):
         """Check on all deltas in state activating."""
-        for delta in dbObj.get("deltas", search=[["state", "activating"]]):
+        for delta in dbObj.get("deltas", search=[["state", "activating"]], columns=DELTA_STATE_COLUMNS):
             modadd = delta.get("modadd")
             if modadd in ["added", "removed"]:
                 self.stateChangerDelta(dbObj, "activated", **delta)
@@ -133,7 +137,7 @@ class StateMachine:
 
     def activated(self, dbObj):
         """Check on all activated state deltas."""
-        for delta in dbObj.get("deltas", search=[["state", "activated"]]):
+        for delta in dbObj.get("deltas", search=[["state", "activated"]], columns=DELTA_STATE_COLUMNS):
             if delta.get("modadd") == "removed":
                 self.stateChangerDelta(dbObj, "remove", **delta)
 
@@ -146,6 +150,7 @@ class StateMachine:
                 ["state", "remove"],
                 ["updatedate", "<", int(getUTCnow() - DELTA_REMOVE_TIMEOUT)],
             ],
+            columns=DELTA_STATE_COLUMNS,
         ):
             self.modelstatecancel(dbObj, **delta)
             self.stateChangerDelta(dbObj, "removed", **delta)
@@ -154,7 +159,7 @@ class StateMachine:
     def removed(dbObj):
         """Check on all remove state deltas."""
         # Remove fully from database
-        for delta in dbObj.get("deltas", search=[["state", "removed"]]):
+        for delta in dbObj.get("deltas", search=[["state", "removed"]], columns=DELTA_STATE_COLUMNS):
             print(f"Remove {delta['id']} delta")
             dbObj.delete("deltas", [["id", delta["id"]]])
 
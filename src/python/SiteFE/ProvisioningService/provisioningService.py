@@ -24,8 +24,8 @@ from SiteRMLibs.CustomExceptions import NoOptionError, NoSectionError, SwitchExc
 from SiteRMLibs.GitConfig import getGitConfig
 from SiteRMLibs.MainUtilities import (
     createDirs,
-    evaldict,
     firstRunCheck,
+    getActiveDeltas,
     getDBConn,
     getLoggingObject,
     getSiteNameFromConfig,
@@ -363,11 +363,7 @@ class ProvisioningService(RoutingService, VirtualSwitchingService, QualityOfServ
 
     def _getActive(self):
         """Get Active Output"""
-        self.activeDeltas = {"output": {}}
-        activeDeltas = self.dbI.get("activeDeltas")
-        if activeDeltas:
-            activeDeltas = activeDeltas[0]
-            self.activeDeltas["output"] = evaldict(activeDeltas["output"])
+        self.activeDeltas = {"output": getActiveDeltas(self)["output"]}
 
     def _getAllForceApply(self):
         """Get all force apply"""
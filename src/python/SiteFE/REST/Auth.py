@@ -70,7 +70,7 @@ async def login(request: Request, item: LoginItem, deps: Dict[str, Any] = Depend
     try:
         auth_handler = deps["authHandler"]
 
-        user = deps["dbI"].get("users", limit=1, search=[["username", item.username]])
+        user = await deps["dbI"].get("users", limit=1, search=[["username", item.username]])
         if not user or user[0].get("disabled"):
             raise BadRequestError("Invalid username or password")
 
@@ -78,7 +78,7 @@ async def login(request: Request, item: LoginItem, deps: Dict[str, Any] = Depend
             raise BadRequestError("Invalid username or password")
 
         if auth_handler.needs_rehash(user[0]["password_hash"]):
-            deps["dbI"].update("users", search=[["id", user[0]["id"]]], update={"password_hash": auth_handler.hash_password(item.password)})
+            await deps["dbI"].update("users", search=[["id", user[0]["id"]]], update={"password_hash": auth_handler.hash_password(item.password)})
 
         access_token, expires_at, expires_in = auth_handler.getAccessToken(user[0]["username"], extra_claims={"perm": user[0]["permissions"]})
 
@@ -150,7 +150,7 @@ async def token_refresh(request: Request, item: M2MLoginItem, deps: Dict[str, An
     """
     try:
         # Check if refresh token is present in the database
-        refreshRecord = deps["dbI"].get(
+        refreshRecord = await deps["dbI"].get(
             "refresh_tokens",
             limit=1,
             search=[
@@ -176,7 +176,7 @@ async def token_refresh(request: Request, item: M2MLoginItem, deps: Dict[str, An
 
         access_token, expires_at, expires_in = deps["authHandler"].getAccessToken(refreshRecord[0]["username"], extra_claims={"perm": refreshRecord[0]["permissions"]})
         new_refresh_token = deps["authHandler"].getRefreshToken()
-        deps["dbI"].delete("refresh_tokens", [["token_hash", deps["authHandler"].hash_token(item.refresh_token)]])
+        await deps["dbI"].delete("refresh_tokens", [["token_hash", deps["authHandler"].hash_token(item.refresh_token)]])
         out = {
             "username": refreshRecord[0]["username"],
             "client_ip": clientIP,
@@ -187,7 +187,7 @@ async def token_refresh(request: Request, item: M2MLoginItem, deps: Dict[str, An
             "revoked": False,
             "rotated_from": refreshRecord[0]["token_hash"],
         }
-        deps["dbI"].insert("refresh_tokens", [out])
+        await deps["dbI"].insert("refresh_tokens", [out])
         return APIResponse.genResponse(
             request,
             {
@@ -244,7 +244,7 @@ async def token_challenge(
             "revoked": False,
             "rotated_from": None,
         }
-        deps["dbI"].insert("refresh_tokens", [out])
+        await deps["dbI"].insert("refresh_tokens", [out])
 
         return APIResponse.genResponse(
             request,
@@ -56,7 +56,7 @@ def _checkactionrequest(config, action=None):
         )
 
 
-def getDebugEntry(
+async def getDebugEntry(
     deps,
     debugvar=None,
     hostname=None,
@@ -78,7 +78,7 @@ def getDebugEntry(
         search.append(["state", state])
     if action:
         search.append(["action", action])
-    out = deps["dbI"].get("debugrequests", orderby=["insertdate", "DESC"], search=search, limit=limit)
+    out = await deps["dbI"].get("debugrequests", orderby=["insertdate", "DESC"], search=search, limit=limit)
     if out is None or len(out) == 0:
         return []
     if details and debugvar != "ALL":
@@ -588,7 +588,7 @@ async def getDebugActions(
     - Returns a list of debug actions.
     """
     checkSite(deps, sitename)
-    out = getDebugEntry(
+    out = await getDebugEntry(
         deps,
         debugvar=debugvar,
         hostname=hostname,
@@ -659,7 +659,7 @@ async def getDebugInfo(
     - Returns the debug action information for the given debug ID.
     """
     checkSite(deps, sitename)
-    out = getDebugEntry(
+    out = await getDebugEntry(
         deps,
         debugvar=debugvar,
         hostname=hostname,
@@ -714,7 +714,7 @@ async def updatedebug(
     - Updates the debug action information for the given debug ID.
     """
     checkSite(deps, sitename)
-    dbentry = deps["dbI"].get("debugrequests", search=[["id", debugvar]])
+    dbentry = await deps["dbI"].get("debugrequests", search=[["id", debugvar]])
     if not dbentry:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -726,7 +726,7 @@ async def updatedebug(
         dumpFileContentAsJson(dbentry[0]["outputinfo"], item.output)
     # Update the state in database.
     out = {"id": debugvar, "state": item.state, "updatedate": getUTCnow()}
-    updOut = deps["dbI"].update("debugrequests", [out])
+    updOut = await deps["dbI"].update("debugrequests", [out])
     return APIResponse.genResponse(request, {"Status": updOut[0], "ID": debugvar})
 
 
@@ -768,14 +768,14 @@ async def deletedebug(
     - Deletes the debug action information for the given debug ID.
     """
     checkSite(deps, sitename)
-    dbentry = deps["dbI"].get("debugrequests", search=[["id", debugvar]])
+    dbentry = await deps["dbI"].get("debugrequests", search=[["id", debugvar]])
     if not dbentry:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Debug request with ID {debugvar} not found.",
         )
     # ==================================
-    updOut = deps["dbI"].delete("debugrequests", [["id", debugvar]])
+    updOut = await deps["dbI"].delete("debugrequests", [["id", debugvar]])
     if os.path.isfile(dbentry[0]["debuginfo"]):
         os.remove(dbentry[0]["debuginfo"])
     if os.path.isfile(dbentry[0]["outputinfo"]):
@@ -827,7 +827,7 @@ async def submitdebug(
     checkSite(deps, sitename)
     # Insert dummy entry in the database with state pending, so that we get an ID back
     # This id is used for dynamic port generation for transfer service.
-    dummyIns = deps["dbI"].insert(
+    dummyIns = await deps["dbI"].insert(
         "debugrequests",
         [
             {
@@ -845,7 +845,7 @@ async def submitdebug(
         inputDict = validator(deps["config"], dummyIns[2], item.request)
     except BadRequestError as exc:
         # Need to delete the dummy entry as validation failed
-        deps["dbI"].delete("debugrequests", [["id", dummyIns[2]]])
+        await deps["dbI"].delete("debugrequests", [["id", dummyIns[2]]])
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
     try:
         debugdir = os.path.join(deps["config"].get(sitename, "privatedir"), "DebugRequests")
@@ -863,10 +863,10 @@ async def submitdebug(
             "debuginfo": requestfname,
             "outputinfo": outputfname,
         }
-        insOut = deps["dbI"].update("debugrequests", [out])
+        insOut = await deps["dbI"].update("debugrequests", [out])
         return APIResponse.genResponse(request, {"Status": insOut[0], "ID": dummyIns[2]})
     except Exception as exc:  # pylint: disable=broad-except
         print(f"Full traceback: {traceback.format_exc()}")
         # Need to delete the dummy entry as something failed
-        deps["dbI"].delete("debugrequests", [["id", dummyIns[2]]])
+        await deps["dbI"].delete("debugrequests", [["id", dummyIns[2]]])
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc)) from exc
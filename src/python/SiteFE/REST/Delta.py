@@ -10,8 +10,8 @@ Email                   : jbalcas (at) es (dot) net
 Date                    : 2025/07/14
 """
 
+import asyncio
 import os
-from time import sleep
 from typing import Literal, Optional
 
 from fastapi import (
@@ -39,6 +39,8 @@ from SiteFE.REST.dependencies import (
 )
 from SiteRMLibs.CustomExceptions import ModelNotFound, WrongInputError
 from SiteRMLibs.DefaultParams import (
+    DELTA_ACCEPT_POLL_INTERVAL,
+    DELTA_ACCEPT_TIMEOUT,
     DELTA_COMMIT_TIMEOUT,
     LIMIT_DEFAULT,
     LIMIT_MAX,
@@ -74,9 +76,9 @@ def _extract_sense_headers(request):
     return {hdr: request.headers.get(hdr, "") for hdr in _SENSE_REQUEST_HEADERS}
 
 
-def _record_delta_action(dbI, username, delta_id, action, sense_headers):
+async def _record_delta_action(dbI, username, delta_id, action, sense_headers):
     """Write a delta user-tracking record to deltasusertracking."""
-    dbI.insert(
+    await dbI.insert(
         "deltasusertracking",
         [
             {
@@ -100,11 +102,11 @@ def _parse_delta_tracking_record(record):
     return current
 
 
-def _get_delta_request_info(dbI, delta_id, limit=LIMIT_DEFAULT):
+async def _get_delta_request_info(dbI, delta_id, limit=LIMIT_DEFAULT):
     """Get requestor and tracking information for a delta."""
     tracking = [
         _parse_delta_tracking_record(record)
-        for record in dbI.get(
+        for record in await dbI.get(
             "deltasusertracking",
             search=[["deltaid", delta_id]],
             orderby=["insertdate", "ASC"],
@@ -127,24 +129,65 @@ def _get_delta_request_info(dbI, delta_id, limit=LIMIT_DEFAULT):
     return {"requestInfo": request_info, "userTracking": tracking}
 
 
-def _getdeltas(dbI, **kwargs):
+def _readDeltaOutput(finishedName):
+    """Read and remove PolicyService output of accepted delta (None if not yet available)."""
+    if not os.path.isfile(finishedName):
+        return None
+    out = getFileContentAsJson(finishedName)
+    removeFile(finishedName)
+    return out
+
+
+async def _waitForDeltaOutput(finishedName, timeout=DELTA_ACCEPT_TIMEOUT):
+    """Wait (without blocking event loop) for PolicyService output of accepted delta."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        out = await loop.run_in_executor(None, _readDeltaOutput, finishedName)
+        if out is not None:
+            return out, False
+        await asyncio.sleep(DELTA_ACCEPT_POLL_INTERVAL)
+    return {}, True
+
+
+async def _getdeltas(dbI, **kwargs):
     """Get delta from database."""
     search = []
     if kwargs.get("deltaID"):
         search.append(["uid", kwargs.get("deltaID")])
     if kwargs.get("updatedate"):
         search.append(["updatedate", ">", kwargs.get("updatedate")])
-    out = dbI.get(
+    out = await dbI.get(
         "deltas",
         search=search,
         limit=kwargs.get("limit", LIMIT_DEFAULT),
         orderby=["insertdate", "DESC"],
+        columns=kwargs.get("columns"),
     )
     if out and kwargs.get("deltaID"):
         return out[0]
     return out
 
 
+async def _getPendingDelta(deps, sitename, deltaID):
+    """Get delta submitted without wait, which is not yet processed by PolicyService (not in database)."""
+    fname = os.path.join(deps["config"].get(sitename, "privatedir"), "PolicyService", "httpnew", f"{deltaID}.json")
+    pending = await asyncio.get_running_loop().run_in_executor(None, getFileContentAsJson, fname)
+    if not pending:
+        return {}
+    return {
+        "uid": deltaID,
+        "insertdate": pending["insertdate"],
+        "updatedate": pending["updatedate"],
+        "state": pending.get("State", "accepting"),
+        "deltat": "",
+        "content": jsondumps(pending.get("content", {})),
+        "modelid": pending.get("modelId", ""),
+        "modadd": "",
+        "error": "",
+    }
+
+
 class DeltaItem(BaseModel):
     """Service Item Model."""
 
@@ -241,7 +284,9 @@ async def getDeltas(
     checkSite(deps, sitename)
     retvals = []
     modTime = getModTime(request.headers)
-    deltas = _getdeltas(deps["dbI"], limit=limit, updatedate=modTime)
+    # Summary does not need delta content, so it is not loaded from database
+    columns = ["uid", "updatedate", "state", "modelid"] if summary else None
+    deltas = await _getdeltas(deps["dbI"], limit=limit, updatedate=modTime, columns=columns)
     if not deltas:
         # return 404 Not Found if no deltas are found
         raise HTTPException(
@@ -276,6 +321,10 @@ async def getDeltas(
                 "description": "Delta submitted successfully",
                 "content": {"application/json": {"example": {"delta": "example_delta"}}},
             },
+            202: {
+                "description": "Delta submitted for acceptance (wait=false). Check delta state via href (status URL).",
+                "content": {"application/json": {"example": {"id": "example_delta", "State": "accepting", "href": "<base_url>/api/<sitename>/deltas/example_delta"}}},
+            },
             404: {
                 "description": "Not Found. Possible Reasons:\n - No sites configured in the system.\n - Model not found in the database.",
                 "content": {
@@ -314,15 +363,19 @@ async def submitDelta(
         description="The site name to submit the delta for.",
         examples=[startupConfig.get("SITENAME", "default")],
     ),
+    wait: StrictBool = Query(
+        True,
+        description="Whether to wait for delta acceptance. If false, returns 202 with status URL (href) of the delta. Defaults to True.",
+    ),
     deps=Depends(apiAdminDeps),
-    _forbid=Depends(forbidExtraQueryParams()),
+    _forbid=Depends(forbidExtraQueryParams("wait")),
 ):
     """
     Submit a new delta for the specified site.
     """
     checkSite(deps, sitename)
     # Check if checkignore is set, if so, check if first run is finished
-    if not checkReadyState(deps):
+    if not await checkReadyState(deps):
         # If first run is not finished, raise an exception
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -334,7 +387,7 @@ async def submitDelta(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="You did POST method, but nor reduction, nor addition is present",
         )
-    if delta := _getdeltas(deps["dbI"], deltaID=item.id):
+    if delta := await _getdeltas(deps["dbI"], deltaID=item.id):
         # If delta is not in a final state, we delete it from db, and will add new one.
         if delta["state"] not in [
             "activated",
@@ -343,11 +396,11 @@ async def submitDelta(
             "accepted",
             "accepting",
         ]:
-            deps["dbI"].delete("deltas", [["uid", delta["uid"]]])
+            await deps["dbI"].delete("deltas", [["uid", delta["uid"]]])
     try:
         # Get latest model, and check if modelId is same as latest
         # If not, raise an Error, as model was updated, and things have changed.
-        latestModel = depGetModel(deps["dbI"], limit=1, orderby=["insertdate", "DESC"])[0]
+        latestModel = (await depGetModel(deps["dbI"], limit=1, orderby=["insertdate", "DESC"]))[0]
         item.modelId = latestModel["uid"] if not item.modelId else item.modelId  # Set it to the latest, if not provided.
         if latestModel["uid"] != item.modelId:
             # Model ID does not match latest model, and latest model is the one with all committed changes. We will bypass the request and use the latest model ID.
@@ -364,6 +417,7 @@ async def submitDelta(
         "content": item.dict(),
         "State": "accepting",
         "modelId": item.modelId,
+        "wait": wait,
     }
     # Save item to disk
     fname = os.path.join(
@@ -379,22 +433,18 @@ async def submitDelta(
         f"{item.id}.json",
     )
     saveContent(fname, outContent)
-    _record_delta_action(deps["dbI"], deps["user"]["user_info"]["sub"], item.id, "submit", _extract_sense_headers(request))
-
-    # This is a blocking call, better approach is to reply and ask to check later.
-    # But for now, we will block until we get output from PolicyService.
-    # Loop for max 50seconds and check if we have file in finished directory.
-    out = {}
-    timer = 50
-    while timer > 0:
-        if os.path.isfile(finishedName):
-            out = getFileContentAsJson(finishedName)
-            removeFile(finishedName)
-            break
-        timer -= 1
-        sleep(1)
-    # If timer reached 0, we will not have file in finished directory
-    if timer == 0 and not out:
+    await _record_delta_action(deps["dbI"], deps["user"]["user_info"]["sub"], item.id, "submit", _extract_sense_headers(request))
+
+    if not wait:
+        # Do not wait for PolicyService. Client checks delta state via href.
+        outContent["id"] = item.id
+        outContent["lastModified"] = convertTSToDatetime(outContent["updatedate"])
+        outContent["href"] = f"{request.base_url}api/{sitename}/deltas/{item.id}"
+        return APIResponse.genResponse(request, outContent, status_code=status.HTTP_202_ACCEPTED, headers={"Location": outContent["href"]})
+    # Wait for output from PolicyService (max DELTA_ACCEPT_TIMEOUT seconds), without blocking other requests.
+    out, timedOut = await _waitForDeltaOutput(finishedName)
+    # If timeout reached, we will not have file in finished directory
+    if timedOut:
         # Return failed http code
         raise HTTPException(
             status_code=status.HTTP_504_GATEWAY_TIMEOUT,
@@ -471,7 +521,10 @@ async def getDeltaByID(
     """
     checkSite(deps, sitename)
     modTime = getModTime(request.headers)
-    delta = _getdeltas(deps["dbI"], deltaID=delta_id)
+    delta = await _getdeltas(deps["dbI"], deltaID=delta_id)
+    if not delta:
+        # Delta submitted with wait=false might be still waiting for PolicyService
+        delta = await _getPendingDelta(deps, sitename, delta_id)
     if not delta:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -494,7 +547,7 @@ async def getDeltaByID(
         delta["reduction"] = content.get("reduction", {})
     else:
         del delta["content"]
-    delta.update(_get_delta_request_info(deps["dbI"], delta_id))
+    delta.update(await _get_delta_request_info(deps["dbI"], delta_id))
     return APIResponse.genResponse(request, [delta], headers=headers)
 
 
@@ -569,13 +622,13 @@ async def getDeltaRequestInfo(
     Get requestor and user-tracking information for the specified delta ID.
     """
     checkSite(deps, sitename)
-    delta = _getdeltas(deps["dbI"], deltaID=delta_id)
+    delta = await _getdeltas(deps["dbI"], deltaID=delta_id)
     if not delta:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Delta not found in the database.",
         )
-    return APIResponse.genResponse(request, _get_delta_request_info(deps["dbI"], delta_id, limit=limit))
+    return APIResponse.genResponse(request, await _get_delta_request_info(deps["dbI"], delta_id, limit=limit))
 
 
 # =========================================================
@@ -637,14 +690,14 @@ async def performActionOnDelta(
     checkSite(deps, sitename)
     # actions are commit, forceapply
     # Check if checkignore is set, if so, check if first run is finished
-    if not checkReadyState(deps):
+    if not await checkReadyState(deps):
         # If first run is not finished, raise an exception
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="API is not in a ready state to accept requests. Server restart? Failing service?. Retry later.",
         )
     # Check if delta state is valid for commit action;
-    delta = _getdeltas(deps["dbI"], deltaID=delta_id)
+    delta = await _getdeltas(deps["dbI"], deltaID=delta_id)
     if not delta:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -662,9 +715,9 @@ async def performActionOnDelta(
         )
     if action in ["commit", "forcecommit"]:
         # Commit or force commit the delta
-        deps["stateMachine"].stateChangerDelta(deps["dbI"], "committed", **delta)
-        deps["stateMachine"].modelstatechanger(deps["dbI"], "add", **delta)
-        _record_delta_action(deps["dbI"], deps["user"]["user_info"]["sub"], delta_id, action, _extract_sense_headers(request))
+        await deps["dbI"].run(deps["stateMachine"].stateChangerDelta, deps["dbI"].sync, "committed", **delta)
+        await deps["dbI"].run(deps["stateMachine"].modelstatechanger, deps["dbI"].sync, "add", **delta)
+        await _record_delta_action(deps["dbI"], deps["user"]["user_info"]["sub"], delta_id, action, _extract_sense_headers(request))
         return APIResponse.genResponse(request, {"result": "Action completed successfully"})
     if action == "forceapply":
         # Force apply the delta
@@ -672,7 +725,7 @@ async def performActionOnDelta(
         return APIResponse.genResponse(request, {"result": "Force apply action completed successfully"})
     if delta["state"] in ["accepted"] and action == "remove":
         # Remove delta from the database
-        deps["dbI"].delete("deltas", [["uid", delta_id]])
+        await deps["dbI"].delete("deltas", [["uid", delta_id]])
     raise HTTPException(
         status_code=status.HTTP_400_BAD_REQUEST,
         detail=f"Invalid action '{action}' specified. Valid actions are 'commit', 'forcecommit', 'forceapply'.",
@@ -730,7 +783,7 @@ async def getTimeStatesForDelta(
     Get time states for the specified delta ID.
     """
     checkSite(deps, sitename)
-    delta = _getdeltas(deps["dbI"], deltaID=delta_id)
+    delta = await _getdeltas(deps["dbI"], deltaID=delta_id)
     if not delta:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -738,7 +791,7 @@ async def getTimeStatesForDelta(
         )
 
     # Retrieve time states from the database
-    timestates = deps["dbI"].get(
+    timestates = await deps["dbI"].get(
         "states",
         search=[["deltaid", delta_id]],
         orderby=["insertdate", "DESC"],
@@ -794,7 +847,7 @@ async def createTimeStateForDelta(
     """
     checkSite(deps, sitename)
     # Check if the delta is in a state that allows creating a time state
-    deps["dbI"].insert(
+    await deps["dbI"].insert(
         "deltatimestates",
         [
             {
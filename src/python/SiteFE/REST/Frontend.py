@@ -12,7 +12,16 @@ Date                    : 2025/07/14
 
 import os
 
-from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Path,
+    Query,
+    Request,
+    Response,
+    status,
+)
 from SiteFE.REST.dependencies import (
     DEFAULT_RESPONSES,
     APIResponse,
@@ -30,10 +39,14 @@ from SiteRMLibs.DefaultParams import (
 )
 from SiteRMLibs.MainUtilities import (
     evaldict,
+    generateMD5,
     getFileContentAsJson,
     getstartupconfig,
     getTempDir,
     getUTCnow,
+    jsondumps,
+    mergeActiveDeltas,
+    sliceActiveDeltas,
 )
 
 startupConfig = getstartupconfig()
@@ -41,6 +54,24 @@ startupConfig = getstartupconfig()
 router = APIRouter()
 
 
+def _notModified(request, version):
+    """Check if client has the same version (If-None-Match header matches ETag)."""
+    ifNoneMatch = [val.strip().removeprefix("W/") for val in request.headers.get("if-none-match", "").split(",")]
+    return f'"{version}"' in ifNoneMatch or "*" in ifNoneMatch
+
+
+def _activeDeltasResponse(request, activeDeltas):
+    """Return active deltas with ETag (version), or 304 if client has the same version."""
+    output = activeDeltas["output"]
+    version = activeDeltas.get("version") or generateMD5(output if isinstance(output, str) else jsondumps(output))
+    headers = {"ETag": f'"{version}"'}
+    if _notModified(request, version):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if isinstance(activeDeltas["output"], str):
+        activeDeltas["output"] = evaldict(activeDeltas["output"])
+    return APIResponse.genResponse(request, activeDeltas, headers=headers)
+
+
 # =========================================================
 # /api/alive
 # =========================================================
@@ -100,7 +131,7 @@ async def checkAPIReady(
     """
     Check the readiness of the API.
     """
-    if not checkReadyState(deps):
+    if not await checkReadyState(deps):
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="API is not ready to serve requests.",
@@ -577,7 +608,7 @@ async def getswitchdata(
     - Returns a list of switches with their information.
     """
     checkSite(deps, sitename)
-    return APIResponse.genResponse(request, deps["dbI"].get("switch", orderby=["updatedate", "DESC"], limit=limit))
+    return APIResponse.genResponse(request, await deps["dbI"].get("switch", orderby=["updatedate", "DESC"], limit=limit))
 
 
 # =========================================================
@@ -611,6 +642,9 @@ async def getswitchdata(
                     }
                 },
             },
+            304: {
+                "description": "Active deltas not modified (If-None-Match matches ETag version).",
+            },
             404: {
                 "description": "No site configured in the system.",
                 "content": {"application/json": {"example": {"detail": "No site configured in the system."}}},
@@ -634,13 +668,89 @@ async def getactivedeltas(
     - Returns a list of active deltas with their information.
     """
     checkSite(deps, sitename)
-    activeDeltas = deps["dbI"].get("activeDeltas", orderby=["insertdate", "DESC"], limit=1)
+    activeDeltas = await deps["dbI"].get("activeDeltas", orderby=["insertdate", "DESC"], limit=1)
     if activeDeltas:
         activeDeltas = activeDeltas[0]
-        activeDeltas["output"] = evaldict(activeDeltas["output"])
+        if activeDeltas.get("version") and _notModified(request, activeDeltas["version"]):
+            # No need to read items, client has the same version
+            return _activeDeltasResponse(request, activeDeltas)
+        activeDeltas = mergeActiveDeltas(activeDeltas, await deps["dbI"].get("activeDeltasItems"))
     else:
         activeDeltas = {"output": {}}
-    return APIResponse.genResponse(request, activeDeltas)
+    return _activeDeltasResponse(request, activeDeltas)
+
+
+# =========================================================
+# /api/{sitename}/frontend/activedeltas/{hostname}
+# =========================================================
+
+
+@router.get(
+    "/{sitename}/frontend/activedeltas/{hostname}",
+    summary="Get Active Deltas for Host",
+    description=("Returns the most recent active delta information only for the specified host. Used by agents (Ruler) to get only resources relevant for the host."),
+    tags=["Frontend"],
+    responses={
+        **{
+            200: {
+                "description": "Returns the most recent active delta information for the host.",
+                "content": {
+                    "application/json": {
+                        "example": {
+                            "id": 1,
+                            "hostname": "dtn01.example.net",
+                            "insertdate": 1752198423,
+                            "updatedate": 1753031057,
+                            "output": {
+                                "singleport": {},
+                                "vsw": {},
+                                "rst": {},
+                                "usedIPs": {"deltas": {}, "system": {}},
+                                "usedVLANs": {"deltas": {}, "system": {}},
+                            },
+                        }
+                    }
+                },
+            },
+            304: {
+                "description": "Active deltas not modified (If-None-Match matches ETag version).",
+            },
+            404: {
+                "description": "No site configured in the system.",
+                "content": {"application/json": {"example": {"detail": "No site configured in the system."}}},
+            },
+        },
+        **DEFAULT_RESPONSES,
+    },
+)
+async def getactivedeltashost(
+    request: Request,
+    sitename: str = Path(
+        ...,
+        description="The site name to retrieve the active deltas for.",
+        examples=[startupConfig.get("SITENAME", "default")],
+    ),
+    hostname: str = Path(..., description="The hostname to retrieve the active deltas for."),
+    deps=Depends(apiReadDeps),
+    _forbid=Depends(forbidExtraQueryParams()),
+):
+    """
+    Get active delta data for a single host from the database.
+    - Returns active deltas precomputed for the host (computed on the fly if host is not yet known).
+    """
+    checkSite(deps, sitename)
+    activeDeltas = await deps["dbI"].get("activeDeltasHost", limit=1, search=[["hostname", hostname]])
+    if activeDeltas:
+        return _activeDeltasResponse(request, activeDeltas[0])
+    activeDeltas = await deps["dbI"].get("activeDeltas", orderby=["insertdate", "DESC"], limit=1)
+    if activeDeltas:
+        activeDeltas = mergeActiveDeltas(activeDeltas[0], await deps["dbI"].get("activeDeltasItems"))
+        activeDeltas["hostname"] = hostname
+        activeDeltas["output"] = sliceActiveDeltas(activeDeltas["output"], hostname)
+        activeDeltas["version"] = None
+    else:
+        activeDeltas = {"hostname": hostname, "output": {}}
+    return _activeDeltasResponse(request, activeDeltas)
 
 
 # =========================================================
@@ -689,7 +799,7 @@ async def getqosdata(
     """
     checkSite(deps, sitename)
     # pylint: disable=too-many-nested-blocks
-    hosts = deps["dbI"].get("hosts", orderby=["updatedate", "DESC"], limit=limit)
+    hosts = await deps["dbI"].get("hosts", orderby=["updatedate", "DESC"], limit=limit)
     out = {}
     for host in hosts:
         if host.get("updatedate", 0) and (int(host["updatedate"]) + SERVICE_DOWN_TIMEOUT) < getUTCnow():
@@ -25,6 +25,7 @@ from SiteFE.REST.dependencies import (
     forbidExtraQueryParams,
 )
 from SiteRMLibs.DefaultParams import LIMIT_DEFAULT, LIMIT_MAX, LIMIT_MIN
+from SiteRMLibs.DictPatch import applyPatch
 from SiteRMLibs.MainUtilities import (
     dumpFileContentAsJson,
     getFileContentAsJson,
@@ -54,6 +55,41 @@ class HostItem(BaseModel):
         extra = "allow"
 
 
+async def _updateHostInfo(deps, host, item):
+    """Update existing host with full report, patch against the version Frontend has or heartbeat (nodatachange).
+    Returns version of host report. Raises 409 if agent version does not match and full report is needed."""
+    itemdict = item.dict()
+    version = host.get("version") or 0
+    if itemdict.get("nodatachange"):
+        if itemdict.get("version") is not None and itemdict["version"] != version:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Host report version mismatch. Frontend has version {version}. Send full report.")
+        await deps["dbI"].update("hosts", [{"id": host["id"], "updatedate": getUTCnow()}])
+        return version
+    if "patch" in itemdict:
+        hostinfo = getFileContentAsJson(host["hostinfo"])
+        if not hostinfo or itemdict.get("baseversion") != version:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Host report version mismatch. Frontend has version {version}. Send full report.")
+        try:
+            applyPatch(hostinfo, itemdict["patch"])
+        except ValueError as ex:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Failed to apply host report patch: {ex}. Send full report.") from ex
+        hostinfo.update({key: itemdict[key] for key in ["hostname", "ip", "insertdate", "updatedate", "pluginstats"] if key in itemdict})
+        itemdict = hostinfo
+    version += 1
+    dumpFileContentAsJson(host["hostinfo"], itemdict)
+    out = {
+        "id": host["id"],
+        "hostname": item.hostname,
+        "ip": item.ip,
+        "insertdate": getUTCnow(),
+        "updatedate": getUTCnow(),
+        "hostinfo": host["hostinfo"],
+        "version": version,
+    }
+    await deps["dbI"].update("hosts", [out])
+    return version
+
+
 # get (GET)
 @router.get(
     "/{sitename}/hosts",
@@ -174,7 +210,7 @@ async def gethosts(
         limit = 1
     if details:
         limit = 1
-    hosts = deps["dbI"].get("hosts", orderby=["updatedate", "DESC"], limit=limit, search=search)
+    hosts = await deps["dbI"].get("hosts", orderby=["updatedate", "DESC"], limit=limit, search=search)
     out = []
     if not hosts:
         raise HTTPException(
@@ -203,7 +239,11 @@ async def gethosts(
         **{
             200: {
                 "description": "Host added successfully",
-                "content": {"application/json": {"example": {"Status": "ADDED"}}},
+                "content": {"application/json": {"example": {"Status": "ADDED", "version": 1}}},
+            },
+            409: {
+                "description": "Host report version (patch base or heartbeat) does not match Frontend. Agent must send full report.",
+                "content": {"application/json": {"example": {"detail": "Host report version mismatch. Frontend has version 3. Send full report."}}},
             },
             400: {
                 "description": "Host already exists",
@@ -234,7 +274,7 @@ async def addhost(
     - If the host exists, it will raise an exception.
     """
     checkSite(deps, sitename)
-    host = deps["dbI"].get("hosts", limit=1, search=[["ip", item.ip]])
+    host = await deps["dbI"].get("hosts", limit=1, search=[["ip", item.ip]])
     if not host:
         fpath = os.path.join(deps["config"].get(sitename, "privatedir"), "HostData")
         fname = os.path.join(fpath, item.hostname, "hostinfo.json")
@@ -244,25 +284,13 @@ async def addhost(
             "insertdate": getUTCnow(),
             "updatedate": getUTCnow(),
             "hostinfo": fname,
+            "version": 1,
         }
         dumpFileContentAsJson(fname, item.dict())
-        deps["dbI"].insert("hosts", [out])
-        return APIResponse.genResponse(request, {"status": "ADDED"})
-    out = {
-        "id": host[0]["id"],
-        "hostname": item.hostname,
-        "ip": item.ip,
-        "insertdate": getUTCnow(),
-        "updatedate": getUTCnow(),
-        "hostinfo": host[0]["hostinfo"],
-    }
-    # Check if there is a data update
-    if "nodatachange" in item.dict() and item.nodatachange:
-        deps["dbI"].update("hosts", [{"id": host[0]["id"], "updatedate": getUTCnow()}])
-    else:
-        dumpFileContentAsJson(host[0]["hostinfo"], item.dict())
-        deps["dbI"].update("hosts", [out])
-    return APIResponse.genResponse(request, {"status": "UPDATED"})
+        await deps["dbI"].insert("hosts", [out])
+        return APIResponse.genResponse(request, {"status": "ADDED", "version": 1})
+    version = await _updateHostInfo(deps, host[0], item)
+    return APIResponse.genResponse(request, {"status": "UPDATED", "version": version})
 
 
 # update (PUT)
@@ -276,7 +304,11 @@ async def addhost(
         **{
             200: {
                 "description": "Host updated successfully",
-                "content": {"application/json": {"example": {"status": "UPDATED"}}},
+                "content": {"application/json": {"example": {"status": "UPDATED", "version": 4}}},
+            },
+            409: {
+                "description": "Host report version (patch base or heartbeat) does not match Frontend. Agent must send full report.",
+                "content": {"application/json": {"example": {"detail": "Host report version mismatch. Frontend has version 3. Send full report."}}},
             },
             404: {
                 "description": "Not Found. Possible Reasons:\n - No sites configured in the system.\n - Host does not exist in the database.",
@@ -307,28 +339,14 @@ async def updatehost(
     - If the host does not exist, it will raise an exception.
     """
     checkSite(deps, sitename)
-    host = deps["dbI"].get("hosts", limit=1, search=[["ip", item.ip]])
-    if host:
-        out = {
-            "id": host[0]["id"],
-            "hostname": item.hostname,
-            "ip": item.ip,
-            "insertdate": getUTCnow(),
-            "updatedate": getUTCnow(),
-            "hostinfo": host[0]["hostinfo"],
-        }
-        # Check if there is a data update
-        if "nodatachange" in item.dict() and item.nodatachange:
-            deps["dbI"].update("hosts", [{"id": host[0]["id"], "updatedate": getUTCnow()}])
-        else:
-            dumpFileContentAsJson(host[0]["hostinfo"], item.dict())
-            deps["dbI"].update("hosts", [out])
-    else:
+    host = await deps["dbI"].get("hosts", limit=1, search=[["ip", item.ip]])
+    if not host:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="This host is not in db. Use POST to add new host.",
         )
-    return APIResponse.genResponse(request, {"status": "UPDATED"})
+    version = await _updateHostInfo(deps, host[0], item)
+    return APIResponse.genResponse(request, {"status": "UPDATED", "version": version})
 
 
 # delete (DELETE)
@@ -376,12 +394,12 @@ async def deletehost(
     """
     checkSite(deps, sitename)
     # Delete all servicestates related to this host (even host is not found, we need to clean servicestates)
-    deps["dbI"].delete("servicestates", [["hostname", item.hostname]])
+    await deps["dbI"].delete("servicestates", [["hostname", item.hostname]])
     # Delete host entries
-    host = deps["dbI"].get("hosts", limit=1, search=[["ip", item.ip], ["hostname", item.hostname]])
+    host = await deps["dbI"].get("hosts", limit=1, search=[["ip", item.ip], ["hostname", item.hostname]])
     if host:
         removeFile(host[0].get("hostinfo", ""))
-        deps["dbI"].delete("hosts", [["id", host[0]["id"]]])
+        await deps["dbI"].delete("hosts", [["id", host[0]["id"]]])
     else:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
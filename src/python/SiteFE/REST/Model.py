@@ -100,7 +100,7 @@ async def getModelInfo(
     checkSite(deps, sitename)
     try:
         if current:
-            outmodels = depGetModel(deps["dbI"], limit=1, orderby=["insertdate", "DESC"])[0]
+            outmodels = (await depGetModel(deps["dbI"], limit=1, orderby=["insertdate", "DESC"]))[0]
             # Check IF_MODIFIED_SINCE from request headers
             if outmodels["insertdate"] < getModTime(request.headers):
                 return Response(
@@ -135,7 +135,7 @@ async def getModelInfo(
                 headers=headers,
             )
         # If current is not set, return all models (based on limit)
-        outmodels = depGetModel(deps["dbI"], limit=limit, orderby=["insertdate", "DESC"])
+        outmodels = await depGetModel(deps["dbI"], limit=limit, orderby=["insertdate", "DESC"])
         models = []
         for model in outmodels:
             tmpDict = {
@@ -212,7 +212,7 @@ async def getModelByID(
     """
     # Get model by ID
     try:
-        model = depGetModel(deps["dbI"], modelID=modelID, limit=1)[0]
+        model = (await depGetModel(deps["dbI"], modelID=modelID, limit=1))[0]
         # Check IF_MODIFIED_SINCE from request headers
         if model["insertdate"] < getModTime(request.headers):
             return Response(
@@ -12,7 +12,7 @@ Date                    : 2025/07/14
 
 import os
 import traceback
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 import httpx
 from fastapi import (
@@ -42,6 +42,7 @@ from SiteRMLibs.MainUtilities import (
     getUTCnow,
     jsondumps,
 )
+from SiteRMLibs.SNMPCounters import getSNMPCounters, writeSNMPCounters
 
 router = APIRouter()
 
@@ -131,7 +132,7 @@ async def prometheuspassthrough(
     checkSite(deps, sitename)
     # Placeholder for actual implementation
     # This should check if the hostname is valid and then forward the request to the appropriate Prometheus endpoint
-    hostdata = deps["dbI"].get(
+    hostdata = await deps["dbI"].get(
         "hosts",
         orderby=["updatedate", "DESC"],
         limit=1,
@@ -217,7 +218,7 @@ async def getmonitoringstats(
     Get monitoring statistics for a specific site.
     """
     checkSite(deps, sitename)
-    return APIResponse.genResponse(request, deps["dbI"].get("snmpmon", orderby=["updatedate", "DESC"], limit=limit))
+    return APIResponse.genResponse(request, await deps["dbI"].get("snmpmon", orderby=["updatedate", "DESC"], limit=limit))
 
 
 @router.post(
@@ -250,7 +251,7 @@ async def postmonitoringstats(
     Post monitoring statistics for a specific site.
     """
     checkSite(deps, sitename)
-    host = deps["dbI"].get("snmpmon", limit=1, search=[["hostname", item.hostname]])
+    host = await deps["dbI"].get("snmpmon", limit=1, search=[["hostname", item.hostname]])
     updatestate = "UPDATED"
     if host:
         out = {
@@ -259,7 +260,7 @@ async def postmonitoringstats(
             "updatedate": getUTCnow(),
             "output": jsondumps(item.output),
         }
-        deps["dbI"].update("snmpmon", [out])
+        await deps["dbI"].update("snmpmon", [out])
     else:
         out = {
             "hostname": item.hostname,
@@ -268,5 +269,63 @@ async def postmonitoringstats(
             "output": jsondumps(item.output),
         }
         updatestate = "INSERTED"
-        deps["dbI"].insert("snmpmon", [out])
+        await deps["dbI"].insert("snmpmon", [out])
+    # Memory and disk statistics are not interface counters
+    if not item.hostname.startswith(("hostnamemem-", "hostnamedisk-")):
+        await deps["dbI"].run(writeSNMPCounters, deps["dbI"].sync, item.hostname, item.output)
     return APIResponse.genResponse(request, {"Status": updatestate})
+
+
+# =========================================================
+# /{sitename}/monitoring/counters
+# =========================================================
+@router.get(
+    "/{sitename}/monitoring/counters",
+    summary="Get SNMP Interface Counters for Site",
+    description=("Retrieves SNMP interface counters. Without start/end only last values are returned, otherwise samples in the time range."),
+    tags=["Monitoring Metrics"],
+    responses={
+        **{
+            200: {
+                "description": "Interface counters",
+                "content": {
+                    "application/json": {
+                        "example": [
+                            {
+                                "hostname": "dellos9_s0",
+                                "ifindex": "2097156",
+                                "metric": "ifHCInOctets",
+                                "labels": {"ifDescr": "hundredGigE 1/1", "ifType": "6", "ifAlias": ""},
+                                "lastvalue": 123456789.0,
+                                "updatedate": 1753031057,
+                                "samples": [[1753030757, 123400000.0], [1753031057, 123456789.0]],
+                            }
+                        ]
+                    }
+                },
+            },
+        },
+        **DEFAULT_RESPONSES,
+    },
+)
+async def getmonitoringcounters(
+    request: Request,
+    sitename: str = Path(
+        ...,
+        description="The site name to retrieve the interface counters for.",
+        examples=[startupConfig.get("SITENAME", "default")],
+    ),
+    hostname: Optional[str] = Query(None, description="Device name to filter counters by."),
+    ifindex: Optional[str] = Query(None, description="Interface index to filter counters by."),
+    metric: Optional[str] = Query(None, description="Metric (e.g. ifHCInOctets) to filter counters by."),
+    start: Optional[int] = Query(None, description="Return samples newer or equal to this timestamp.", ge=0),
+    end: Optional[int] = Query(None, description="Return samples older or equal to this timestamp.", ge=0),
+    deps=Depends(apiReadDeps),
+    _forbid=Depends(forbidExtraQueryParams("hostname", "ifindex", "metric", "start", "end")),
+):
+    """
+    Get SNMP interface counters (last values or samples in time range) for a specific site.
+    """
+    checkSite(deps, sitename)
+    out = await deps["dbI"].run(getSNMPCounters, deps["dbI"].sync, hostname, ifindex, metric, start, end)
+    return APIResponse.genResponse(request, out)
@@ -50,7 +50,7 @@ startupConfig = getstartupconfig()
 # =========================================================
 
 
-def __updateServiceData(item, sitename, dbI, config):
+async def __updateServiceData(item, sitename, dbI, config):
     """Update service data in the database."""
     servicest = "Undefined"
     fpath = os.path.join(config.get(sitename, "privatedir"), "ServiceData")
@@ -67,15 +67,15 @@ def __updateServiceData(item, sitename, dbI, config):
         search.append(["hostname", item.hostname])
     if item.servicename:
         search.append(["servicename", item.servicename.value])
-    host = dbI.get("services", limit=1, search=search)
+    host = await dbI.get("services", limit=1, search=search)
     if not host:
         dumpFileContentAsJson(fname, item.model_dump(mode="json"))
-        dbI.insert("services", [out])
+        await dbI.insert("services", [out])
         servicest = "ADDED"
     else:
         out["id"] = host[0]["id"]
         dumpFileContentAsJson(fname, item.model_dump(mode="json"))
-        dbI.update("services", [out])
+        await dbI.update("services", [out])
         servicest = "UPDATED"
     return {"Status": servicest}
 
@@ -170,7 +170,7 @@ async def getservice(
         search.append(["hostname", hostname])
     if servicename:
         search.append(["servicename", servicename.value])
-    return APIResponse.genResponse(request, deps["dbI"].get("services", search=search))
+    return APIResponse.genResponse(request, await deps["dbI"].get("services", search=search))
 
 
 # POST
@@ -205,7 +205,7 @@ async def createservice(
     Create a new service state in the database.
     """
     checkSite(deps, sitename)
-    return APIResponse.genResponse(request, __updateServiceData(item, sitename, deps["dbI"], deps["config"]))
+    return APIResponse.genResponse(request, await __updateServiceData(item, sitename, deps["dbI"], deps["config"]))
 
 
 # PUT
@@ -240,7 +240,7 @@ async def updateservice(
     Update an existing service state in the database.
     """
     checkSite(deps, sitename)
-    return APIResponse.genResponse(request, __updateServiceData(item, sitename, deps["dbI"], deps["config"]))
+    return APIResponse.genResponse(request, await __updateServiceData(item, sitename, deps["dbI"], deps["config"]))
 
 
 # DELETE
@@ -296,14 +296,14 @@ async def deleteservice(
         search.append(["hostname", hostname])
     if servicename:
         search.append(["servicename", servicename.value])
-    host = deps["dbI"].get("services", limit=1, search=search)
+    host = await deps["dbI"].get("services", limit=1, search=search)
     if not host:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Service with hostname '{hostname}' and servicename '{servicename.value}' not found.",
         )
     # Delete from services
-    deps["dbI"].delete("services", [["id", host[0]["id"]]])
+    await deps["dbI"].delete("services", [["id", host[0]["id"]]])
     return APIResponse.genResponse(request, {"Status": f"DELETED {host[0]['hostname']}"})
 
 
@@ -369,7 +369,7 @@ async def getservicestates(
     checkSite(deps, sitename)
     return APIResponse.genResponse(
         request,
-        deps["dbI"].get("servicestates", orderby=["updatedate", "DESC"], limit=limit),
+        await deps["dbI"].get("servicestates", orderby=["updatedate", "DESC"], limit=limit),
     )
 
 
@@ -418,19 +418,7 @@ async def addservicestate(
             "updatedate": getUTCnow(),
             "exc": str(item.exc)[:4095],
         }
-        services = deps["dbI"].get(
-            "servicestates",
-            search=[
-                ["hostname", item.hostname],
-                ["servicename", item.servicename.value],
-            ],
-        )
-        if services:
-            dbOut["id"] = services[0]["id"]
-            del dbOut["insertdate"]
-            deps["dbI"].update("servicestates", [dbOut])
-        else:
-            deps["dbI"].insert("servicestates", [dbOut])
+        await deps["dbI"].upsert("servicestates", [dbOut], ["hostname", "servicename"])
     except Exception as ex:
         print(f"Full traceback: {traceback.format_exc()}")
         raise Exception(f"Error details in reportServiceStatus. Exc: {str(ex)}") from ex
@@ -473,12 +461,12 @@ async def deleteservicestate(
     """
     checkSite(deps, sitename)
     try:
-        services = deps["dbI"].get(
+        services = await deps["dbI"].get(
             "servicestates",
             search=[["hostname", hostname], ["servicename", servicename.value]],
         )
         if services:
-            deps["dbI"].delete(
+            await deps["dbI"].delete(
                 "servicestates",
                 [["hostname", hostname], ["servicename", servicename.value]],
             )
@@ -547,7 +535,7 @@ async def getserviceaction(
         search.append(["hostname", hostname])
     if servicename:
         search.append(["servicename", servicename.value])
-    actions = deps["dbI"].get("serviceaction", search=search, limit=limit)
+    actions = await deps["dbI"].get("serviceaction", search=search, limit=limit)
     if not actions:
         return APIResponse.genResponse(request, [])
     return APIResponse.genResponse(request, actions)
@@ -594,7 +582,7 @@ async def serviceaction(
         services = HOSTSERVICES
     else:
         services = [item.servicename.value]
-    runningServices = deps["dbI"].get("servicestates")
+    runningServices = await deps["dbI"].get("servicestates")
     dbOuts = []
     for service in runningServices:
         add = False
@@ -604,7 +592,7 @@ async def serviceaction(
             elif item.hostname == "ALL":
                 add = True
             else:
-                statein = deps["dbI"].get(
+                statein = await deps["dbI"].get(
                     "serviceaction",
                     search=[
                         ["hostname", service["hostname"]],
@@ -621,7 +609,7 @@ async def serviceaction(
                 "serviceaction": item.action,
                 "insertdate": getUTCnow(),
             }
-            deps["dbI"].insert("serviceaction", [dbOut])
+            await deps["dbI"].insert("serviceaction", [dbOut])
             dbOuts.append(dbOut)
     if not dbOuts:
         raise HTTPException(
@@ -679,13 +667,13 @@ async def deleteserviceaction(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No hostname or servicename provided to delete service action.",
         )
-    actions = deps["dbI"].get("serviceaction", search=search)
+    actions = await deps["dbI"].get("serviceaction", search=search)
     if not actions:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Service action not found for the given parameters.",
         )
-    deps["dbI"].delete("serviceaction", search)
+    await deps["dbI"].delete("serviceaction", search)
     return APIResponse.genResponse(request, {"Status": f"Deleted {hostname} {servicename.value} {action}"})
 
 
@@ -752,16 +740,20 @@ async def setinstancestartend(
     """
     checkSite(deps, sitename)
     # Validate that these entries are known...
-    activeDeltas = deps["dbI"].get("activeDeltas", orderby=["updatedate", "DESC"], limit=1)
+    activeDeltas = await deps["dbI"].get("activeDeltas", orderby=["updatedate", "DESC"], limit=1)
     if not activeDeltas:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No Active Deltas found.")
 
-    activeDeltas = activeDeltas[0]
-    activeDeltas["output"] = evaldict(activeDeltas["output"])
-    found = False
-    for key in ["singleport", "kube", "vsw", "rst"]:
-        if item.instanceid in activeDeltas.get("output", {}).get(key, {}):
-            found = True
+    # Only rows of this instance are read
+    instanceItems = await deps["dbI"].get("activeDeltasItems", search=[["itemkey", item.instanceid]], columns=["itemtype"])
+    found = any(instItem["itemtype"] in ["singleport", "kube", "vsw", "rst"] for instItem in instanceItems)
+    if not instanceItems:
+        # Active deltas written before activeDeltasItems table was introduced
+        activeDeltas = activeDeltas[0]
+        activeDeltas["output"] = evaldict(activeDeltas["output"])
+        for key in ["singleport", "kube", "vsw", "rst"]:
+            if item.instanceid in activeDeltas.get("output", {}).get(key, {}):
+                found = True
     if not found:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -774,5 +766,5 @@ async def setinstancestartend(
         "endtimestamp": item.endtimestamp,
         "starttimestamp": item.starttimestamp,
     }
-    insOut = deps["dbI"].insert("instancestartend", [out])
+    insOut = await deps["dbI"].insert("instancestartend", [out])
     return APIResponse.genResponse(request, {"Status": insOut[0], "ID": insOut[2]})
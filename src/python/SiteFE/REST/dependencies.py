@@ -34,12 +34,12 @@ from SiteRMLibs.MainUtilities import (
     encodebase64,
     firstRunFinished,
     getAllFileContent,
-    getDBConnObj,
+    getAsyncDBConnObj,
     getUTCnow,
 )
 
 DEP_CONFIG = getGitConfig()
-DEP_DBOBJ = getDBConnObj()
+DEP_DBOBJ = getAsyncDBConnObj(DEP_CONFIG)
 DEP_STATE_MACHINE = ST.StateMachine(DEP_CONFIG)
 AUTH_HANDLER = AuthHandler()
 
@@ -178,26 +178,26 @@ def depGetModelContent(dbentry, **kwargs):
     return getAllFileContent(f"{dbentry['fileloc']}.{rettype}")
 
 
-def depGetModel(dbI, **kwargs):
+async def depGetModel(dbI, **kwargs):
     """Get all models."""
     orderby = kwargs.get("orderby", ["insertdate", "DESC"])
     if not kwargs.get("modelID"):
-        models = dbI.get("models", limit=kwargs.get("limit", 10), orderby=orderby)
+        models = await dbI.get("models", limit=kwargs.get("limit", 10), orderby=orderby)
         if not models:
             raise ModelNotFound("No models in database. First time run?")
         return models
-    model = dbI.get("models", limit=1, search=[["uid", kwargs["modelID"]]])
+    model = await dbI.get("models", limit=1, search=[["uid", kwargs["modelID"]]])
     if not model:
         raise ModelNotFound(f"Model with {kwargs['modelID']} id was not found in the system")
     return model
 
 
-def checkReadyState(deps):
+async def checkReadyState(deps):
     """Check if the system is ready for delta and model operations."""
     if not (firstRunFinished("LookUpService") and firstRunFinished("ProvisioningService")):
         return False
     # Check database connection.
-    return deps["dbI"].isDBReady()
+    return await deps["dbI"].isDBReady()
 
 
 def checkSite(deps, sitename: str):
@@ -26,7 +26,13 @@ import sys
 from easysnmp import Session
 from easysnmp.exceptions import EasySNMPTimeoutError, EasySNMPUnknownObjectIDError
 from prometheus_client import CollectorRegistry, Enum, Gauge, Info, generate_latest
+from prometheus_client.core import (
+    CounterMetricFamily,
+    GaugeMetricFamily,
+    HistogramMetricFamily,
+)
 from SiteRMLibs.Backends.main import Switch
+from SiteRMLibs.DBStats import DB_STATS_BUCKETS, loadStats
 from SiteRMLibs.DefaultParams import SERVICE_DEAD_TIMEOUT, SERVICE_DOWN_TIMEOUT
 from SiteRMLibs.GitConfig import getGitConfig
 from SiteRMLibs.MainUtilities import (
@@ -39,10 +45,10 @@ from SiteRMLibs.MainUtilities import (
     getSiteNameFromConfig,
     getUTCnow,
     getVal,
-    isValFloat,
     jsondumps,
 )
 from SiteRMLibs.MemDiskStats import MemDiskStats
+from SiteRMLibs.SNMPCounters import LABEL_KEYS, getSNMPCounters, writeSNMPCounters
 from SiteRMLibs.Warnings import Warnings
 
 
@@ -202,6 +208,38 @@ class Topology:
         self.diragent.dumpFileContentAsJson(fname, out)
 
 
+class DBStatsCollector:
+    """Database query and connection pool statistics (of all SiteRM processes) collector for prometheus output"""
+
+    @staticmethod
+    def collect():
+        """Collect database query count, latency histogram, slow query count and connection pool usage"""
+        labels = ["service", "table", "operation"]
+        histogram = HistogramMetricFamily("database_query_duration_seconds", "Database query duration", labels=labels)
+        slowQueries = CounterMetricFamily("database_slow_queries", "Database queries slower than slow query threshold", labels=labels)
+        queryStats, poolStats = loadStats()
+        for key, vals in queryStats.items():
+            buckets, cumulative = [], 0
+            for bucket, count in zip(DB_STATS_BUCKETS, vals["buckets"]):
+                cumulative += count
+                buckets.append(("+Inf" if bucket == float("inf") else str(bucket), cumulative))
+            histogram.add_metric(list(key), buckets, vals["sum"])
+            slowQueries.add_metric(list(key), vals["slow"])
+        yield histogram
+        yield slowQueries
+        poolMetrics = {
+            "size": GaugeMetricFamily("database_pool_size", "Database connection pool size", labels=["service"]),
+            "checkedout": GaugeMetricFamily("database_pool_checked_out", "Database connections checked out from pool", labels=["service"]),
+            "overflow": GaugeMetricFamily("database_pool_overflow", "Database connections opened over pool size", labels=["service"]),
+            "waiting": GaugeMetricFamily("database_pool_waiting", "Database calls waiting for a free worker", labels=["service"]),
+            "timeouts": CounterMetricFamily("database_pool_timeouts", "Database connection pool checkout timeouts", labels=["service"]),
+        }
+        for service, vals in poolStats.items():
+            for key, metric in poolMetrics.items():
+                metric.add_metric([service], vals[key])
+        yield from poolMetrics.values()
+
+
 class ActiveWrapper:
     """Active State and QoS Wrapper to report in prometheus format"""
 
@@ -377,7 +415,7 @@ class PromOut:
 
     def __getSwitchErrors(self, registry):
         """Add Switch Errors to prometheus output"""
-        dbOut = self.dbI.get("switch")
+        dbOut = self.dbI.get("switch", columns=["device", "error"])
         switchErrorsGauge = Gauge(
             "switch_errors",
             "Switch Errors",
@@ -421,30 +459,25 @@ class PromOut:
             if item["hostname"].startswith("hostnamedisk-"):
                 self.diskMonitor[item["hostname"]] = out
                 continue
-            for key, val in out.items():
-                if key == "macs":
-                    if "vlans" in val:
-                        for key1, macs in val["vlans"].items():
-                            incr = 0
-                            for macaddr in macs:
-                                labels = {
-                                    "vlan": key1,
-                                    "hostname": item["hostname"],
-                                    "incr": str(incr),
-                                }
-                                macState.labels(**labels).info({"macaddress": macaddr})
-                                incr += 1
-                    continue
-                keys = {
-                    "ifDescr": val.get("ifDescr", ""),
-                    "ifType": val.get("ifType", ""),
-                    "ifAlias": val.get("ifAlias", ""),
-                    "hostname": item["hostname"],
-                }
-                for key1 in self.config["MAIN"]["snmp"]["mibs"]:
-                    if key1 in val and isValFloat(val[key1]):
-                        keys["Key"] = key1
-                        snmpGauge.labels(**keys).set(val[key1])
+            for key1, macs in out.get("macs", {}).get("vlans", {}).items():
+                incr = 0
+                for macaddr in macs:
+                    labels = {
+                        "vlan": key1,
+                        "hostname": item["hostname"],
+                        "incr": str(incr),
+                    }
+                    macState.labels(**labels).info({"macaddress": macaddr})
+                    incr += 1
+        # Interface counters (last values) from SNMP counters store
+        mibs = self.config["MAIN"]["snmp"]["mibs"]
+        for item in getSNMPCounters(self.dbI):
+            if item["metric"] not in mibs or int(self.timenow - item["updatedate"]) > SERVICE_DOWN_TIMEOUT:
+                continue
+            keys = {key: item["labels"].get(key, "") for key in LABEL_KEYS}
+            keys["hostname"] = item["hostname"]
+            keys["Key"] = item["metric"]
+            snmpGauge.labels(**keys).set(item["lastvalue"])
 
     def __getActiveQoSStates(self, registry):
         """Report in prometheus NetworkStatus and QoS Params"""
@@ -555,6 +588,7 @@ class PromOut:
         self.__diskStats(registry)
         self.__getSwitchErrors(registry)
         self.__getActiveQoSStates(registry)
+        registry.register(DBStatsCollector())
 
     def metrics(self):
         """Return all available Hosts, where key is IP address."""
@@ -668,12 +702,7 @@ class SNMPMonitoring(Warnings):
             "hostname": host,
             "output": jsondumps(output),
         }
-        dbOut = self.dbI.get("snmpmon", limit=1, search=[["hostname", host]])
-        if dbOut:
-            out["id"] = dbOut[0]["id"]
-            self.dbI.update("snmpmon", [out])
-        else:
-            self.dbI.insert("snmpmon", [out])
+        self.dbI.upsert("snmpmon", [out], ["hostname"])
 
     def _isVlanAllowed(self, host, vlan):
         """Check if a VLAN is allowed for a switch/host"""
@@ -759,6 +788,7 @@ class SNMPMonitoring(Warnings):
                     out[indx][key] = item.value.replace("\x00", "")
             out["macs"] = macs[host]
             self._writeToDB(host, out)
+            writeSNMPCounters(self.dbI, host, out)
         self.logger.info(f"[{self.sitename}]: SNMP Monitoring finished for {len(self.switches)} switches")
         # Get Memory and Disk Statistics
         self.getMemStats()
@@ -10,9 +10,11 @@ Date: 2022/01/29
 import copy
 import socket
 import sys
+import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
-from deepdiff import DeepDiff
 from SiteRMAgent import __version__
 from SiteRMAgent.RecurringActions.Plugins.ArpInfo import ArpInfo
 from SiteRMAgent.RecurringActions.Plugins.CertInfo import CertInfo
@@ -24,19 +26,28 @@ from SiteRMLibs.CustomExceptions import (
     PluginFatalException,
     ServiceWarning,
 )
+from SiteRMLibs.DictPatch import diffDicts
 from SiteRMLibs.GitConfig import getGitConfig
 from SiteRMLibs.HTTPLibrary import Requests
 from SiteRMLibs.MainUtilities import (
     contentDB,
     createDirs,
+    evaldict,
     getFullUrl,
     getLoggingObject,
     getSiteNameFromConfig,
     getUTCnow,
+    jsondumps,
 )
 from SiteRMLibs.MemDiskStats import MemDiskStats
 
 COMPONENT = "RecurringAction"
+PLUGINS = {
+    "CertInfo": CertInfo,
+    "KubeInfo": KubeInfo,
+    "NetInfo": NetInfo,
+    "ArpInfo": ArpInfo,
+}
 
 
 class RecurringAction:
@@ -49,22 +60,24 @@ class RecurringAction:
         self.sitename = sitename
         self.classes = {}
         self._loadClasses()
+        # Plugins are collected in parallel (one worker per plugin, also for plugins enabled on config refresh).
+        # Running (possibly hanging) plugin is not started again, its last successful output is reported instead.
+        self.executor = ThreadPoolExecutor(max_workers=len(PLUGINS), thread_name_prefix="plugin")
+        self.running = {}
+        self.pluginCache = {}
         self.hostname = socket.getfqdn()
         self.agent = contentDB()
         fullUrl = getFullUrl(self.config)
         self.requestHandler = Requests(url=fullUrl, logger=self.logger)
         self.memDiskStats = MemDiskStats()
+        # Last report (without dates) acknowledged by FE and its version
         self.lastout = {}
+        self.lastversion = None
 
     def _loadClasses(self):
         """Load all classes"""
         disabledPlugins = self.config.get("agent", "disabled_plugins", [])
-        for name, plugin in {
-            "CertInfo": CertInfo,
-            "KubeInfo": KubeInfo,
-            "NetInfo": NetInfo,
-            "ArpInfo": ArpInfo,
-        }.items():
+        for name, plugin in PLUGINS.items():
             if name in disabledPlugins:
                 continue
             self.classes[name] = plugin(self.config, self.logger)
@@ -72,11 +85,16 @@ class RecurringAction:
     def refreshthread(self):
         """Call to refresh thread for this specific class and reset parameters"""
         self.config = getGitConfig()
+        # New plugin instances - runs and outputs of previous instances are not tracked anymore
+        self.classes = {}
+        self.running = {}
+        self.pluginCache = {}
         self._loadClasses()
         fullUrl = getFullUrl(self.config)
         self.requestHandler.close()
         self.requestHandler = Requests(url=fullUrl, logger=self.logger)
         self.lastout = {}
+        self.lastversion = None
 
     def reportMemDiskStats(self):
         """Report memory and disk statistics."""
@@ -108,20 +126,57 @@ class RecurringAction:
         )
         self.logger.info("Memory and disk statistics reported successfully.")
 
+    @staticmethod
+    def _runPlugin(method):
+        """Run plugin get and return output with runtime"""
+        startTime = time.time()
+        out = method.get()
+        return out, time.time() - startTime
+
+    def _getPluginTimeout(self, tmpName):
+        """Get plugin timeout (seconds)"""
+        return int(self.config.get("agent", "plugin_timeouts").get(tmpName, self.config.get("agent", "plugin_timeout")))
+
+    def _collectPlugin(self, tmpName, deadline, pluginStats):
+        """Wait for plugin output until deadline. On timeout, return cached output of previous run (if any)."""
+        future = self.running[tmpName]
+        try:
+            tmp, runtime = future.result(timeout=max(deadline - time.time(), 0))
+        except FutureTimeoutError:
+            pluginStats[tmpName] = {"status": "timeout", "runtime": self._getPluginTimeout(tmpName), "stale": tmpName in self.pluginCache}
+            if tmpName in self.pluginCache:
+                self.logger.warning(f"Plugin {tmpName} did not finish in {self._getPluginTimeout(tmpName)} seconds. Reporting output of previous run.")
+                return copy.deepcopy(self.pluginCache[tmpName])
+            raise TimeoutError(f"Plugin {tmpName} did not finish in {self._getPluginTimeout(tmpName)} seconds and there is no previous output.") from None
+        except Exception:
+            pluginStats[tmpName] = {"status": "error", "runtime": 0, "stale": False}
+            raise
+        pluginStats[tmpName] = {"status": "ok", "runtime": round(runtime, 3), "stale": False}
+        if not isinstance(tmp, dict):
+            msg = f"Returned output from {tmpName} method is not a dictionary. Type: {type(tmp)}"
+            self.logger.error(msg)
+            raise ValueError(msg)
+        # postProcess of other plugins modifies output in place, cache untouched copy
+        self.pluginCache[tmpName] = copy.deepcopy(tmp)
+        return tmp
+
     def prepareJsonOut(self):
-        """Executes all plugins and prepares json output to FE."""
+        """Executes all plugins (in parallel) and prepares json output to FE."""
         excMsg = ""
         outputDict = {"Summary": {}}
         tmpName = None
         raiseError = False
+        deadlines = {}
         for tmpName, method in self.classes.items():
+            deadlines[tmpName] = time.time() + self._getPluginTimeout(tmpName)
+            if tmpName in self.running and not self.running[tmpName].done():
+                self.logger.warning(f"Plugin {tmpName} from previous run is still running. Will not start it again.")
+                continue
+            self.running[tmpName] = self.executor.submit(self._runPlugin, method)
+        pluginStats = {}
+        for tmpName in self.classes:
             try:
-                tmp = method.get()
-                if not isinstance(tmp, dict):
-                    msg = f"Returned output from {tmpName} method is not a dictionary. Type: {type(tmp)}"
-                    self.logger.error(msg)
-                    raise ValueError(msg)
-                outputDict[tmpName] = tmp
+                outputDict[tmpName] = self._collectPlugin(tmpName, deadlines[tmpName], pluginStats)
             except NotFoundError as ex:
                 outputDict[tmpName] = {
                     "errorType": "NotFoundError",
@@ -158,6 +213,10 @@ class RecurringAction:
         # Post processing of output (allows any class to modify output based on other Plugins output)
         for tmpName, method in self.classes.items():
             warnings = ""
+            if not self.running[tmpName].done():
+                # Plugin get is still running on the same instance (shares plugin state)
+                self.logger.warning(f"Plugin {tmpName} is still running. Skipping its post processing.")
+                continue
             try:
                 postMethod = getattr(method, "postProcess", None)
                 if postMethod:
@@ -174,6 +233,7 @@ class RecurringAction:
                 warnings = ""
         if raiseError:
             raise PluginException(excMsg)
+        outputDict["pluginstats"] = pluginStats
         return outputDict, excMsg, raiseError
 
     def appendConfig(self, dic):
@@ -190,21 +250,32 @@ class RecurringAction:
         dic["Summary"]["config"]["general"]["metadata"].setdefault("version", __version__)
         return dic
 
-    def comparediff(self, newdic):
-        """Compare if 2 dictionaries are different."""
-        tmpcopy = copy.deepcopy(newdic)
-        tmpcopy.pop("updatedate", None)
-        tmpcopy.pop("insertdate", None)
-        if not self.lastout:
-            self.lastout = tmpcopy
-            return True
-        diff = DeepDiff(self.lastout, newdic, ignore_order=True)
-        if diff:
+    def comparediff(self, report):
+        """Get patch of report (without dates) against last report acknowledged by FE.
+        Returns None if there is no acknowledged report (full report must be sent)."""
+        if not self.lastout or self.lastversion is None:
+            return None
+        patch = diffDicts(self.lastout, report)
+        if patch:
             self.logger.debug("Agent find differences in machine state:")
-            self.logger.debug(diff.to_json(indent=2))
-            self.lastout = tmpcopy
-            return True
-        return False
+            self.logger.debug(jsondumps(patch))
+        return patch
+
+    def _acknowledged(self, outVals, report):
+        """Remember report and version acknowledged by FE"""
+        self.lastout = report
+        self.lastversion = outVals[0].get("version") if isinstance(outVals[0], dict) else None
+
+    def _sendUpdate(self, data):
+        """Send host update (PUT) to FE"""
+        return self.requestHandler.makeHttpCall(
+            "PUT",
+            f"/api/{self.sitename}/hosts",
+            data=data,
+            retries=1,
+            raiseEx=False,
+            useragent="Agent",
+        )
 
     def startwork(self):
         """Execute main script for SiteRM Agent output preparation."""
@@ -212,44 +283,42 @@ class RecurringAction:
         createDirs(workDir)
         dic, excMsg, raiseError = self.prepareJsonOut()
         dic = self.appendConfig(dic)
-
-        diffFromLast = self.comparediff(dic)
-        self.logger.info("Output from Agent is different from last sent: %s", diffFromLast)
-        if not diffFromLast:
+        # Compare JSON form of report (same as stored by FE), without dates.
+        report = evaldict(jsondumps(dic))
+        for key in ["updatedate", "insertdate", "pluginstats"]:
+            report.pop(key, None)
+        patch = self.comparediff(report)
+        self.logger.info("Output from Agent is different from last sent: %s", patch != [])
+        sendFull = True
+        tmpdic = {
+            "hostname": dic["hostname"],
+            "ip": dic["ip"],
+            "updatedate": dic["updatedate"],
+            "insertdate": dic["insertdate"],
+        }
+        if patch == []:
             self.agent.dumpFileContentAsJson(workDir + "/latest-out.json", dic)
             # No need to send same data again, we just update timestamp.
             self.logger.info("Will Inform FE that Agent is alive.")
-            tmpdic = {
-                "hostname": dic["hostname"],
-                "ip": dic["ip"],
-                "updatedate": dic["updatedate"],
-                "insertdate": dic["insertdate"],
-                "nodatachange": True,
-            }
-            outVals = self.requestHandler.makeHttpCall(
-                "PUT",
-                f"/api/{self.sitename}/hosts",
-                data=tmpdic,
-                retries=1,
-                raiseEx=False,
-                useragent="Agent",
-            )
+            outVals = self._sendUpdate({**tmpdic, "nodatachange": True, "version": self.lastversion})
             if outVals[1] == 200:
                 self.logger.info("FE informed that Agent is alive.")
-            else:
-                diffFromLast = True  # If we could not update timestamp, we will try to send full data again.
-        if diffFromLast:
+                sendFull = False
+            # If we could not update timestamp (or FE has different version), we will try to send full data again.
+        elif patch:
+            self.logger.info("Will try to publish changes (%s) to SiteFE", len(patch))
+            outVals = self._sendUpdate({**tmpdic, "patch": patch, "baseversion": self.lastversion, "pluginstats": dic["pluginstats"]})
+            self.logger.info("Update Host with changes result %s", outVals)
+            if outVals[1] == 200:
+                self._acknowledged(outVals, report)
+                sendFull = False
+        if sendFull:
             self.logger.info("Will try to publish information to SiteFE")
-            outVals = self.requestHandler.makeHttpCall(
-                "PUT",
-                f"/api/{self.sitename}/hosts",
-                data=dic,
-                retries=1,
-                raiseEx=False,
-                useragent="Agent",
-            )
+            outVals = self._sendUpdate(dic)
             self.logger.info("Update Host result %s", outVals)
-            if outVals[1] != 200:
+            if outVals[1] == 200:
+                self._acknowledged(outVals, report)
+            else:
                 outValsAdd = self.requestHandler.makeHttpCall(
                     "POST",
                     f"/api/{self.sitename}/hosts",
@@ -259,7 +328,9 @@ class RecurringAction:
                     useragent="Agent",
                 )
                 self.logger.info("Insert Host result %s", outValsAdd)
-                if outValsAdd[1] != 200:
+                if outValsAdd[1] == 200:
+                    self._acknowledged(outValsAdd, report)
+                else:
                     excMsg += " Could not publish to SiteFE Frontend."
                     excMsg += f"Update to FE: Error: {outVals[2]} HTTP Code: {outVals[1]}"
                     excMsg += f"Add tp FE: Error: {outValsAdd[2]} HTTP Code: {outValsAdd[1]}"
@@ -7,7 +7,6 @@ Authors:
 Date: 2022/01/29
 """
 
-import copy
 import ipaddress
 import os
 import pprint
@@ -18,8 +17,8 @@ from SiteRMLibs.BWService import BWService
 from SiteRMLibs.CustomExceptions import NotFoundError
 from SiteRMLibs.GitConfig import getGitConfig
 from SiteRMLibs.ipaddr import (
-    getIfAddrStats,
     getIfInterfaceReady,
+    getInterfaceInventory,
     getInterfaceSpeed,
     replaceSpecialSymbols,
 )
@@ -29,6 +28,7 @@ from SiteRMLibs.MainUtilities import (
     getFileContentAsJson,
     getLoggingObject,
 )
+from SiteRMLibs.VlanSet import VlanSet
 
 
 def str2bool(val):
@@ -38,36 +38,6 @@ def str2bool(val):
     return val.lower() in ("yes", "true", "t", "1")
 
 
-def expand_ipv6(netmask):
-    """Expand IPv6 netmask to full form"""
-    parts = netmask.split(":")
-    full_parts = []
-    for part in parts:
-        if part == "":
-            # Add missing parts for "::"
-            missing_parts = 8 - len(parts) + 1
-            full_parts.extend(["0000"] * missing_parts)
-        else:
-            full_parts.append(part.zfill(4))
-    return ":".join(full_parts)
-
-
-def ipv6_netmask_to_prefix_length(netmask):
-    """Convert the netmask to an IPv6Network object"""
-    if not netmask:
-        return netmask
-    try:
-        # Expand the netmask to full form
-        expanded_netmask = expand_ipv6(netmask)
-        # Remove the colons and convert each hexadecimal block to its binary representation
-        binary_str = "".join([bin(int(block, 16))[2:].zfill(16) for block in expanded_netmask.split(":")])
-        # Count the number of '1' bits in the binary string
-        prefix_length = binary_str.count("1")
-        return prefix_length
-    except ValueError:
-        return netmask
-
-
 class NetInfo(BWService):
     """Net Info"""
 
@@ -79,6 +49,7 @@ class NetInfo(BWService):
         self.errors = []
         self.runcount = 0
         self.skipactivecheck = False
+        self.inventory = {}
 
     def countError(self, errmsg):
         """Count and increment errors"""
@@ -202,20 +173,30 @@ class NetInfo(BWService):
             nicInfo["bwParams"]["usedCapacity"] = nicInfo["bwParams"]["maximumCapacity"] - reservedCap
         return netInfo
 
+    @staticmethod
+    def _getfamilyinfo(nic, nicinv):
+        """Get address entries of interface (same format as psutil net_if_addrs)"""
+        out = []
+        for addr in nicinv["addresses"]:
+            address, netmask = addr["address"], addr["prefixlen"]
+            if addr["family"] == 2:
+                netmask = str(ipaddress.IPv4Network(f"0.0.0.0/{addr['prefixlen']}").netmask)
+            elif addr["family"] == 10 and ipaddress.ip_address(address).is_link_local:
+                address = f"{address}%{nic}"
+            out.append({"family": addr["family"], "address": address, "netmask": netmask, "broadcast": addr["broadcast"], "ptp": addr["ptp"]})
+        if nicinv["mac"]:
+            out.append({"family": 17, "address": nicinv["mac"], "netmask": None, "broadcast": nicinv["macbroadcast"], "ptp": None})
+        return out
+
     def _getintfstats(self, netInfo):
         """Get interface stats"""
         privVlans = self.getvlans()
-        tmpifAddr, tmpifStats = getIfAddrStats()
-        nics = externalCommand("ip -br a")
-        for nicline in nics[0].split("\n"):
-            if not nicline:
-                continue
-            nictmp = nicline.split()[0].split("@")
-            nic = nictmp[0]
-            if len(nictmp) == 1 and nictmp[0] in netInfo:
+        self.inventory = getInterfaceInventory()
+        for nic, nicinv in self.inventory.items():
+            if not nicinv["link"] and nic in netInfo:
                 nicInfo = netInfo.setdefault(nic, {})
-            elif len(nictmp) == 2 and nictmp[1] in netInfo:
-                masternic = netInfo.setdefault(nictmp[1], {})
+            elif nicinv["link"] and nicinv["link"] in netInfo:
+                masternic = netInfo.setdefault(nicinv["link"], {})
                 nicInfo = masternic.setdefault("vlans", {}).setdefault(nic, {})
                 vlanid = self.getVlanID(nic, privVlans)
                 if vlanid:
@@ -226,19 +207,17 @@ class NetInfo(BWService):
                         nicInfo["provisioned"] = False
             else:
                 continue
-            if nic not in tmpifAddr:
-                continue
-            for vals in tmpifAddr[nic]:
-                nicInfo.setdefault(str(vals.family.value), [])
-                netmask = ipv6_netmask_to_prefix_length(vals.netmask)
+            for vals in self._getfamilyinfo(nic, nicinv):
+                nicInfo.setdefault(str(vals["family"]), [])
+                netmask = vals["netmask"]
                 familyInfo = {
-                    "family": vals.family.value,
-                    "address": vals.address,
+                    "family": vals["family"],
+                    "address": vals["address"],
                     "netmask": netmask,
                 }
-                if int(vals.family.value) in [2, 10] and vals.address and vals.netmask:
+                if int(vals["family"]) in [2, 10] and vals["address"] and vals["netmask"] is not None:
                     try:
-                        ipwithnetmask = ipaddress.ip_interface(f"{vals.address}/{netmask}")
+                        ipwithnetmask = ipaddress.ip_interface(f"{vals['address']}/{netmask}")
                         if isinstance(ipwithnetmask, ipaddress.IPv4Interface):
                             familyInfo["ipv4-address"] = str(ipwithnetmask)
                         elif isinstance(ipwithnetmask, ipaddress.IPv6Interface):
@@ -247,23 +226,20 @@ class NetInfo(BWService):
                             self.logger.debug(f"This type was not understood by the system. Type: {type(ipwithnetmask)} and value: {str(ipwithnetmask)}")
                     except ValueError:
                         continue
-                elif int(vals.family.value) in [17]:
-                    familyInfo["mac-address"] = vals.address
-                familyInfo["broadcast"] = vals.broadcast
-                familyInfo["ptp"] = vals.ptp
-                if vals.family.value == 2:
-                    familyInfo["UP"] = tmpifStats[nic].isup
-                    familyInfo["duplex"] = tmpifStats[nic].duplex.value
-                    familyInfo["speed"] = tmpifStats[nic].speed
-                    familyInfo["MTU"] = tmpifStats[nic].mtu
-                    # Additional info which is not provided by psutil so far...
+                elif int(vals["family"]) in [17]:
+                    familyInfo["mac-address"] = vals["address"]
+                familyInfo["broadcast"] = vals["broadcast"]
+                familyInfo["ptp"] = vals["ptp"]
+                if vals["family"] == 2:
+                    familyInfo["UP"] = nicinv["isup"]
+                    familyInfo["duplex"] = nicinv["duplex"]
+                    familyInfo["speed"] = nicinv["speed"]
+                    familyInfo["MTU"] = nicinv["mtu"]
                     # More detail information about all types here:
                     # http://lxr.free-electrons.qcom/source/include/uapi/linux/if_arp.h
-                    nicType = externalCommand("cat /sys/class/net/" + nic + "/type")
-                    familyInfo["Type"] = nicType[0].strip()
-                    txQueueLen = externalCommand("cat /sys/class/net/" + nic + "/tx_queue_len")
-                    familyInfo["txqueuelen"] = txQueueLen[0].strip()
-                nicInfo[str(vals.family.value)].append(familyInfo)
+                    familyInfo["Type"] = str(nicinv["type"])
+                    familyInfo["txqueuelen"] = str(nicinv["txqueuelen"])
+                nicInfo[str(vals["family"])].append(familyInfo)
         return netInfo
 
     def get(self, **_kwargs):
@@ -279,7 +255,7 @@ class NetInfo(BWService):
                 msg = f"Interface {intfName} was defined in configuration, but not available on the system. Misconfiguration"
                 self.logger.error(msg)
                 raise NotFoundError(msg)
-            intfready, errmsg = getIfInterfaceReady(intfName)
+            intfready, errmsg = getIfInterfaceReady(intfName, self.inventory)
             if not intfready:
                 self.logger.error(errmsg)
                 raise NotFoundError(errmsg)
@@ -354,6 +330,7 @@ class NetInfo(BWService):
         self._getActive()
         self._cleanWarningCounters()
         hostname = self.config.get("agent", "hostname")
+        deltaVlans = VlanSet(self.activeDeltas.get("output", {}).get("usedVLANs", {}).get("deltas", {}).get(hostname, []))
         for key, intfData in data.get("NetInfo", {}).get("interfaces", {}).items():
             # This will not raise exception, as this info can come from Kubernetes.
             if not intfData.get("switch_port"):
@@ -366,7 +343,7 @@ class NetInfo(BWService):
             if intfData.get("bwParams", {}).get("reservableCapacity", 0) <= intfData.get("bwParams", {}).get("minReservableCapacity", 0):
                 errmsg = f"Interface {key} has no remaining reservable capacity! Over subscribed?"
                 self.addError(errmsg)
-            vlanrange = copy.deepcopy(intfData.get("vlan_range_list", []))
+            vlanrange = VlanSet(intfData.get("vlan_range_list", []))
             if not vlanrange:
                 errmsg = f"Interface {key} has no vlan range list defined!"
                 self.addError(errmsg)
@@ -378,10 +355,10 @@ class NetInfo(BWService):
                     if self.skipactivecheck:
                         continue
                     # Check if vlan comes from delta
-                    if vlanid not in self.activeDeltas.get("output", {}).get("usedVLANs", {}).get("deltas", {}).get(hostname, []):
+                    if vlanid not in deltaVlans:
                         errmsg = f"Vlan {vlanid} in interface {key} is not from delta! Manual provisioned or deletion failed?"
                         self.addError(errmsg)
-                    vlanrange.remove(vlanid)
+                    vlanrange.discard(vlanid)
             # If vlanrange is empty, then all vlans are provisioned/used and there are no vlans remaining
             if not vlanrange:
                 errmsg = f"No remaining vlans in vlan range list for interface {key}. All used?"
@@ -8,11 +8,10 @@ Authors:
 Date: 2021/01/20
 """
 
-import re
 from dataclasses import dataclass
+from socket import AF_INET6
 
-from SiteRMLibs.CustomExceptions import FailedInterfaceCommand, FailedRoutingCommand
-from SiteRMLibs.MainUtilities import execute, externalCommand
+from SiteRMLibs.CustomExceptions import FailedInterfaceCommand
 
 
 @dataclass
@@ -149,48 +148,44 @@ class Routing:
         self.hostname = self.config.get("agent", "hostname")
         self.logger = logger
         self.requestHandler = rulercli.requestHandler
+        # All changes are queued and committed by Ruler at the end of cycle
+        self.netlink = rulercli.netlink
         self.rules = Rules(rulercli)
         self._refreshRuleList()
 
     def _refreshRuleList(self):
-        """Refresh Rule list from System"""
+        """Refresh Rule list from System (Ruler cycle snapshot)"""
         self.rules.clean()
-        command = "ip -6 rule list"
-        cmdOut = externalCommand(command, False)
-        out, err = cmdOut.communicate()
-        if cmdOut.returncode != 0:
-            raise FailedRoutingCommand(f"Failed to get rule list. Out: {out}, Err: {err}")
-        for line in out.split("\n"):
-            match = re.match(r"(\d+):[ \t]+from ([^ \t]+) lookup ([^ \t]+)$", line)
-            if match:
-                matched = match.groups()
-                self.rules.add_rule(matched[0], matched[1], None, matched[2])
-                continue
-            match = re.match(r"(\d+):[ \t]+from ([^ \t]+) to ([^ \t]+) lookup ([^ \t]+)$", line)
-            if match:
-                matched = match.groups()
-                self.rules.add_rule(matched[0], matched[1], matched[2], matched[3])
-            match = re.match(r"(\d+):[ \t]+from ([^ \t]+) lookup ([^ \t]+)", line)
-            if match:
-                matched = match.groups()
-                self.rules.add_rule(matched[0], matched[1], None, matched[2])
-
-    def apply_rule(self, rule, deftable, findIp, raiseError=True):
-        """Add specific rule."""
-        tmprule = rule + f" table {deftable}"
-        maineError = None
-        try:
-            return execute(tmprule, self.logger, raiseError)
-        except FailedInterfaceCommand as exc:
-            maineError = exc
-        if findIp:
+        for rule in self.netlink.getRules(AF_INET6):
+            self.rules.add_rule(str(rule["priority"]), rule["src"], rule["dst"], rule["table"])
+
+    def apply_rule(self, group, action, deftable, findIp, **kwargs):
+        """Queue add or delete of specific rule (kwargs: dst, src)."""
+        self.logger.info(f"Queue IPv6 rule {action} {kwargs} table {deftable}")
+        table = self.netlink.routeTable(deftable)
+        if table is None and findIp:
             # Identify table from rule lookup
             ruleentry = self.rules.lookup_iprange(findIp)
             if ruleentry:
-                tmprule = rule + f" table {ruleentry[0][3]}"
-                return execute(tmprule, self.logger, raiseError)
-        # If we reach here, it means we couldn't find a suitable table
-        raise maineError
+                table = self.netlink.routeTable(ruleentry[0][3])
+        if table is None:
+            # If we reach here, it means we couldn't find a suitable table
+            raise FailedInterfaceCommand(f"Routing table {deftable} not found for rule {action} {kwargs}")
+        if action == "add":
+            self.netlink.addRule(group, table, **kwargs)
+        else:
+            self.netlink.delRule(group, table, **kwargs)
+
+    def _publishCallback(self, uuid, okState, errState):
+        """Get callback which publishes state once queued changes are committed"""
+
+        def callback(ok, _errors):
+            publishState(
+                self.requestHandler,
+                PublishStateInput("ipv6", uuid, self.hostname, okState if ok else errState, self.sitename),
+            )
+
+        return callback
 
     def terminate(self, route, uuid):
         """Terminate rules"""
@@ -199,34 +194,20 @@ class Routing:
             return []
         self._refreshRuleList()
         initialized = False
+        group = ("terminate", uuid, "ipv6")
         try:
             if route.get("src_ipv6_intf", "") and route.get("dst_ipv6", "") and self.rules.lookup_to(route["dst_ipv6"]):
                 initialized = True
-                self.apply_rule(
-                    f"ip -6 rule del to {route['dst_ipv6']}",
-                    route["src_ipv6_intf"],
-                    route["src_ipv6"],
-                )
+                self.apply_rule(group, "del", route["src_ipv6_intf"], route["src_ipv6"], dst=route["dst_ipv6"])
             if route.get("src_ipv6", "") and route.get("src_ipv6_intf", ""):
                 if self.rules.lookup_from_lookup(f"{route['src_ipv6']}/128", route["src_ipv6_intf"]):
                     initialized = True
-                    self.apply_rule(
-                        f"ip -6 rule del from {route['src_ipv6']}/128",
-                        route["src_ipv6_intf"],
-                        route["src_ipv6"],
-                    )
+                    self.apply_rule(group, "del", route["src_ipv6_intf"], route["src_ipv6"], src=f"{route['src_ipv6']}/128")
                 if self.rules.lookup_to_lookup(f"{route['src_ipv6']}/128", route["src_ipv6_intf"]):
                     initialized = True
-                    self.apply_rule(
-                        f"ip -6 rule del to {route['src_ipv6']}/128",
-                        route["src_ipv6_intf"],
-                        route["src_ipv6"],
-                    )
+                    self.apply_rule(group, "del", route["src_ipv6_intf"], route["src_ipv6"], dst=f"{route['src_ipv6']}/128")
             if initialized:
-                publishState(
-                    self.requestHandler,
-                    PublishStateInput("ipv6", uuid, self.hostname, "deactivated", self.sitename),
-                )
+                self.netlink.onCommit(group, self._publishCallback(uuid, "deactivated", "deactivate-error"))
         except FailedInterfaceCommand:
             if initialized:
                 publishState(
@@ -242,39 +223,25 @@ class Routing:
             return []
         self._refreshRuleList()
         initialized = False
+        group = ("activate", uuid, "ipv6")
         try:
             if route.get("src_ipv6_intf", "") and route.get("dst_ipv6", ""):
                 rules = self.rules.lookup_to_lookup(route["dst_ipv6"], route["src_ipv6_intf"])
                 if not rules:
                     initialized = True
-                    self.apply_rule(
-                        f"ip -6 rule add to {route['dst_ipv6']}",
-                        route["src_ipv6_intf"],
-                        route["src_ipv6"],
-                    )
+                    self.apply_rule(group, "add", route["src_ipv6_intf"], route["src_ipv6"], dst=route["dst_ipv6"])
 
             if route.get("src_ipv6", "") and route.get("src_ipv6_intf", ""):
                 rules = self.rules.lookup_from_lookup(route["src_ipv6"], route["src_ipv6_intf"])
                 if not rules:
                     initialized = True
-                    self.apply_rule(
-                        f"ip -6 rule add from {route['src_ipv6']}/128",
-                        route["src_ipv6_intf"],
-                        route["src_ipv6"],
-                    )
+                    self.apply_rule(group, "add", route["src_ipv6_intf"], route["src_ipv6"], src=f"{route['src_ipv6']}/128")
                 rules = self.rules.lookup_to_lookup(route["src_ipv6"], route["src_ipv6_intf"])
                 if not rules:
                     initialized = True
-                    self.apply_rule(
-                        f"ip -6 rule add to {route['src_ipv6']}/128",
-                        route["src_ipv6_intf"],
-                        route["src_ipv6"],
-                    )
+                    self.apply_rule(group, "add", route["src_ipv6_intf"], route["src_ipv6"], dst=f"{route['src_ipv6']}/128")
             if initialized:
-                publishState(
-                    self.requestHandler,
-                    PublishStateInput("ipv6", uuid, self.hostname, "activated", self.sitename),
-                )
+                self.netlink.onCommit(group, self._publishCallback(uuid, "activated", "activate-error"))
         except FailedInterfaceCommand:
             if initialized:
                 publishState(
@@ -11,19 +11,9 @@ Date: 2022/01/20
 
 import traceback
 from dataclasses import dataclass
+from socket import AF_INET, AF_INET6
 
-from pyroute2 import IPRoute
-from SiteRMLibs.CustomExceptions import FailedInterfaceCommand
-from SiteRMLibs.ipaddr import (
-    getBroadCast,
-    getIfAddrStats,
-    getInterfaceIP,
-    getInterfaces,
-    getInterfaceTxQueueLen,
-    normalizedip,
-    normalizedipwithnet,
-)
-from SiteRMLibs.MainUtilities import execute
+from SiteRMLibs.ipaddr import getIfAddrStats, getInterfaceTxQueueLen, normalizedip
 
 
 @dataclass
@@ -59,8 +49,8 @@ def publishState(reqHandler, item: PublishStateInput):
         )
 
 
-def getDefaultMTU(config, intfKey):
-    """Get Default MTU"""
+def getDefaultMTU(config, intfKey, inventory=None):
+    """Get Default MTU (interface inventory snapshot can be passed)"""
     if config.has_section(intfKey):
         if config.has_option(intfKey, "defaultMTU"):
             return int(config.get(intfKey, "defaultMTU"))
@@ -68,6 +58,8 @@ def getDefaultMTU(config, intfKey):
         if config.has_option("agent", "defaultMTU"):
             return int(config.get("agent", "defaultMTU"))
     defaultMTU = 1500
+    if inventory and inventory.get(intfKey, {}).get("mtu"):
+        return inventory[intfKey]["mtu"]
     _, ifstats = getIfAddrStats()
     try:
         defaultMTU = ifstats[intfKey].mtu
@@ -77,8 +69,8 @@ def getDefaultMTU(config, intfKey):
     return defaultMTU
 
 
-def getDefaultTXQ(config, intfKey):
-    """Get Default Txqueuelen"""
+def getDefaultTXQ(config, intfKey, inventory=None):
+    """Get Default Txqueuelen (interface inventory snapshot can be passed)"""
     if config.has_section(intfKey):
         if config.has_option(intfKey, "defaultTXQueuelen"):
             return int(config.get(intfKey, "defaultTXQueuelen"))
@@ -89,6 +81,8 @@ def getDefaultTXQ(config, intfKey):
     # We try to get it from system and use same as master intf;
     # if unable, use 1000 by default
     defaultTXQ = 1000
+    if inventory and inventory.get(intfKey, {}).get("txqueuelen"):
+        return inventory[intfKey]["txqueuelen"]
     try:
         defaultTXQ = getInterfaceTxQueueLen(intfKey)
     except Exception as ex:
@@ -97,14 +91,6 @@ def getDefaultTXQ(config, intfKey):
     return defaultTXQ
 
 
-def intfUp(intf):
-    """Check if Interface is up"""
-    state = "DOWN"
-    with IPRoute() as ipObj:
-        state = ipObj.get_links(ipObj.link_lookup(ifname=intf)[0])[0].get_attr("IFLA_OPERSTATE")
-    return state == "UP"
-
-
 class VInterfaces:
     """Virtual interface class."""
 
@@ -114,72 +100,54 @@ class VInterfaces:
         self.hostname = self.config.get("agent", "hostname")
         self.logger = logger
         self.requestHandler = rulercli.requestHandler
+        # All changes are queued and committed by Ruler at the end of cycle
+        self.netlink = rulercli.netlink
 
-    def _add(self, vlan, raiseError=False):
+    def _add(self, group, vlan):
         """Add specific vlan."""
         self.logger.info(f"Called VInterface add L2 for {str(vlan)}")
-        command = f"ip link add link {vlan['destport']} name vlan.{vlan['vlan']} type vlan id {vlan['vlan']}"
-        return execute(command, self.logger, raiseError)
+        self.netlink.addVlan(group, f"vlan.{vlan['vlan']}", vlan["destport"], vlan["vlan"])
 
-    def _setup(self, vlan, raiseError=False):
+    def _setup(self, group, vlan):
         """Setup vlan."""
-        if "ip" in vlan.keys() and vlan["ip"]:
-            self.logger.info(f"Called VInterface IPv4 setup L2 for {str(vlan)}")
-            command = f"ip addr add {vlan['ip']} broadcast {getBroadCast(vlan['ip'])} dev vlan.{vlan['vlan']}"
-            execute(command, self.logger, raiseError)
-        elif "ipv6" in vlan.keys() and vlan["ipv6"]:
-            self.logger.info(f"Called VInterface IPv6 setup L2 for {str(vlan)}")
-            command = f"ip addr add {vlan['ipv6']} broadcast {getBroadCast(vlan['ipv6'])} dev vlan.{vlan['vlan']}"
-            execute(command, self.logger, raiseError)
-        else:
+        if not vlan.get("ip") and not vlan.get("ipv6"):
             self.logger.info(f"Called VInterface setup for {str(vlan)}, but ip/ipv6 keys are not present.")
             self.logger.info("Continue as nothing happened")
+        for key, name in [("ip", "IPv4"), ("ipv6", "IPv6")]:
+            if vlan.get(key):
+                self.logger.info(f"Called VInterface {name} setup L2 for {str(vlan)}")
+                self.netlink.addAddr(group, f"vlan.{vlan['vlan']}", vlan[key])
         # Set MTU and Txqueuelen
         if "mtu" in vlan.keys() and vlan["mtu"]:
-            command = f"ip link set dev vlan.{vlan['vlan']} mtu {vlan['mtu']}"
-            execute(command, self.logger, raiseError)
+            self.netlink.setLink(group, f"vlan.{vlan['vlan']}", mtu=int(vlan["mtu"]))
         if "txqueuelen" in vlan.keys() and vlan["txqueuelen"]:
-            command = f"ip link set dev vlan.{vlan['vlan']} txqueuelen {vlan['txqueuelen']}"
-            execute(command, self.logger, raiseError)
+            self.netlink.setLink(group, f"vlan.{vlan['vlan']}", txqlen=int(vlan["txqueuelen"]))
 
-    def _start(self, vlan, raiseError=False):
+    def _start(self, group, vlan):
         """Start specific vlan."""
         self.logger.info(f"Called VInterface start L2 for {str(vlan)}")
-        command = f"ip link set dev vlan.{vlan['vlan']} up"
-        return execute(command, self.logger, raiseError)
-
-    def _stop(self, vlan, raiseError=False):
-        """Stop specific vlan."""
-        out = []
-        self.logger.info(f"Called VInterface L2 stop for {str(vlan)}")
-        for command in [f"ip link set dev vlan.{vlan['vlan']} down"]:
-            out.append(execute(command, self.logger, raiseError))
-        return out
+        self.netlink.setLink(group, f"vlan.{vlan['vlan']}", state="up")
 
-    def _remove(self, vlan, raiseError=False):
+    def _remove(self, group, vlan):
         """Remove specific vlan."""
-        out = []
         self.logger.info(f"Called VInterface remove for {str(vlan)}")
-        for command in [f"ip link delete dev vlan.{vlan['vlan']}"]:
-            out.append(execute(command, self.logger, raiseError))
-        return out
+        self.netlink.delLink(group, f"vlan.{vlan['vlan']}")
 
-    @staticmethod
-    def _statusvlan(vlan, raiseError=False):
-        """Get status of specific vlan."""
-        if f"vlan.{vlan['vlan']}" not in getInterfaces():
-            return False
-        return True
+    def _statusvlan(self, vlan):
+        """Get status of specific vlan (including changes queued in this cycle)."""
+        queued = self.netlink.linkState(f"vlan.{vlan['vlan']}")
+        if queued is not None:
+            return queued
+        return bool(self.netlink.getInterface(f"vlan.{vlan['vlan']}"))
 
-    @staticmethod
-    def _statusvlanIP(vlan, raiseError=False):
+    def _statusvlanIP(self, vlan):
         """Check if IP set on vlan"""
-        allIPs = getInterfaceIP(f"vlan.{vlan['vlan']}")
+        allIPs = self.netlink.getInterface(f"vlan.{vlan['vlan']}").get("addresses", [])
         ip4Exists = False
         if "ip" in vlan and vlan["ip"]:
             serviceIp = vlan["ip"].split("/")[0]
-            for ipv4m in allIPs.get(2, {}):
-                if serviceIp == ipv4m["addr"]:
+            for ipv4m in allIPs:
+                if ipv4m["family"] == AF_INET and serviceIp == ipv4m["address"]:
                     ip4Exists = True
                     break
         else:
@@ -188,8 +156,8 @@ class VInterfaces:
         ip6Exists = False
         if "ipv6" in vlan and vlan["ipv6"]:
             vlan["ipv6"] = normalizedip(vlan["ipv6"])
-            for ipv6m in allIPs.get(10, {}):
-                if vlan["ipv6"] == normalizedipwithnet(ipv6m.get("addr", ""), ipv6m.get("netmask", "")):
+            for ipv6m in allIPs:
+                if ipv6m["family"] == AF_INET6 and vlan["ipv6"] == normalizedip(f"{ipv6m['address']}/{ipv6m['prefixlen']}"):
                     ip6Exists = True
         else:
             # IPv6 IP was not requested.
@@ -199,6 +167,7 @@ class VInterfaces:
     def _getvlanlist(self, inParams):
         """Get All Vlan List"""
         vlans = []
+        inventory = self.netlink.snapshot()["interfaces"]
         for key, vals in inParams.items():
             uri = vals.get("uri", "")
             if uri and uri.endswith(f"{self.hostname}:{key}"):
@@ -209,8 +178,8 @@ class VInterfaces:
                 "vlan": vals.get("hasLabel", {}).get("value", ""),
                 "ip": netInfo.get("ipv4-address", {}).get("value", ""),
                 "ipv6": netInfo.get("ipv6-address", {}).get("value", ""),
-                "mtu": netInfo.get("mtu", {}).get("value", getDefaultMTU(self.config, key)),
-                "txqueuelen": netInfo.get("txqueuelen", {}).get("value", getDefaultTXQ(self.config, key)),
+                "mtu": netInfo.get("mtu", {}).get("value", getDefaultMTU(self.config, key, inventory)),
+                "txqueuelen": netInfo.get("txqueuelen", {}).get("value", getDefaultTXQ(self.config, key, inventory)),
             }
             if not vlan["vlan"]:
                 self.logger.error(f"VLAN ID is not set for {key}. Skipping this interface. All info: {inParams}")
@@ -224,64 +193,37 @@ class VInterfaces:
         """Activate Virtual Interface resources"""
         vlans = self._getvlanlist(inParams)
         for vlan in vlans:
-            try:
-                if self._statusvlan(vlan, True):
-                    if not self._statusvlanIP(vlan, True):
-                        self._setup(vlan, True)
-                else:
-                    self._add(vlan, True)
-                    self._setup(vlan, True)
-                if not intfUp(f"vlan.{vlan['vlan']}"):
-                    self._start(vlan, True)
-                publishState(
-                    self.requestHandler,
-                    PublishStateInput(vlan, inParams, uuid, self.hostname, "activated", self.sitename),
-                )
-            except FailedInterfaceCommand:
-                publishState(
-                    self.requestHandler,
-                    PublishStateInput(
-                        vlan,
-                        inParams,
-                        uuid,
-                        self.hostname,
-                        "activate-error",
-                        self.sitename,
-                    ),
-                )
+            group = ("activate", uuid, vlan["destport"], vlan["vlan"])
+            if self._statusvlan(vlan):
+                if not self._statusvlanIP(vlan):
+                    self._setup(group, vlan)
+            else:
+                self._add(group, vlan)
+                self._setup(group, vlan)
+            if not self.netlink.isUp(f"vlan.{vlan['vlan']}"):
+                self._start(group, vlan)
+            self.netlink.onCommit(group, self._publishCallback(vlan, inParams, uuid, "activated", "activate-error"))
         return vlans
 
+    def _publishCallback(self, vlan, inParams, uuid, okState, errState):
+        """Get callback which publishes state once queued changes are committed"""
+
+        def callback(ok, _errors):
+            publishState(
+                self.requestHandler,
+                PublishStateInput(vlan, inParams, uuid, self.hostname, okState if ok else errState, self.sitename),
+            )
+
+        return callback
+
     def terminate(self, inParams, uuid):
         """Terminate Virtual Interface resources"""
         vlans = self._getvlanlist(inParams)
         for vlan in vlans:
-            try:
-                if self._statusvlan(vlan, False):
-                    self._stop(vlan, False)
-                    self._remove(vlan, False)
-                publishState(
-                    self.requestHandler,
-                    PublishStateInput(
-                        vlan,
-                        inParams,
-                        uuid,
-                        self.hostname,
-                        "deactivated",
-                        self.sitename,
-                    ),
-                )
-            except FailedInterfaceCommand:
-                publishState(
-                    self.requestHandler,
-                    PublishStateInput(
-                        vlan,
-                        inParams,
-                        uuid,
-                        self.hostname,
-                        "deactivate-error",
-                        self.sitename,
-                    ),
-                )
+            group = ("terminate", uuid, vlan["destport"], vlan["vlan"])
+            if self._statusvlan(vlan):
+                self._remove(group, vlan)
+            self.netlink.onCommit(group, self._publishCallback(vlan, inParams, uuid, "deactivated", "deactivate-error"))
         return vlans
 
     def modify(self, oldParams, newParams, uuid):
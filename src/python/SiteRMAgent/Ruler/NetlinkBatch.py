@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# pylint: disable=line-too-long
+"""Netlink batch for Ruler. Components queue link, address and rule changes
+during a Ruler cycle and all of them are committed at the end of the cycle
+over one persistent netlink socket (instead of one ip command per change).
+State checks are answered from one snapshot (interfaces, addresses, rules
+and routes) taken once per cycle.
+
+Authors:
+  Justas Balcas jbalcas (at) es (dot) net
+
+Date: 2026/10/17
+"""
+
+import errno
+import os
+from ipaddress import ip_interface
+from socket import AF_INET, AF_INET6
+
+from pyroute2 import IPRoute
+from pyroute2.netlink.exceptions import NetlinkError
+from SiteRMLibs.ipaddr import getInterfaceInventory
+
+# Errors which mean that change is already in place
+ADD_EXISTS = (errno.EEXIST,)
+DEL_MISSING = (errno.ENOENT, errno.ENODEV, errno.ESRCH, errno.EADDRNOTAVAIL)
+RT_TABLES_FILES = ["/etc/iproute2/rt_tables", "/usr/share/iproute2/rt_tables"]
+RT_TABLES_DIRS = ["/etc/iproute2/rt_tables.d"]
+
+
+def getRouteTables():
+    """Get routing table names and ids (from iproute2 rt_tables files)"""
+    out = {"local": 255, "main": 254, "default": 253, "unspec": 0}
+    fnames = [fname for fname in RT_TABLES_FILES if os.path.isfile(fname)][:1]
+    for dirname in RT_TABLES_DIRS:
+        if os.path.isdir(dirname):
+            fnames += [os.path.join(dirname, fname) for fname in sorted(os.listdir(dirname)) if fname.endswith(".conf")]
+    for fname in fnames:
+        with open(fname, "r", encoding="utf-8") as fd:
+            for line in fd:
+                line = line.split("#")[0].split()
+                if len(line) == 2 and line[0].isdigit():
+                    out[line[1]] = int(line[0])
+    return out
+
+
+def formatPrefix(address, prefixlen, family):
+    """Format rule address as ip rule list does (no prefix for single host)"""
+    if not address:
+        return None
+    if prefixlen == (128 if family == AF_INET6 else 32):
+        return address
+    return f"{address}/{prefixlen}"
+
+
+def splitPrefix(ipInput, defprefix=None):
+    """Split ip (with or without /prefix) to address and prefix length"""
+    intf = ip_interface(ipInput)
+    prefix = intf.network.prefixlen if "/" in ipInput or defprefix is None else defprefix
+    return str(intf.ip), prefix, AF_INET6 if intf.version == 6 else AF_INET
+
+
+class NetlinkBatch:
+    """Queue of netlink changes, committed once per Ruler cycle."""
+
+    def __init__(self, logger):
+        self.logger = logger
+        self.ipr = None
+        self.pending = []
+        self.queued = set()
+        self.links = {}
+        self.callbacks = {}
+        self.rttables = {}
+        self.snap = None
+
+    def _socket(self):
+        """Get persistent netlink socket"""
+        if not self.ipr:
+            self.ipr = IPRoute()
+        return self.ipr
+
+    def close(self):
+        """Close netlink socket"""
+        if self.ipr:
+            self.ipr.close()
+            self.ipr = None
+
+    def refresh(self):
+        """Drop snapshot, next check takes a new one"""
+        self.snap = None
+
+    def snapshot(self):
+        """Get point in time snapshot of interfaces, rules and routes (taken once per cycle)"""
+        if self.snap is None:
+            ipr = self._socket()
+            self.rttables = getRouteTables()
+            tablenames = {val: key for key, val in self.rttables.items()}
+            interfaces = getInterfaceInventory(ipr)
+            indexes = {vals["index"]: name for name, vals in interfaces.items()}
+            rules = []
+            for family in (AF_INET, AF_INET6):
+                for rule in ipr.get_rules(family=family):
+                    table = rule.get_attr("FRA_TABLE") or rule["table"]
+                    rules.append(
+                        {
+                            "family": family,
+                            "priority": rule.get_attr("FRA_PRIORITY") or 0,
+                            "src": formatPrefix(rule.get_attr("FRA_SRC"), rule["src_len"], family) or "all",
+                            "dst": formatPrefix(rule.get_attr("FRA_DST"), rule["dst_len"], family),
+                            "table": tablenames.get(table, str(table)),
+                        }
+                    )
+            routes = []
+            for route in ipr.get_routes():
+                table = route.get_attr("RTA_TABLE") or route["table"]
+                routes.append(
+                    {
+                        "family": route["family"],
+                        "dst": formatPrefix(route.get_attr("RTA_DST"), route["dst_len"], route["family"]) or "default",
+                        "gateway": route.get_attr("RTA_GATEWAY"),
+                        "dev": indexes.get(route.get_attr("RTA_OIF"), ""),
+                        "table": tablenames.get(table, str(table)),
+                    }
+                )
+            self.snap = {"interfaces": interfaces, "rules": rules, "routes": routes}
+        return self.snap
+
+    def getInterface(self, ifname):
+        """Get interface from snapshot (empty dict if it does not exist)"""
+        return self.snapshot()["interfaces"].get(ifname, {})
+
+    def getRules(self, family=AF_INET6):
+        """Get rules from snapshot"""
+        return [rule for rule in self.snapshot()["rules"] if rule["family"] == family]
+
+    def _queue(self, group, action, target, **kwargs):
+        """Queue change (same change queued twice in a cycle is applied once)"""
+        key = (action, target, tuple(sorted(kwargs.items())))
+        if key in self.queued:
+            return
+        self.queued.add(key)
+        self.pending.append({"group": group, "action": action, "target": target, "kwargs": kwargs})
+
+    def linkState(self, ifname):
+        """Get queued state of link (True - added, False - deleted, None - no change queued)"""
+        return self.links.get(ifname)
+
+    def isUp(self, ifname):
+        """Check if interface is up (queued new link is not up yet)"""
+        if self.links.get(ifname) is not None:
+            return False
+        return self.getInterface(ifname).get("operstate") == "UP"
+
+    def routeTable(self, name):
+        """Get routing table id by name (or None if unknown)"""
+        if str(name).isdigit():
+            return int(name)
+        if name not in self.rttables:
+            self.rttables = getRouteTables()
+        return self.rttables.get(name)
+
+    def onCommit(self, group, callback):
+        """Register callback(ok, errors) called for group once the batch is committed"""
+        self.callbacks.setdefault(group, []).append(callback)
+
+    def addVlan(self, group, ifname, parent, vlanid):
+        """Queue vlan interface creation"""
+        self.links[ifname] = True
+        self._queue(group, "vlanadd", ifname, parent=parent, vlanid=int(vlanid))
+
+    def setLink(self, group, ifname, **kwargs):
+        """Queue link attributes change (e.g. mtu, txqlen, state)"""
+        self._queue(group, "linkset", ifname, **kwargs)
+
+    def delLink(self, group, ifname):
+        """Queue link deletion"""
+        self.links[ifname] = False
+        self._queue(group, "linkdel", ifname)
+
+    def addAddr(self, group, ifname, ipInput):
+        """Queue address (ip/prefix) addition"""
+        self._queue(group, "addradd", ifname, ip=ipInput)
+
+    def addRule(self, group, table, dst=None, src=None):
+        """Queue IPv6 rule addition"""
+        self._queue(group, "ruleadd", table, dst=dst, src=src)
+
+    def delRule(self, group, table, dst=None, src=None):
+        """Queue IPv6 rule deletion"""
+        self._queue(group, "ruledel", table, dst=dst, src=src)
+
+    def _index(self, ifname):
+        """Get interface index"""
+        idx = self._socket().link_lookup(ifname=ifname)
+        if not idx:
+            raise NetlinkError(errno.ENODEV, f"Interface {ifname} not found")
+        return idx[0]
+
+    def _apply(self, item):
+        """Apply one change"""
+        ipr = self._socket()
+        action, target, kwargs = item["action"], item["target"], item["kwargs"]
+        if action == "vlanadd":
+            ipr.link("add", ifname=target, kind="vlan", link=self._index(kwargs["parent"]), vlan_id=kwargs["vlanid"])
+        elif action == "linkset":
+            ipr.link("set", index=self._index(target), **kwargs)
+        elif action == "linkdel":
+            ipr.link("del", index=self._index(target))
+        elif action == "addradd":
+            address, prefix, family = splitPrefix(kwargs["ip"])
+            params = {"index": self._index(target), "address": address, "prefixlen": prefix, "family": family}
+            if family == AF_INET:
+                params["broadcast"] = str(ip_interface(kwargs["ip"]).network.broadcast_address)
+            ipr.addr("add", **params)
+        elif action in ("ruleadd", "ruledel"):
+            params = {"family": AF_INET6, "table": target}
+            for key in ("dst", "src"):
+                if kwargs[key]:
+                    params[key], params[f"{key}_len"], _ = splitPrefix(kwargs[key], 128)
+            ipr.rule("add" if action == "ruleadd" else "del", **params)
+
+    def discard(self):
+        """Drop all queued changes and their callbacks"""
+        self.pending, self.queued, self.links, self.callbacks = [], set(), {}, {}
+
+    def commit(self):
+        """Apply all queued changes in order. Changes of a group after its failed change are skipped.
+        Returns failed groups and their errors."""
+        failed = {}
+        pending, callbacks = self.pending, self.callbacks
+        self.discard()
+        if pending:
+            self.logger.info(f"Committing {len(pending)} netlink changes")
+            # Snapshot does not reflect applied changes anymore
+            self.refresh()
+        for item in pending:
+            if item["group"] in failed:
+                continue
+            try:
+                self._apply(item)
+            except NetlinkError as ex:
+                if (item["action"].endswith("add") and ex.code in ADD_EXISTS) or (item["action"].endswith("del") and ex.code in DEL_MISSING):
+                    continue
+                msg = f"Netlink {item['action']} {item['target']} {item['kwargs']} failed: {ex}"
+                self.logger.error(msg)
+                failed[item["group"]] = msg
+            except OSError as ex:
+                # Socket is broken. Reopen it for next change.
+                msg = f"Netlink {item['action']} {item['target']} {item['kwargs']} failed: {ex}"
+                self.logger.error(msg)
+                failed[item["group"]] = msg
+                self.close()
+        for group, calls in callbacks.items():
+            for callback in calls:
+                callback(group not in failed, failed.get(group, ""))
+        return failed
@@ -15,6 +15,7 @@ from SiteRMAgent.Ruler.Components.DSCP import DSCP
 from SiteRMAgent.Ruler.Components.QOS import QOS
 from SiteRMAgent.Ruler.Components.Routing import Routing
 from SiteRMAgent.Ruler.Components.VInterfaces import VInterfaces
+from SiteRMAgent.Ruler.NetlinkBatch import NetlinkBatch
 from SiteRMAgent.Ruler.OverlapLib import OverlapLib
 from SiteRMLibs.BWService import BWService
 from SiteRMLibs.CustomExceptions import FailedGetDataFromFE
@@ -55,6 +56,8 @@ class Ruler(DSCP, QOS, OverlapLib, BWService, Timing):
         DSCP.__init__(self)
         QOS.__init__(self)
         OverlapLib.__init__(self)
+        # Link, address and rule changes of a cycle, committed over one netlink socket
+        self.netlink = NetlinkBatch(self.logger)
         # L2,L3 move it to Class Imports at top.
         self.layer2 = VInterfaces(self.config, self.sitename, self.logger, self)
         self.layer3 = Routing(self.config, self.sitename, self.logger, self)
@@ -72,7 +75,8 @@ class Ruler(DSCP, QOS, OverlapLib, BWService, Timing):
     def getData(self, url):
         """Get data from FE."""
         out = self.requestHandler.makeHttpCall("GET", url, useragent="Ruler")
-        if out[1] != 200:
+        # 304 - Not modified since last call (HTTPLibrary returns cached content)
+        if out[1] not in [200, 304]:
             msg = f"Received a failure getting information from Site Frontend {str(out)}"
             self.logger.critical(msg)
             raise FailedGetDataFromFE(msg)
@@ -83,7 +87,7 @@ class Ruler(DSCP, QOS, OverlapLib, BWService, Timing):
         failurefile = f"{self.workDir}/fefailure.json"
         data = {}
         try:
-            data = self.getData(f"/api/{self.sitename}/frontend/activedeltas")
+            data = self.getData(f"/api/{self.sitename}/frontend/activedeltas/{self.hostname}")
         except FailedGetDataFromFE as ex:
             self.siteDB.dumpFileContentAsJson(failurefile, {"exc": str(ex)})
             self.logger.critical("Failed to get data from FE: %s", str(ex))
@@ -163,14 +167,21 @@ class Ruler(DSCP, QOS, OverlapLib, BWService, Timing):
 
         if not self.config.getboolean("agent", "norules"):
             self.logger.info("Agent is configured to apply rules")
-            for actKey, actCall in {
-                "vsw": self.layer2,
-                "rst": self.layer3,
-                "kube": self.layer2,
-            }.items():
-                if self.activeDeltas != self.activeFromFE:
-                    self.activeComparison(actKey, actCall)
-                self.activeEnsure(actKey, actCall)
+            # One kernel snapshot (interfaces, addresses, rules, routes) per cycle, shared by all components
+            self.netlink.refresh()
+            try:
+                for actKey, actCall in {
+                    "vsw": self.layer2,
+                    "rst": self.layer3,
+                    "kube": self.layer2,
+                }.items():
+                    if self.activeDeltas != self.activeFromFE:
+                        self.activeComparison(actKey, actCall)
+                    self.activeEnsure(actKey, actCall)
+                self.netlink.commit()
+            finally:
+                # Changes queued by a failed cycle are not carried over to the next one
+                self.netlink.discard()
             # QoS Can be modified and depends only on Active
             self.activeNow = self.activeNew
             if not self.config.getboolean("agent", "noqos"):
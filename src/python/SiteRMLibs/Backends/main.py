@@ -133,7 +133,8 @@ class Switch(Node):
     def _getDBOut(self):
         """Get Database output of all switches configs for site"""
         self.switches = {"output": {}}
-        tmp = self.dbI.get("switch", search=[["sitename", self.site]])
+        # Error column is not needed (only written), so it is not loaded
+        tmp = self.dbI.get("switch", search=[["sitename", self.site]], columns=["id", "sitename", "device", "insertdate", "updatedate", "output"])
         for item in tmp:
             self.switches["output"][item["device"]] = evaldict(item["output"])
             self.switches["output"][item["device"]].setdefault("dbinfo", {})
@@ -217,31 +218,29 @@ class Switch(Node):
 
     def _insertToDB(self, data):
         """Insert to database new switches data"""
-        self._getDBOut()
+        rows = []
         for switch, vals in data.items():
             if not vals:
                 continue
-            out = {
-                "sitename": self.site,
-                "device": switch,
-                "updatedate": getUTCnow(),
-                "output": jsondumps(vals),
-                "error": "{}",
-            }
-            if switch not in self.switches["output"]:
-                out["insertdate"] = getUTCnow()
-                self.logger.debug(f"No switches {switch} in database. Calling add")
-                self.dbI.insert("switch", [out])
-            else:
-                # Get ID from DB and update
-                out["id"] = self.switches["output"][switch]["dbinfo"]["id"]
-                self.logger.debug(f"Update switch {switch} in database.")
-                self.dbI.update("switch", [out])
+            rows.append(
+                {
+                    "sitename": self.site,
+                    "device": switch,
+                    "insertdate": getUTCnow(),
+                    "updatedate": getUTCnow(),
+                    "output": jsondumps(vals),
+                    "error": "{}",
+                }
+            )
+        self.logger.debug(f"Insert or update switches {[row['device'] for row in rows]} in database.")
+        self.dbI.upsert("switch", rows, ["sitename", "device"])
         self._getDBOut()
 
     def _insertErrToDB(self, err):
         """Insert Error from switch to database"""
-        self._getDBOut()
+        # Only switch ids are needed, output is kept as is in database
+        existing = {item["device"]: item["id"] for item in self.dbI.get("switch", search=[["sitename", self.site]], columns=["id", "device"])}
+        newRows, updRows = [], []
         for switch, errmsg in err.items():
             out = {
                 "sitename": self.site,
@@ -249,21 +248,18 @@ class Switch(Node):
                 "updatedate": getUTCnow(),
                 "error": jsondumps(errmsg),
             }
-            if switch not in self.switches["output"]:
+            self.logger.debug(f"Error: {errmsg}")
+            if switch not in existing:
                 out["insertdate"] = getUTCnow()
                 out["output"] = "{}"
                 self.logger.debug(f"No switches {switch} in database. Calling to add error.")
-                self.logger.debug(f"Error: {errmsg}")
-                self.dbI.insert("switch", [out])
+                newRows.append(out)
             else:
-                # Get ID from DB and update
-                out["id"] = self.switches["output"][switch]["dbinfo"]["id"]
-                data = dict(self.switches["output"][switch])
-                data.pop("dbinfo", None)
-                out["output"] = jsondumps(data)
+                out["id"] = existing[switch]
                 self.logger.debug(f"Update switch {switch} in database with error.")
-                self.logger.debug(f"Error: {errmsg}")
-                self.dbI.update("switch", [out])
+                updRows.append(out)
+        self.dbI.bulk_insert("switch", newRows)
+        self.dbI.bulk_update("switch", updRows)
         # Once updated, inserted. Update var from db
         self._getDBOut()
 
@@ -3,17 +3,37 @@
 DB Backend for communication with database.
 """
 
+import asyncio
 import os
+import threading
+import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from datetime import datetime, timezone
+from functools import partial, wraps
 
 from alembic import command
 from alembic.config import Config
 from alembic.runtime.migration import MigrationContext
-from SiteRMLibs.DBModels import REGISTRY, Base
-from sqlalchemy import URL, create_engine, text
+from SiteRMLibs.DBModels import REGISTRY, createTables
+from SiteRMLibs.DBStats import DB_STATS
+from SiteRMLibs.DefaultParams import (
+    DB_POOL_MAX_OVERFLOW,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+)
+from sqlalchemy import URL, UniqueConstraint, and_, create_engine, func, insert, inspect, make_url, select, text, tuple_, update
+from sqlalchemy.dialects.mysql import insert as mysqlinsert
+from sqlalchemy.dialects.sqlite import insert as sqliteinsert
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# In-memory SQLite engines (per URL). Shared by all dbinterface objects of the process,
+# otherwise each of them would see its own empty database.
+MEMORY_ENGINES = {}
 
 # ==========================================================
 #  Utilities
@@ -51,7 +71,7 @@ def buildDatabaseURL() -> str:
     Build SQLAlchemy DATABASE_URL for MariaDB/MySQL.
 
     Priority:
-      1. DATABASE_URL env var
+      1. DATABASE_URL env var (e.g. sqlite:////tmp/sitefe.db or sqlite:// for in-memory SQLite)
       2. Construct from MARIA_DB_* variables
     """
     url = os.getenv("DATABASE_URL")
@@ -76,28 +96,92 @@ def buildDatabaseURL() -> str:
     ).render_as_string(hide_password=False)
 
 
+def instrumented(operation):
+    """Record count and latency of dbinterface call (per service, table and operation)."""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(self, calltype, *args, **kwargs):
+            startTime = time.perf_counter()
+            try:
+                return func(self, calltype, *args, **kwargs)
+            finally:
+                DB_STATS.observe(self.serviceName or "default", calltype, operation, time.perf_counter() - startTime, kwargs.get("search"))
+
+        return wrapper
+
+    return decorator
+
+
 # ==========================================================
 #  Database Backend
 # ==========================================================
 class DBBackend:
     """Database backend using SQLAlchemy ORM."""
 
-    def __init__(self):
+    def __init__(self, serviceName="", config=None):
         loadEnvFile()
 
+        self.serviceName = serviceName or "default"
         self.database_url = buildDatabaseURL()
         self.autocommit = os.getenv("MARIA_DB_AUTOCOMMIT", "True") in ("True", "true", "1")
-        self.engine = create_engine(self.database_url, pool_pre_ping=True, future=True)
+        url = make_url(self.database_url)
+        if url.get_backend_name() != "sqlite":
+            self.engine = create_engine(self.database_url, pool_pre_ping=True, future=True, **self.getPoolParams(config))
+        elif not self.isMemoryDB(url):
+            self.engine = create_engine(self.database_url, future=True, connect_args={"check_same_thread": False})
+        else:
+            if self.database_url not in MEMORY_ENGINES:
+                # Single connection shared between threads, tables are created from ORM models
+                MEMORY_ENGINES[self.database_url] = create_engine(
+                    self.database_url,
+                    future=True,
+                    poolclass=StaticPool,
+                    connect_args={"check_same_thread": False},
+                )
+                createTables(MEMORY_ENGINES[self.database_url])
+            self.engine = MEMORY_ENGINES[self.database_url]
         self.Session = sessionmaker(bind=self.engine, autoflush=False, expire_on_commit=False)
+        # Session of transaction() block (per thread)
+        self.local = threading.local()
+
+    @staticmethod
+    def isMemoryDB(url):
+        """Check if SQLite URL points to in-memory database"""
+        return url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+
+    @staticmethod
+    def getPoolParams(config=None):
+        """Get connection pool parameters from site configuration (database section) or defaults."""
+        params = {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_POOL_MAX_OVERFLOW,
+            "pool_recycle": DB_POOL_RECYCLE,
+            "pool_timeout": DB_POOL_TIMEOUT,
+        }
+        if config:
+            for key, default in params.items():
+                params[key] = int(config.get("database", key, default))
+        return params
 
     @contextmanager
     def session(self):
         """Provide a transactional scope around a series of operations on the database."""
+        if getattr(self.local, "session", None) is not None:
+            # Inside transaction() - use its session, commit happens at the end of transaction
+            yield self.local.session
+            self.local.session.flush()
+            return
         session = self.Session()
         try:
             yield session
             if self.autocommit:
                 session.commit()
+        except PoolTimeoutError:
+            DB_STATS.poolTimeout(self.serviceName)
+            print(f"Full traceback: {traceback.format_exc()}")
+            session.rollback()
+            raise
         except Exception:
             print(f"Full traceback: {traceback.format_exc()}")
             session.rollback()
@@ -105,9 +189,50 @@ class DBBackend:
         finally:
             session.close()
 
+    @contextmanager
+    def transaction(self):
+        """Run all database calls of this thread inside the block in one session (one transaction)."""
+        if getattr(self.local, "session", None) is not None:
+            yield self.local.session
+            return
+        with self.session() as session:
+            self.local.session = session
+            try:
+                yield session
+            finally:
+                self.local.session = None
+
     def createdb(self):
         """Create all tables from ORM metadata."""
-        Base.metadata.create_all(self.engine)
+        createTables(self.engine)
+
+    def dedupUniqueKeys(self):
+        """Remove duplicate rows (keep the newest one) for unique constraints and indexes of existing tables.
+        Older releases inserted rows with get-then-insert, so tables could have duplicates
+        and the migration creating the unique constraint would fail."""
+        inspector = inspect(self.engine)
+        dbcolumns = {tablename: {col["name"] for col in inspector.get_columns(tablename)} for tablename in inspector.get_table_names()}
+        removed = 0
+        with self.engine.begin() as conn:
+            for tablename, model in REGISTRY.items():
+                table = model.__table__
+                if tablename not in dbcolumns or "id" not in table.c:
+                    continue
+                order = [table.c[col].desc() for col in ("updatedate", "insertdate") if col in dbcolumns[tablename]] + [table.c.id.desc()]
+                uniques = [cons for cons in table.constraints if isinstance(cons, UniqueConstraint)] + [idx for idx in table.indexes if idx.unique]
+                for constraint in uniques:
+                    keys = [col.name for col in constraint.columns]
+                    if not set(keys + ["id"]).issubset(dbcolumns[tablename]):
+                        continue
+                    keycols = [table.c[key] for key in keys]
+                    dups = conn.execute(select(*keycols).group_by(*keycols).having(func.count() > 1)).all()
+                    for dup in dups:
+                        ids = conn.execute(select(table.c.id).where(and_(*[col == val for col, val in zip(keycols, dup)])).order_by(*order)).scalars().all()
+                        conn.execute(table.delete().where(table.c.id.in_(ids[1:])))
+                        removed += len(ids) - 1
+        if removed:
+            print(f"Removed {removed} duplicate rows before adding unique constraints")
+        return removed
 
     def upgradedb(self, directory):
         """Initialize Alembic if needed, then always upgrade DB to head."""
@@ -128,6 +253,7 @@ class DBBackend:
             if current is None:
                 print("Database not stamped, stamping to base")
                 command.stamp(cfg, "base")
+            self.dedupUniqueKeys()
             print(f"Upgrading database (current={current}) → head")
             command.upgrade(cfg, "head")
             return current
@@ -167,7 +293,8 @@ class dbinterface:
         self.serviceName = serviceName
         self.config = config
         self.sitename = sitename
-        self.db = DBBackend()
+        self.db = DBBackend(serviceName, config)
+        DB_STATS.addPool(serviceName or "default", self.db.engine.pool)
 
     def createdb(self):
         """Create all tables in the database."""
@@ -190,14 +317,29 @@ class dbinterface:
         """Execute raw SQL directly on the engine."""
         return self.db.executeRaw(sql)
 
-    def get(self, calltype, limit=None, search=None, orderby=None, mapping=True):
-        """Retrieve rows from a specific table."""
+    def transaction(self):
+        """Context manager - all calls of this thread inside it are done in one transaction."""
+        return self.db.transaction()
+
+    @instrumented("get")
+    def get(self, calltype, limit=None, search=None, orderby=None, mapping=True, columns=None):
+        """Retrieve rows from a specific table.
+
+        columns - list of column names to load (projection). Large columns
+        (content, output, error) are not transferred if not listed.
+        """
         model = REGISTRY.get(calltype)
         if not model:
             raise ValueError(f"Unknown table: {calltype}")
 
+        if columns:
+            allowed = set(model.__table__.columns.keys())
+            invalid = [col for col in columns if col not in allowed]
+            if invalid:
+                raise ValueError(f"Invalid columns {invalid} for table '{calltype}'")
+
         with self.db.session() as session:
-            q = session.query(model)
+            q = session.query(*[getattr(model, col) for col in columns]) if columns else session.query(model)
 
             if search:
                 for item in search:
@@ -218,8 +360,11 @@ class dbinterface:
             if not mapping:
                 return rows
 
+            if columns:
+                return [dict(row._mapping) for row in rows]
             return [{c.name: getattr(row, c.name) for c in row.__table__.columns} for row in rows]
 
+    @instrumented("insert")
     def insert(self, calltype, values):
         """Insert rows into a specific table."""
         model = REGISTRY.get(calltype)
@@ -244,6 +389,98 @@ class dbinterface:
 
         return "OK", "", last_id
 
+    @staticmethod
+    def _cleanValues(model, calltype, values, action):
+        """Drop fields which are not columns of the table (and warn about them)."""
+        allowed = set(model.__table__.columns.keys())
+        out = []
+        for val in values:
+            excluded = [k for k in val if k not in allowed]
+            if excluded:
+                print(f"[DB {action} WARNING] Table '{calltype}' ignored fields: {excluded}")
+            out.append({k: v for k, v in val.items() if k in allowed})
+        return out
+
+    @instrumented("bulk_insert")
+    def bulk_insert(self, calltype, values):
+        """Insert many rows into a specific table with a single statement."""
+        model = REGISTRY.get(calltype)
+        if not model:
+            raise ValueError(f"Unknown table: {calltype}")
+        rows = self._cleanValues(model, calltype, values, "BULK INSERT")
+        if not rows:
+            return "OK", "", 0
+        with self.db.session() as session:
+            session.execute(insert(model), rows)
+        return "OK", "", len(rows)
+
+    @instrumented("bulk_update")
+    def bulk_update(self, calltype, values):
+        """Update many rows (by primary key id) in a specific table with a single statement."""
+        model = REGISTRY.get(calltype)
+        if not model:
+            raise ValueError(f"Unknown table: {calltype}")
+        rows = []
+        for val in self._cleanValues(model, calltype, values, "BULK UPDATE"):
+            if val.get("id") is None:
+                raise ValueError(f"Bulk update in '{calltype}' requires id for each row: {val}")
+            rows.append({k: v for k, v in val.items() if v is not None})
+        if not rows:
+            return "OK", "", 0
+        with self.db.session() as session:
+            session.execute(update(model), rows)
+        return "OK", "", len(rows)
+
+    @instrumented("upsert")
+    def upsert(self, calltype, values, keys):
+        """Insert rows or update existing ones (matched by unique keys) in a specific table.
+
+        On MariaDB/MySQL this is a single INSERT ... ON DUPLICATE KEY UPDATE statement,
+        on SQLite INSERT ... ON CONFLICT DO UPDATE (keys must be a unique constraint
+        of the table). insertdate is kept on update.
+        """
+        model = REGISTRY.get(calltype)
+        if not model:
+            raise ValueError(f"Unknown table: {calltype}")
+        rows = self._cleanValues(model, calltype, values, "UPSERT")
+        if not rows:
+            return "OK", "", 0
+        # One statement for all rows - all of them must have the same columns
+        for row in rows[1:]:
+            if row.keys() != rows[0].keys():
+                raise ValueError(f"Upsert in '{calltype}' requires same columns for all rows: {sorted(rows[0])} != {sorted(row)}")
+        updcols = [col for col in rows[0] if col not in keys and col not in ("id", "insertdate")]
+        with self.db.session() as session:
+            if self.db.engine.dialect.name in ("mysql", "mariadb"):
+                stmt = mysqlinsert(model).values(rows)
+                stmt = stmt.on_duplicate_key_update({col: stmt.inserted[col] for col in updcols})
+                session.execute(stmt)
+                return "OK", "", len(rows)
+            if self.db.engine.dialect.name == "sqlite":
+                stmt = sqliteinsert(model).values(rows)
+                stmt = stmt.on_conflict_do_update(index_elements=keys, set_={col: stmt.excluded[col] for col in updcols})
+                session.execute(stmt)
+                return "OK", "", len(rows)
+            # Other backends: one select for all keys, then bulk insert and bulk update.
+            keycols = [getattr(model, key) for key in keys]
+            existing = {
+                tuple(row[1:]): row[0]
+                for row in session.query(model.id, *keycols).filter(tuple_(*keycols).in_([tuple(row[key] for key in keys) for row in rows])).all()
+            }
+            newRows, updRows = [], []
+            for row in rows:
+                rowid = existing.get(tuple(row[key] for key in keys))
+                if rowid is None:
+                    newRows.append(row)
+                else:
+                    updRows.append({"id": rowid, **{col: row[col] for col in updcols if col in row}})
+            if newRows:
+                session.execute(insert(model), newRows)
+            if updRows:
+                session.execute(update(model), updRows)
+        return "OK", "", len(rows)
+
+    @instrumented("update")
     def update(self, calltype, values):
         """Update rows in a specific table."""
         model = REGISTRY.get(calltype)
@@ -278,6 +515,7 @@ class dbinterface:
 
         return "OK", "", ""
 
+    @instrumented("delete")
     def delete(self, calltype, values):
         """Delete rows from a specific table."""
         model = REGISTRY.get(calltype)
@@ -297,6 +535,26 @@ class dbinterface:
 
         return "OK", "", ""
 
+    @staticmethod
+    def _compFilter(column_attr, op, value):
+        """Get comparison filter for a column."""
+        if op == "<":
+            return column_attr < value
+        if op == ">":
+            return column_attr > value
+        if op == "<=":
+            return column_attr <= value
+        if op == ">=":
+            return column_attr >= value
+        if op == "!=":
+            return column_attr != value
+        if op == "==":
+            return column_attr == value
+        if op == "in":
+            return column_attr.in_(value)
+        raise ValueError(f"Unsupported operator {op}")
+
+    @instrumented("delete_comp")
     def delete_comp(self, calltype, column, op, value):
         """Delete rows with a comparison filter."""
         model = REGISTRY.get(calltype)
@@ -311,25 +569,42 @@ class dbinterface:
         column_attr = getattr(model, column)
 
         with self.db.session() as session:
-            q = session.query(model)
+            q = session.query(model).filter(self._compFilter(column_attr, op, value))
+            deleted = q.delete(synchronize_session=False)
 
-            if op == "<":
-                q = q.filter(column_attr < value)
-            elif op == ">":
-                q = q.filter(column_attr > value)
-            elif op == "<=":
-                q = q.filter(column_attr <= value)
-            elif op == ">=":
-                q = q.filter(column_attr >= value)
-            elif op == "!=":
-                q = q.filter(column_attr != value)
-            elif op == "==":
-                q = q.filter(column_attr == value)
-            else:
-                raise ValueError(f"Unsupported operator {op}")
+        return deleted
 
-            deleted = q.delete(synchronize_session=False)
+    @instrumented("delete_comp_chunked")
+    def delete_comp_chunked(self, calltype, column, op, value, chunksize=1000, sleep=0):
+        """Delete rows with a comparison filter in primary key chunks.
+
+        Each chunk is deleted in its own transaction, so row locks are held
+        only for chunksize rows at a time. Sleeps between chunks to limit rate.
+        Returns number of deleted rows.
+        """
+        model = REGISTRY.get(calltype)
+        if not model:
+            raise ValueError(f"Unknown table: {calltype}")
 
+        allowed = set(model.__table__.columns.keys())
+
+        if column not in allowed:
+            raise ValueError(f"Invalid column '{column}' for table '{calltype}'")
+
+        column_attr = getattr(model, column)
+
+        deleted = 0
+        while True:
+            with self.db.session() as session:
+                ids = [row[0] for row in session.query(model.id).filter(self._compFilter(column_attr, op, value)).order_by(model.id).limit(chunksize).all()]
+                if ids:
+                    deleted += session.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+                    # Commit each chunk (also with MARIA_DB_AUTOCOMMIT=False), otherwise the same ids are selected again
+                    session.commit()
+            if len(ids) < chunksize:
+                break
+            if sleep:
+                time.sleep(sleep)
         return deleted
 
     def _clean(self, _calltype, _values):
@@ -354,3 +629,79 @@ class dbinterface:
         if "insertdate" in columns:
             return "insertdate"
         return None
+
+
+class asyncdbinterface:
+    """Async database interface used by REST API (FastAPI) handlers.
+
+    All calls are executed in a dedicated thread pool, so database
+    round-trips do not block the event loop. Pool size is controlled
+    by MARIA_DB_ASYNC_WORKERS environment variable.
+    """
+
+    def __init__(self, serviceName="", config="", sitename=""):
+        self.sync = dbinterface(serviceName, config, sitename)
+        self.workers = int(os.getenv("MARIA_DB_ASYNC_WORKERS", "10"))
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="dbworker")
+        # Calls submitted, but not yet started (waiting for a free database worker thread)
+        self.waiting = 0
+        self.waitlock = threading.Lock()
+        DB_STATS.addPool(serviceName or "default", self.sync.db.engine.pool, waiting=lambda: self.waiting)
+
+    def _changeWaiting(self, diff):
+        """Change number of waiting calls"""
+        with self.waitlock:
+            self.waiting += diff
+
+    def _start(self, func):
+        """Run function in database worker thread (it is not waiting anymore)"""
+        self._changeWaiting(-1)
+        return func()
+
+    async def run(self, func, *args, **kwargs):
+        """Run synchronous (database) function inside database thread pool."""
+        self._changeWaiting(1)
+        future = self.executor.submit(self._start, partial(func, *args, **kwargs))
+        # Call cancelled before it started does not reach _start
+        future.add_done_callback(lambda fut: fut.cancelled() and self._changeWaiting(-1))
+        return await asyncio.wrap_future(future)
+
+    async def isDBReady(self) -> bool:
+        """Check if the database is ready to accept connections."""
+        return await self.run(self.sync.isDBReady)
+
+    async def executeRaw(self, sql):
+        """Execute raw SQL directly on the engine."""
+        return await self.run(self.sync.executeRaw, sql)
+
+    async def get(self, calltype, limit=None, search=None, orderby=None, mapping=True, columns=None):
+        """Retrieve rows from a specific table."""
+        return await self.run(self.sync.get, calltype, limit=limit, search=search, orderby=orderby, mapping=mapping, columns=columns)
+
+    async def insert(self, calltype, values):
+        """Insert rows into a specific table."""
+        return await self.run(self.sync.insert, calltype, values)
+
+    async def update(self, calltype, values):
+        """Update rows in a specific table."""
+        return await self.run(self.sync.update, calltype, values)
+
+    async def bulk_insert(self, calltype, values):
+        """Insert many rows into a specific table with a single statement."""
+        return await self.run(self.sync.bulk_insert, calltype, values)
+
+    async def bulk_update(self, calltype, values):
+        """Update many rows (by primary key id) in a specific table with a single statement."""
+        return await self.run(self.sync.bulk_update, calltype, values)
+
+    async def upsert(self, calltype, values, keys):
+        """Insert rows or update existing ones (matched by unique keys) in a specific table."""
+        return await self.run(self.sync.upsert, calltype, values, keys)
+
+    async def delete(self, calltype, values):
+        """Delete rows from a specific table."""
+        return await self.run(self.sync.delete, calltype, values)
+
+    async def delete_comp(self, calltype, column, op, value):
+        """Delete rows with a comparison filter."""
+        return await self.run(self.sync.delete_comp, calltype, column, op, value)
@@ -2,10 +2,16 @@
 """Database cleaner"""
 
 import os
+import time
 import traceback
 from datetime import timedelta
 
 import pymysql
+from SiteRMLibs.DefaultParams import (
+    DBCLEAN_CHUNK_SIZE,
+    DBCLEAN_CHUNK_SLEEP,
+    DBCLEAN_RETENTION,
+)
 from SiteRMLibs.GitConfig import getGitConfig
 from SiteRMLibs.MainUtilities import (
     getDBConn,
@@ -25,22 +31,42 @@ class DBCleaner:
         self.logger = getLoggingObject(config=self.config, service="DBCleaner")
         self.dbI = getVal(getDBConn("DBWorker", self), **{"sitename": self.sitename})
         self.nextRun = int(getUTCnow() - 1)  # Make sure runs first time
+        self.chunksize = int(os.environ.get("DBCLEAN_CHUNK_SIZE", DBCLEAN_CHUNK_SIZE))
+        self.chunksleep = float(os.environ.get("DBCLEAN_CHUNK_SLEEP", DBCLEAN_CHUNK_SLEEP))
+        # Counters per table: total rows removed and time spent (since service start) and last run
+        self.stats = {}
 
     def refreshthread(self):
         """Call to refresh thread for this specific class and reset parameters"""
         # Just a place holder (no need to change anything for DBCleaner)
         return
 
+    @staticmethod
+    def getRetention(dbtable):
+        """Get retention (seconds) for table. Can be set per table via DBCLEAN_RETENTION_<TABLENAME>"""
+        default = os.environ.get("DBCLEAN_RETENTION", DBCLEAN_RETENTION)
+        return int(os.environ.get(f"DBCLEAN_RETENTION_{dbtable.upper()}", default))
+
+    def _recordStats(self, dbtable, deleted, runtime):
+        """Record cleanup counters for table"""
+        stats = self.stats.setdefault(dbtable, {"deleted": 0, "runtime": 0.0, "lastdeleted": 0, "lastruntime": 0.0})
+        stats["deleted"] += deleted
+        stats["runtime"] += runtime
+        stats["lastdeleted"] = deleted
+        stats["lastruntime"] = runtime
+
     def cleanAuth(self):
         """Clean refresh_tokens"""
         olderthan = timedelta(hours=int(os.environ.get("REFRESH_TOKEN_TTL_HOURS", "12"))).total_seconds()
         timestamp = int(getUTCnow() - olderthan)
         self.logger.info(f"Cleaning refresh_tokens older than {timestamp}")
+        startTime = time.time()
         try:
-            self.dbI.delete_comp("refresh_tokens", "expires_at", "<", timestamp)
+            deleted = self.dbI.delete_comp_chunked("refresh_tokens", "expires_at", "<", timestamp, self.chunksize, self.chunksleep)
         except pymysql.OperationalError as ex:
             self.logger.error(f"Operational error while cleaning refresh_tokens: {ex}")
             return
+        self._recordStats("refresh_tokens", deleted, time.time() - startTime)
 
     def clean(self, dbtable, olderthan):
         """Clean the database"""
@@ -50,10 +76,13 @@ class DBCleaner:
             self.logger.info(f"No timestamp column found for {dbtable}. Skipping.")
             return
 
-        deleted = self.dbI.delete_comp(dbtable, time_collumn, "<", int(getUTCnow() - olderthan))
+        startTime = time.time()
+        deleted = self.dbI.delete_comp_chunked(dbtable, time_collumn, "<", int(getUTCnow() - olderthan), self.chunksize, self.chunksleep)
+        runtime = time.time() - startTime
+        self._recordStats(dbtable, deleted, runtime)
 
         if deleted:
-            self.logger.info(f"Deleted {deleted} rows from {dbtable}")
+            self.logger.info(f"Deleted {deleted} rows from {dbtable} in {runtime:.2f} seconds")
 
     def startwork(self):
         """Start the cleaner"""
@@ -73,6 +102,7 @@ class DBCleaner:
             "hoststateshistory",
             "switch",
             "snmpmon",
+            "snmpcounters",
             "serviceaction",
             "activeDeltas",
             "instancestartend",
@@ -81,12 +111,12 @@ class DBCleaner:
         ]:
             self.logger.info(f"Cleaning {table}")
             try:
-                self.clean(table, 7 * 86400)
+                self.clean(table, self.getRetention(table))
             except Exception as e:
                 self.logger.error(f"Error cleaning {table}: {e}")
                 self.logger.error(f"Full traceback: {traceback.format_exc()}")
         self.cleanAuth()
-        self.logger.info("Cleaner finished")
+        self.logger.info(f"Cleaner finished. Cleanup counters: {self.stats}")
 
 
 if __name__ == "__main__":
@@ -8,10 +8,26 @@ Email                   : jbalcas (at) es (dot) net
 Date                    : 2026/01/02
 """
 
-from sqlalchemy import JSON, Boolean, Column, Integer, String, UniqueConstraint
-from sqlalchemy.dialects.mysql import LONGTEXT
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    Column,
+    Double,
+    Index,
+    Integer,
+    LargeBinary,
+    MetaData,
+    String,
+    Table,
+    Text,
+    UniqueConstraint,
+)
+from sqlalchemy.dialects.mysql import LONGTEXT as MYSQLLONGTEXT
 from sqlalchemy.orm import DeclarativeBase
 
+# LONGTEXT on MariaDB/MySQL, generic TEXT on other backends (e.g. SQLite)
+LONGTEXT = Text().with_variant(MYSQLLONGTEXT(), "mysql", "mariadb")
+
 
 class Base(DeclarativeBase):
     """Base class for all models."""
@@ -21,17 +37,29 @@ class Model(Base):
     """Model table."""
 
     __tablename__ = "models"
+    __table_args__ = (
+        Index("ix_models_uid", "uid"),
+        Index("ix_models_insertdate", "insertdate"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     uid = Column(String(255), nullable=False)
     insertdate = Column(Integer, nullable=False)
     fileloc = Column(String(4096), nullable=False)
+    digest = Column(String(64), nullable=True)
 
 
 class Delta(Base):
     """Delta table."""
 
     __tablename__ = "deltas"
+    __table_args__ = (
+        Index("ix_deltas_uid", "uid"),
+        Index("ix_deltas_state_insertdate", "state", "insertdate"),
+        Index("ix_deltas_state_updatedate", "state", "updatedate"),
+        Index("ix_deltas_insertdate", "insertdate"),
+        Index("ix_deltas_updatedate", "updatedate"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     uid = Column(String(255), nullable=False)
@@ -60,6 +88,10 @@ class State(Base):
     """State table."""
 
     __tablename__ = "states"
+    __table_args__ = (
+        Index("ix_states_deltaid_insertdate", "deltaid", "insertdate"),
+        Index("ix_states_insertdate", "insertdate"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     deltaid = Column(String(255), nullable=False)
@@ -71,6 +103,9 @@ class HostState(Base):
     """HostState table."""
 
     __tablename__ = "hoststates"
+    __table_args__ = (
+        Index("ix_hoststates_updatedate", "updatedate"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     deltaid = Column(String(255), nullable=False)
@@ -84,6 +119,9 @@ class HostStateHistory(Base):
     """HostStateHistory table."""
 
     __tablename__ = "hoststateshistory"
+    __table_args__ = (
+        Index("ix_hoststateshistory_insertdate", "insertdate"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     deltaid = Column(String(255), nullable=False)
@@ -96,6 +134,10 @@ class Host(Base):
     """Host table."""
 
     __tablename__ = "hosts"
+    __table_args__ = (
+        Index("ix_hosts_hostname_updatedate", "hostname", "updatedate"),
+        Index("ix_hosts_updatedate", "updatedate"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     ip = Column(String(45), nullable=False, unique=True)
@@ -103,13 +145,18 @@ class Host(Base):
     insertdate = Column(Integer, nullable=False)
     updatedate = Column(Integer, nullable=False)
     hostinfo = Column(String(4096), nullable=False)
+    # Version of host report (incremented on each accepted full report or patch)
+    version = Column(Integer, nullable=True)
 
 
 class Service(Base):
     """Service table."""
 
     __tablename__ = "services"
-    __table_args__ = (UniqueConstraint("hostname", "servicename"),)
+    __table_args__ = (
+        UniqueConstraint("hostname", "servicename"),
+        Index("ix_services_updatedate", "updatedate"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     hostname = Column(String(255), nullable=False)
@@ -123,6 +170,11 @@ class Switch(Base):
     """Switch table."""
 
     __tablename__ = "switch"
+    __table_args__ = (
+        UniqueConstraint("sitename", "device"),
+        Index("ix_switch_sitename_updatedate", "sitename", "updatedate"),
+        Index("ix_switch_updatedate", "updatedate"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     sitename = Column(String(64), nullable=False)
@@ -137,6 +189,10 @@ class ServiceState(Base):
     """ServiceState table."""
 
     __tablename__ = "servicestates"
+    __table_args__ = (
+        UniqueConstraint("hostname", "servicename"),
+        Index("ix_servicestates_updatedate", "updatedate"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     hostname = Column(String(255), nullable=False)
@@ -153,6 +209,9 @@ class DebugWorker(Base):
     """DebugWorker table."""
 
     __tablename__ = "debugworkers"
+    __table_args__ = (
+        Index("ix_debugworkers_updatedate", "updatedate"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     hostname = Column(String(255), nullable=False)
@@ -165,6 +224,12 @@ class DebugRequest(Base):
     """DebugRequest table."""
 
     __tablename__ = "debugrequests"
+    __table_args__ = (
+        Index("ix_debugrequests_hostname_state_updatedate", "hostname", "state", "updatedate"),
+        Index("ix_debugrequests_state_insertdate", "state", "insertdate"),
+        Index("ix_debugrequests_insertdate", "insertdate"),
+        Index("ix_debugrequests_updatedate", "updatedate"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     hostname = Column(String(255), nullable=False)
@@ -180,17 +245,54 @@ class ActiveDelta(Base):
     """ActiveDelta table."""
 
     __tablename__ = "activeDeltas"
+    __table_args__ = (
+        Index("ix_activeDeltas_insertdate", "insertdate"),
+        Index("ix_activeDeltas_updatedate", "updatedate"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    insertdate = Column(Integer, nullable=False)
+    updatedate = Column(Integer, nullable=False)
+    output = Column(JSON, nullable=False)
+    version = Column(String(64), nullable=True)
+
+
+class ActiveDeltaHost(Base):
+    """ActiveDeltaHost table (Active deltas sliced per host)."""
+
+    __tablename__ = "activeDeltasHost"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
+    hostname = Column(String(255), nullable=False, unique=True)
     insertdate = Column(Integer, nullable=False)
     updatedate = Column(Integer, nullable=False)
     output = Column(JSON, nullable=False)
+    version = Column(String(64), nullable=True)
+
+
+class ActiveDeltaItem(Base):
+    """ActiveDeltaItem table (Active deltas split per top level key and connection/host key)."""
+
+    __tablename__ = "activeDeltasItems"
+    __table_args__ = (UniqueConstraint("itemtype", "itemkey"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    itemtype = Column(String(64), nullable=False)
+    itemkey = Column(String(512), nullable=False)
+    insertdate = Column(Integer, nullable=False)
+    updatedate = Column(Integer, nullable=False)
+    output = Column(JSON, nullable=False)
+    version = Column(String(64), nullable=False)
 
 
 class SNMPMon(Base):
     """SNMPMon table."""
 
     __tablename__ = "snmpmon"
+    __table_args__ = (
+        UniqueConstraint("hostname"),
+        Index("ix_snmpmon_updatedate", "updatedate"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     hostname = Column(String(255), nullable=False)
@@ -199,10 +301,34 @@ class SNMPMon(Base):
     output = Column(JSON, nullable=False)
 
 
+class SNMPCounter(Base):
+    """SNMPCounter table (ring buffer of samples per device, interface and metric)."""
+
+    __tablename__ = "snmpcounters"
+    __table_args__ = (
+        UniqueConstraint("hostname", "ifindex", "metric"),
+        Index("ix_snmpcounters_updatedate", "updatedate"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    hostname = Column(String(255), nullable=False)
+    ifindex = Column(String(64), nullable=False)
+    metric = Column(String(64), nullable=False)
+    insertdate = Column(Integer, nullable=False)
+    updatedate = Column(Integer, nullable=False)
+    labels = Column(JSON, nullable=False)
+    lastvalue = Column(Double, nullable=True)
+    position = Column(Integer, nullable=False)
+    samples = Column(LargeBinary, nullable=False)
+
+
 class DeltaTimeState(Base):
     """DeltaTimeState table."""
 
     __tablename__ = "deltatimestates"
+    __table_args__ = (
+        Index("ix_deltatimestates_insertdate", "insertdate"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     insertdate = Column(Integer, nullable=False)
@@ -217,6 +343,10 @@ class ServiceAction(Base):
     """ServiceAction table."""
 
     __tablename__ = "serviceaction"
+    __table_args__ = (
+        Index("ix_serviceaction_hostname_servicename_serviceaction", "hostname", "servicename", "serviceaction"),
+        Index("ix_serviceaction_insertdate", "insertdate"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     servicename = Column(String(64), nullable=False)
@@ -238,6 +368,9 @@ class InstanceStartEnd(Base):
     """InstanceStartEnd table."""
 
     __tablename__ = "instancestartend"
+    __table_args__ = (
+        Index("ix_instancestartend_insertdate", "insertdate"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     instanceid = Column(String(1024), nullable=False)
@@ -250,6 +383,10 @@ class DeltaUserTracking(Base):
     """DeltaUserTracking table."""
 
     __tablename__ = "deltasusertracking"
+    __table_args__ = (
+        Index("ix_deltasusertracking_deltaid_insertdate", "deltaid", "insertdate"),
+        Index("ix_deltasusertracking_insertdate", "insertdate"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     username = Column(String(255), nullable=False)
@@ -288,6 +425,10 @@ class RefreshToken(Base):
     """RefreshToken table."""
 
     __tablename__ = "refresh_tokens"
+    __table_args__ = (
+        Index("ix_refresh_tokens_token_hash", "token_hash"),
+        Index("ix_refresh_tokens_expires_at", "expires_at"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     username = Column(String(36), nullable=False)
@@ -314,7 +455,10 @@ REGISTRY = {
     "debugworkers": DebugWorker,
     "debugrequests": DebugRequest,
     "activeDeltas": ActiveDelta,
+    "activeDeltasHost": ActiveDeltaHost,
+    "activeDeltasItems": ActiveDeltaItem,
     "snmpmon": SNMPMon,
+    "snmpcounters": SNMPCounter,
     "deltatimestates": DeltaTimeState,
     "serviceaction": ServiceAction,
     "forceapplyuuid": ForceApplyUUID,
@@ -324,3 +468,26 @@ REGISTRY = {
     "users": User,
     "refresh_tokens": RefreshToken,
 }
+
+
+def sqliteTable(table, metadata):
+    """Copy of table for SQLite. SQLite can not autoincrement id of composite primary key,
+    so there id is the only primary key (other primary key columns are kept NOT NULL)."""
+    columns = [Column(col.name, col.type, primary_key=col.name == "id", nullable=col.nullable, server_default=col.server_default) for col in table.columns]
+    indexes = [Index(idx.name, *[col.name for col in idx.columns], unique=idx.unique) for idx in table.indexes]
+    constraints = [UniqueConstraint(*[col.name for col in cons.columns], name=cons.name) for cons in table.constraints if isinstance(cons, UniqueConstraint)]
+    return Table(table.name, metadata, *columns, *constraints, *indexes)
+
+
+def createTables(engine):
+    """Create all tables from ORM metadata (SQLite gets its own definition of composite primary key tables)"""
+    if engine.dialect.name != "sqlite":
+        Base.metadata.create_all(engine)
+        return
+    metadata = MetaData()
+    for table in Base.metadata.sorted_tables:
+        if "id" in table.primary_key.columns and len(table.primary_key.columns) > 1:
+            sqliteTable(table, metadata)
+        else:
+            table.to_metadata(metadata)
+    metadata.create_all(engine)
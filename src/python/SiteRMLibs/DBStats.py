@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Database query statistics. Counts and latency histogram of every dbinterface
+call per service, table and operation, and connection pool usage per service.
+Statistics are periodically dumped to a per process file, which SNMPMonitoring
+exports in Prometheus output.
+
+Authors:
+  Justas Balcas jbalcas (at) es (dot) net
+
+Date: 2026/10/17
+"""
+
+import atexit
+import os
+import tempfile
+import threading
+import time
+import weakref
+
+import simplejson as json
+
+# Latency histogram buckets (seconds), last one is +Inf
+DB_STATS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+
+def getStatsDir():
+    """Get directory where processes dump database statistics"""
+    return os.getenv("MARIA_DB_STATS_DIR", os.path.join(tempfile.gettempdir(), "siterm-dbstats"))
+
+
+class DBStats:
+    """Per process database query statistics."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = {}
+        # (service, id(pool)) -> {"pool": weakref to pool, "waiting": callable}
+        self.pools = {}
+        self.pooltimeouts = {}
+        # Log queries slower than threshold (seconds). 0 - disabled
+        self.slowquery = float(os.getenv("MARIA_DB_SLOW_QUERY_THRESHOLD", "0"))
+        self.dumpinterval = int(os.getenv("MARIA_DB_STATS_INTERVAL", "60"))
+        self.lastdump = time.time()
+
+    def observe(self, service, table, operation, runtime, details=None):
+        """Record one database call"""
+        slow = bool(self.slowquery and runtime >= self.slowquery)
+        with self.lock:
+            entry = self.stats.setdefault(
+                (service, table, operation),
+                {"count": 0, "sum": 0.0, "slow": 0, "buckets": [0] * len(DB_STATS_BUCKETS)},
+            )
+            entry["count"] += 1
+            entry["sum"] += runtime
+            entry["slow"] += int(slow)
+            for idx, bucket in enumerate(DB_STATS_BUCKETS):
+                if runtime <= bucket:
+                    entry["buckets"][idx] += 1
+                    break
+            dumpNow = time.time() - self.lastdump >= self.dumpinterval
+            if dumpNow:
+                self.lastdump = time.time()
+        if slow:
+            print(f"[DB SLOW QUERY] Service: {service}, Table: {table}, Operation: {operation}, Runtime: {runtime:.3f}s, Details: {str(details)[:512]}")
+        if dumpNow:
+            self.dump()
+
+    def addPool(self, service, pool, waiting=None):
+        """Register connection pool (and optional callable returning number of waiting calls) of service"""
+        with self.lock:
+            self.pools[(service, id(pool))] = {"pool": weakref.ref(pool), "waiting": waiting}
+
+    def poolTimeout(self, service):
+        """Record connection pool checkout timeout"""
+        with self.lock:
+            self.pooltimeouts[service] = self.pooltimeouts.get(service, 0) + 1
+
+    def getPoolStats(self):
+        """Get connection pool usage per service"""
+        out = {}
+        with self.lock:
+            pools = list(self.pools.items())
+            timeouts = dict(self.pooltimeouts)
+        for (service, poolid), item in pools:
+            pool = item["pool"]()
+            if pool is None:
+                with self.lock:
+                    self.pools.pop((service, poolid), None)
+                continue
+            entry = out.setdefault(service, {"size": 0, "checkedout": 0, "overflow": 0, "waiting": 0, "timeouts": timeouts.get(service, 0)})
+            # Only QueuePool (default for MariaDB/MySQL) reports size and overflow
+            entry["size"] += pool.size() if hasattr(pool, "size") else 0
+            entry["checkedout"] += pool.checkedout() if hasattr(pool, "checkedout") else 0
+            entry["overflow"] += max(pool.overflow(), 0) if hasattr(pool, "overflow") else 0
+            entry["waiting"] += item["waiting"]() if item["waiting"] else 0
+        return out
+
+    def dump(self):
+        """Dump statistics of this process to stats directory"""
+        with self.lock:
+            queries = [{"service": key[0], "table": key[1], "operation": key[2], **dict(vals, buckets=list(vals["buckets"]))} for key, vals in self.stats.items()]
+        pools = [{"service": service, **vals} for service, vals in self.getPoolStats().items()]
+        out = {"queries": queries, "pools": pools}
+        try:
+            statsdir = getStatsDir()
+            os.makedirs(statsdir, exist_ok=True)
+            fname = os.path.join(statsdir, f"{os.getpid()}.json")
+            with open(f"{fname}.tmp", "w", encoding="utf-8") as fd:
+                json.dump(out, fd)
+            os.replace(f"{fname}.tmp", fname)
+        except OSError as ex:
+            print(f"Failed to dump database statistics. Error: {ex}")
+
+
+def pidAlive(pid):
+    """Check if process with pid exists"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def removeStats():
+    """Remove statistics file of this process (called at exit)"""
+    try:
+        os.remove(os.path.join(getStatsDir(), f"{os.getpid()}.json"))
+    except OSError:
+        pass
+
+
+def loadStats(maxage=600):
+    """Load and merge statistics of all running processes (files older than maxage seconds or
+    of processes which do not exist anymore are removed).
+    Returns query statistics keyed by (service, table, operation) and pool statistics keyed by service."""
+    merged, pools = {}, {}
+    statsdir = getStatsDir()
+    if not os.path.isdir(statsdir):
+        return merged, pools
+    for fname in os.listdir(statsdir):
+        fpath = os.path.join(statsdir, fname)
+        if not fname.endswith(".json"):
+            continue
+        try:
+            pid = fname[: -len(".json")]
+            if time.time() - os.path.getmtime(fpath) > maxage or (pid.isdigit() and not pidAlive(int(pid))):
+                os.remove(fpath)
+                continue
+            with open(fpath, "r", encoding="utf-8") as fd:
+                entries = json.load(fd)
+        except (OSError, ValueError):
+            continue
+        for item in entries.get("pools", []):
+            entry = pools.setdefault(item["service"], {"size": 0, "checkedout": 0, "overflow": 0, "waiting": 0, "timeouts": 0})
+            for key in entry:
+                entry[key] += item.get(key, 0)
+        for item in entries.get("queries", []):
+            entry = merged.setdefault(
+                (item["service"], item["table"], item["operation"]),
+                {"count": 0, "sum": 0.0, "slow": 0, "buckets": [0] * len(DB_STATS_BUCKETS)},
+            )
+            entry["count"] += item["count"]
+            entry["sum"] += item["sum"]
+            entry["slow"] += item.get("slow", 0)
+            for idx, val in enumerate(item["buckets"][: len(DB_STATS_BUCKETS)]):
+                entry["buckets"][idx] += val
+    return merged, pools
+
+
+DB_STATS = DBStats()
+atexit.register(removeStats)
@@ -159,18 +159,7 @@ class DBBackend:
                 "exc": str(kwargs.get("exc", "No Exception provided by service"))[:4095],
             }
             dbobj = getVal(self.dbI, **{"sitename": kwargs.get("sitename", "UNSET")})
-            services = dbobj.get(
-                "servicestates",
-                search=[
-                    ["hostname", dbOut["hostname"]],
-                    ["servicename", dbOut["servicename"]],
-                ],
-            )
-            if not services:
-                dbobj.insert("servicestates", [dbOut])
-            else:
-                dbOut["id"] = services[0]["id"]
-                dbobj.update("servicestates", [dbOut])
+            dbobj.upsert("servicestates", [dbOut], ["hostname", "servicename"])
         except Exception:
             excType, excValue = sys.exc_info()[:2]
             print(f"Error details in reportServiceStatus. ErrorType: {str(excType.__name__)}, ErrMsg: {excValue}")
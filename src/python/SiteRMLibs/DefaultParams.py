@@ -29,7 +29,24 @@ SERVICE_DOWN_TIMEOUT = 300
 SERVICE_DEAD_TIMEOUT = 600
 # Auto refresh of git configuration if changes only every 15 minutes
 GIT_CONFIG_REFRESH_TIMEOUT = 900
+# Time for PolicyService to accept submitted delta (50 seconds) and poll interval while waiting
+DELTA_ACCEPT_TIMEOUT = 50
+DELTA_ACCEPT_POLL_INTERVAL = 0.2
+# Max number of parsed delta contents kept in PolicyService cache
+DELTA_PARSE_CACHE_SIZE = 500
 # Time for delta to receive commit message (5 minutes)
 DELTA_COMMIT_TIMEOUT = 300
 # Time for delta to be removed from database (1 hour)
 DELTA_REMOVE_TIMEOUT = 3600
+# Database connection pool (per process). Can be overwritten in site configuration database section
+DB_POOL_SIZE = 5
+DB_POOL_MAX_OVERFLOW = 10
+DB_POOL_RECYCLE = 3600
+DB_POOL_TIMEOUT = 30
+# Database cleaner: default retention (7 days), rows deleted per chunk and pause (seconds) between chunks
+# Can be overwritten with DBCLEAN_RETENTION, DBCLEAN_RETENTION_<TABLENAME>, DBCLEAN_CHUNK_SIZE and DBCLEAN_CHUNK_SLEEP environment variables
+DBCLEAN_RETENTION = 604800
+DBCLEAN_CHUNK_SIZE = 1000
+DBCLEAN_CHUNK_SLEEP = 0.1
+# SNMP counters ring buffer size (samples kept per device, interface and metric)
+SNMP_COUNTER_SAMPLES = 360
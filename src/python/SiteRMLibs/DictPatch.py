@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Dictionary patch - list of changes between two (JSON) dictionaries.
+Used by Agent to send only changes of host report to Frontend.
+
+Patch is a list of operations:
+  ["set", [key1, key2, ...], value] - set value at path
+  ["del", [key1, key2, ...]]        - delete key at path
+Lists are compared and replaced as a whole.
+
+Authors:
+  Justas Balcas jbalcas (at) es (dot) net
+
+Date: 2026/10/17
+"""
+
+
+def diffDicts(old, new, path=None):
+    """Get patch which converts old dictionary to new"""
+    path = path or []
+    patch = []
+    for key, val in new.items():
+        if key not in old:
+            patch.append(["set", path + [key], val])
+        elif isinstance(val, dict) and isinstance(old[key], dict):
+            patch += diffDicts(old[key], val, path + [key])
+        elif val != old[key]:
+            patch.append(["set", path + [key], val])
+    for key in old:
+        if key not in new:
+            patch.append(["del", path + [key]])
+    return patch
+
+
+def applyPatch(doc, patch):
+    """Apply patch to dictionary (in place). Raises ValueError if patch does not match dictionary."""
+    for item in patch:
+        if not isinstance(item, list) or len(item) < 2 or item[0] not in ("set", "del") or not item[1]:
+            raise ValueError(f"Wrong patch operation: {item}")
+        parent = doc
+        for key in item[1][:-1]:
+            if not isinstance(parent.get(key), dict):
+                raise ValueError(f"Patch path {item[1]} not found in document")
+            parent = parent[key]
+        if item[0] == "set":
+            if len(item) != 3:
+                raise ValueError(f"Wrong patch operation: {item}")
+            parent[item[1][-1]] = item[2]
+        else:
+            parent.pop(item[1][-1], None)
+    return doc
@@ -22,6 +22,7 @@ from SiteRMLibs.MainUtilities import (
     getstartupconfig,
     getTempDir,
 )
+from SiteRMLibs.VlanSet import VlanSet
 from yaml import safe_load as yload
 
 
@@ -245,6 +246,9 @@ class GitConfig:
                     "rsts_enabled": "ipv4,ipv6",
                     "noqos": False,
                     "nodscp": False,
+                    # Plugin collection timeout (seconds) and per plugin overrides, e.g. {"KubeInfo": 30}
+                    "plugin_timeout": 60,
+                    "plugin_timeouts": {},
                 },
                 "qos": {
                     "policy": "hostlevel",
@@ -315,45 +319,18 @@ class GitConfig:
             self.presetAgentDefaultConfigs()
 
     @staticmethod
-    def __genValFromItem(inVal):
-        """Generate int value from vlan range item"""
-        if isinstance(inVal, int):
-            return [inVal]
-        retVals = []
-        tmpvals = inVal.split("-")
-        if len(tmpvals) == 2:
-            # Need to loop as it is range;
-            # In case second val is bigger than 1st - raise Exception
-            if int(tmpvals[0]) >= int(tmpvals[1]):
-                raise Exception(f"Configuration Error. Vlan Range equal or lower. Vals: {tmpvals}")
-            for i in range(int(tmpvals[0]), int(tmpvals[1]) + 1):
-                retVals.append(i)
-        else:
-            retVals.append(int(tmpvals[0]))
-        return retVals
-
-    def __genVlansRange(self, vals):
+    def __genVlansRange(vals):
         """Generate Vlans Range"""
-        retVals = []
-        tmpVals = vals
-        if isinstance(vals, int):
-            return [vals]
-        if not isinstance(vals, list):
-            tmpVals = vals.split(",")
-        for val in tmpVals:
-            for lval in self.__genValFromItem(val):
-                retVals.append(int(lval))
-        return list(set(retVals))
+        return VlanSet(vals).toList()
 
     def generateVlanList(self, key1, key2, _vals):
         """Generate Vlan List. which can be separated by comma, dash"""
+        allVlans = VlanSet(self.config["MAIN"][key1].get("all_vlan_range_list", []))
 
         def _addToAll(vlanlist):
             """Add to all vlan list"""
-            self.config["MAIN"][key1].setdefault("all_vlan_range_list", [])
-            for vlanid in vlanlist:
-                if vlanid not in self.config["MAIN"][key1].get("all_vlan_range_list", []):
-                    self.config["MAIN"][key1].setdefault("all_vlan_range_list", []).append(vlanid)
+            allVlans.update(vlanlist)
+            self.config["MAIN"][key1]["all_vlan_range_list"] = allVlans.toList()
 
         # Default list is a must! Will be done checked at config preparation/validation
         if "vlan_range" not in self.config["MAIN"][key1]:
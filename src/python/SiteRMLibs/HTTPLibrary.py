@@ -177,6 +177,8 @@ class Requests:
         self.bearertoken = None
         self.refreshtoken = None
         self.sessionid = None
+        # Last ETag and content per url. ETag is sent as If-None-Match on next GET call
+        self.etags = {}
 
     def close(self):
         """Close the HTTP sessions."""
@@ -384,6 +386,8 @@ class Requests:
         kwargs.setdefault("headers", {})
         kwargs["headers"] = {**self.default_headers, **kwargs["headers"]}
         url = urllib.parse.urljoin(self.host, self._stripHostFromUrl(uri))
+        if verb == "GET" and url in self.etags:
+            kwargs["headers"].setdefault("If-None-Match", self.etags[url][0])
         try:
             if kwargs["SiteRMHTTPCall"]:
                 response = self.__makeSiteRMHTTPCall(url, verb, **kwargs)
@@ -401,8 +405,21 @@ class Requests:
                     response.reason_phrase,
                     False,
                 )
+            if response.status_code == 304 and url in self.etags:
+                # Not modified since last call, return cached content
+                return copy.deepcopy(self.etags[url][1]), response.status_code, response.reason_phrase, False
+            if response.status_code == 304:
+                # Not modified, but we have no cached content (e.g. If-None-Match set by caller)
+                msg = f"HTTP request returned 304 Not Modified, but there is no cached content for URL: {url}"
+                self._logMessage(msg)
+                if kwargs["raiseEx"]:
+                    raise HTTPException(msg)
+                return {"error": msg}, 500, "Not Modified without cached content", False
+            content = getResponseContent(response, kwargs["json"])
+            if verb == "GET" and response.status_code == 200 and response.headers.get("etag"):
+                self.etags[url] = (response.headers["etag"], copy.deepcopy(content))
             return (
-                getResponseContent(response, kwargs["json"]),
+                content,
                 response.status_code,
                 response.reason_phrase,
                 False,
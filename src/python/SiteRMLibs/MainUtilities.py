@@ -38,7 +38,7 @@ from SiteRMLibs.CustomExceptions import (
     NotFoundError,
     WrongInputError,
 )
-from SiteRMLibs.DBBackend import dbinterface
+from SiteRMLibs.DBBackend import asyncdbinterface, dbinterface
 from yaml import safe_load as yload
 
 HOSTSERVICES = [
@@ -503,6 +503,12 @@ def generateMD5(inText):
     return hashObj.hexdigest()
 
 
+def generateModelDigest(ntriples):
+    """Generate stable digest of model from N-Triples (independent of triple order)"""
+    lines = sorted(line.strip() for line in ntriples.splitlines() if line.strip())
+    return hashlib.sha256("\n".join(lines).encode()).hexdigest()
+
+
 def getHostname(config=None, service=None):
     """Return running server hostname"""
     # In case of FE, we need to return hostname as default
@@ -630,6 +636,11 @@ def getDBConnObj():
     return dbinterface()
 
 
+def getAsyncDBConnObj(config=""):
+    """Get async database connection object (for REST API handlers)"""
+    return asyncdbinterface("REST", config)
+
+
 def parseRDFFile(modelFile):
     """Parse model file and return Graph."""
     formats = ["ntriples", "turtle", "json-ld"]
@@ -647,6 +658,19 @@ def parseRDFFile(modelFile):
     raise NotFoundError(f"Model file {modelFile} could not be parsed with any format: {formats}. Please check the file format or content. All exceptions: {exclist}")
 
 
+def parseRDFString(content, fmt=None):
+    """Parse RDF content from string and return Graph. If format not provided, identify it from content."""
+    if not fmt:
+        # Turtle parser also parses ntriples
+        fmt = "json-ld" if content.lstrip().startswith(("{", "[")) else "turtle"
+    try:
+        graph = Graph()
+        graph.parse(data=content, format=fmt)
+        return graph
+    except Exception as ex:  # pylint: disable=broad-except
+        raise NotFoundError(f"Content could not be parsed with format: {fmt}. Error: {ex}") from ex
+
+
 def getCurrentModel(cls, raiseException=False):
     """Get Current Model from DB."""
     currentModel = cls.dbI.get("models", orderby=["insertdate", "DESC"], limit=1)
@@ -697,20 +721,135 @@ def normalizePipeStrings(obj):
     return obj
 
 
-def getActiveDeltas(cls):
-    """Get Active deltas from DB."""
+def splitActiveDeltas(newConfig):
+    """Split Active Deltas to items (itemtype, itemkey, output).
+    Each connection (vsw, kube, singleport, rst) and each host (SubnetMapping, RoutingMapping)
+    is a separate item. Non dict values and empty dicts are kept with empty itemkey."""
+    out = {}
+    for itemtype, vals in newConfig.items():
+        if isinstance(vals, dict) and vals:
+            for itemkey, itemvals in vals.items():
+                out[(itemtype, itemkey)] = itemvals
+        else:
+            out[(itemtype, "")] = vals
+    return out
+
+
+def mergeActiveDeltas(activeDeltas, items):
+    """Merge Active Delta items (from activeDeltasItems table) to activeDeltas output.
+    If there are no items - activeDeltas output (written before items were introduced) is used."""
+    if not items:
+        activeDeltas["output"] = normalizePipeStrings(evaldict(activeDeltas.get("output", {})))
+        return activeDeltas
+    output = {}
+    for item in items:
+        vals = evaldict(item["output"]) if isinstance(item["output"], str) else item["output"]
+        if item["itemkey"]:
+            output.setdefault(item["itemtype"], {})[item["itemkey"]] = vals
+        elif isinstance(vals, dict):
+            output.setdefault(item["itemtype"], {}).update(vals)
+        else:
+            output[item["itemtype"]] = vals
+    activeDeltas["output"] = output
+    return activeDeltas
+
+
+def getActiveDeltas(cls, itemtypes=None):
+    """Get Active deltas from DB. If itemtypes (e.g. ["vsw", "rst"]) are passed, only these are read."""
     activeDeltas = cls.dbI.get("activeDeltas")
     if not activeDeltas:
         return {"insertdate": int(getUTCnow()), "output": {}}
     activeDeltas = activeDeltas[0]
-    activeDeltas["output"] = evaldict(activeDeltas["output"])
-    activeDeltas["output"] = normalizePipeStrings(activeDeltas["output"])
+    if itemtypes is None:
+        items = cls.dbI.get("activeDeltasItems")
+    else:
+        items = []
+        for itemtype in itemtypes:
+            items += cls.dbI.get("activeDeltasItems", search=[["itemtype", itemtype]])
+    activeDeltas = mergeActiveDeltas(activeDeltas, items)
+    if itemtypes is not None:
+        activeDeltas["output"] = {key: val for key, val in activeDeltas["output"].items() if key in itemtypes}
     return activeDeltas
 
 
+def sliceActiveDeltas(output, hostname):
+    """Get Active Deltas entries relevant only for a single host"""
+    out = {}
+    for key, vals in output.items():
+        if not isinstance(vals, dict):
+            out[key] = vals
+        elif key in ["vsw", "kube", "singleport"]:
+            out[key] = {}
+            for uri, entry in vals.items():
+                if isinstance(entry, dict) and hostname in entry:
+                    out[key][uri] = {subkey: subval for subkey, subval in entry.items() if subkey in ["_params", hostname]}
+        elif key in ["usedIPs", "usedVLANs"]:
+            out[key] = {}
+            for subkey, subvals in vals.items():
+                out[key][subkey] = {hostname: subvals[hostname]} if isinstance(subvals, dict) and hostname in subvals else {}
+        elif key in ["SubnetMapping", "RoutingMapping"]:
+            out[key] = {hostname: vals[hostname]} if hostname in vals else {}
+        else:
+            # rst is kept for all hosts, as agent looks for route overlaps with its own IPs.
+            out[key] = vals
+    return out
+
+
+def writeHostActiveDeltas(cls, newConfig):
+    """Precompute and write Active Deltas sliced for each registered host"""
+    existing = {item["hostname"]: item for item in cls.dbI.get("activeDeltasHost")}
+    for hostname in getAllHosts(cls.dbI):
+        output = jsondumps(sliceActiveDeltas(newConfig, hostname))
+        version = generateMD5(output)
+        if hostname not in existing:
+            cls.dbI.insert(
+                "activeDeltasHost",
+                [{"hostname": hostname, "insertdate": int(getUTCnow()), "updatedate": int(getUTCnow()), "output": output, "version": version}],
+            )
+            continue
+        hostDeltas = existing.pop(hostname)
+        if hostDeltas.get("version") == version:
+            continue
+        hostDeltas["updatedate"] = int(getUTCnow())
+        hostDeltas["output"] = output
+        hostDeltas["version"] = version
+        cls.dbI.update("activeDeltasHost", [hostDeltas])
+    # Remove entries of hosts which are not registered anymore
+    if existing:
+        cls.dbI.delete_comp("activeDeltasHost", "id", "in", [hostDeltas["id"] for hostDeltas in existing.values()])
+
+
+def writeActiveDeltaItems(cls, newConfig):
+    """Write Active Delta items to DB. Only changed items are written, removed items are deleted.
+    Returns version of full Active Deltas (generated from item versions)."""
+    existing = {(item["itemtype"], item["itemkey"]): item for item in cls.dbI.get("activeDeltasItems", columns=["id", "itemtype", "itemkey", "version"])}
+    changed, versions = [], []
+    for (itemtype, itemkey), vals in sorted(splitActiveDeltas(newConfig).items()):
+        output = jsondumps(normalizePipeStrings(vals))
+        version = generateMD5(output)
+        versions.append(f"{itemtype}|{itemkey}|{version}")
+        dbItem = existing.pop((itemtype, itemkey), None)
+        if dbItem and dbItem["version"] == version:
+            continue
+        changed.append({"itemtype": itemtype, "itemkey": itemkey, "insertdate": int(getUTCnow()), "updatedate": int(getUTCnow()), "output": output, "version": version})
+    if changed:
+        cls.dbI.upsert("activeDeltasItems", changed, ["itemtype", "itemkey"])
+    if existing:
+        cls.dbI.delete_comp("activeDeltasItems", "id", "in", [dbItem["id"] for dbItem in existing.values()])
+    return generateMD5(",".join(versions))
+
+
 def writeActiveDeltas(cls, newConfig):
-    """Write Active Deltas to DB"""
-    activeDeltas = cls.dbI.get("activeDeltas")
+    """Write Active Deltas to DB. Items, version and host slices are written in one transaction,
+    so readers never see items of one version together with another version."""
+    with cls.dbI.transaction():
+        _writeActiveDeltas(cls, newConfig)
+
+
+def _writeActiveDeltas(cls, newConfig):
+    """Write Active Deltas to DB (inside transaction)"""
+    version = writeActiveDeltaItems(cls, newConfig)
+    activeDeltas = cls.dbI.get("activeDeltas", columns=["id", "insertdate", "version"])
     action = "update"
     if not activeDeltas:
         action = "insert"
@@ -718,11 +857,14 @@ def writeActiveDeltas(cls, newConfig):
     else:
         activeDeltas = activeDeltas[0]
     activeDeltas["updatedate"] = int(getUTCnow())
-    activeDeltas["output"] = jsondumps(newConfig)
+    # Content is kept in activeDeltasItems table
+    activeDeltas["output"] = jsondumps({})
+    activeDeltas["version"] = version
     if action == "insert":
         cls.dbI.insert("activeDeltas", [activeDeltas])
     elif action == "update":
         cls.dbI.update("activeDeltas", [activeDeltas])
+    writeHostActiveDeltas(cls, newConfig)
 
 
 def strtolist(intext, splitter):
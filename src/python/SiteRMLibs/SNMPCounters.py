@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+SNMP Counters store. Keeps fixed size ring buffer of (timestamp, value) samples
+per (device, interface, metric) in snmpcounters table. Last value is kept in
+separate column, so exporters do not need to decode samples.
+
+Authors:
+  Justas Balcas jbalcas (at) es (dot) net
+
+Date: 2026/10/17
+"""
+
+import struct
+
+from SiteRMLibs.DefaultParams import SNMP_COUNTER_SAMPLES
+from SiteRMLibs.MainUtilities import getUTCnow, isValFloat
+
+# Sample: timestamp (uint32) and value (double)
+SAMPLE = struct.Struct("<Id")
+# Interface keys which are labels, not counters
+LABEL_KEYS = ("ifDescr", "ifType", "ifAlias")
+# Columns read by exporters (without samples)
+LAST_VALUE_COLUMNS = ["hostname", "ifindex", "metric", "labels", "lastvalue", "updatedate"]
+
+
+class CounterRing:
+    """Fixed size ring buffer of (timestamp, value) samples, stored as bytes."""
+
+    def __init__(self, samples=None, position=0, size=SNMP_COUNTER_SAMPLES):
+        self.size = size
+        if samples and len(samples) == size * SAMPLE.size:
+            # Same ring size, use stored buffer as is (only the new slot is packed on append)
+            self.buffer = bytearray(samples)
+            self.position = position % size
+            return
+        self.buffer = bytearray(size * SAMPLE.size)
+        self.position = 0
+        if samples:
+            # Ring size could have changed since samples were written. Keep the newest ones.
+            for timestamp, value in CounterRing._decode(samples, position)[-size:]:
+                self.append(timestamp, value)
+
+    @staticmethod
+    def _decode(samples, position):
+        """Decode samples (oldest first)"""
+        count = len(samples) // SAMPLE.size
+        out = []
+        for idx in range(count):
+            timestamp, value = SAMPLE.unpack_from(samples, ((position + idx) % count) * SAMPLE.size)
+            if timestamp:
+                out.append((timestamp, value))
+        return out
+
+    def append(self, timestamp, value):
+        """Add sample (overwrites the oldest one if ring is full)"""
+        SAMPLE.pack_into(self.buffer, self.position * SAMPLE.size, int(timestamp), float(value))
+        self.position = (self.position + 1) % self.size
+
+    def samples(self, start=0, end=None):
+        """Get samples (oldest first) with start <= timestamp <= end"""
+        return [(timestamp, value) for timestamp, value in self._decode(self.buffer, self.position) if timestamp >= start and (end is None or timestamp <= end)]
+
+    def last(self):
+        """Get the newest sample (or None)"""
+        out = self._decode(self.buffer, self.position)
+        return out[-1] if out else None
+
+    def tobytes(self):
+        """Get ring buffer as bytes"""
+        return bytes(self.buffer)
+
+
+def writeSNMPCounters(dbI, hostname, output, timestamp=None):
+    """Append interface counters from SNMP output ({ifindex: {metric: value}}) to ring buffers"""
+    timestamp = timestamp or getUTCnow()
+    existing = {(item["ifindex"], item["metric"]): item for item in dbI.get("snmpcounters", search=[["hostname", hostname]], columns=["ifindex", "metric", "insertdate", "position", "samples"])}
+    rows = []
+    for ifindex, vals in output.items():
+        if ifindex == "macs" or not isinstance(vals, dict):
+            continue
+        labels = {key: vals.get(key, "") for key in LABEL_KEYS}
+        for metric, value in vals.items():
+            if metric in LABEL_KEYS or not isinstance(value, (str, int, float)) or not isValFloat(value):
+                continue
+            dbItem = existing.get((str(ifindex), metric), {})
+            ring = CounterRing(dbItem.get("samples"), dbItem.get("position", 0))
+            ring.append(timestamp, value)
+            rows.append(
+                {
+                    "hostname": hostname,
+                    "ifindex": str(ifindex),
+                    "metric": metric,
+                    "insertdate": dbItem.get("insertdate", timestamp),
+                    "updatedate": timestamp,
+                    "labels": labels,
+                    "lastvalue": float(value),
+                    "position": ring.position,
+                    "samples": ring.tobytes(),
+                }
+            )
+    if rows:
+        dbI.upsert("snmpcounters", rows, ["hostname", "ifindex", "metric"])
+    return len(rows)
+
+
+def getSNMPCounters(dbI, hostname=None, ifindex=None, metric=None, start=None, end=None):
+    """Get counters. Without start/end only last values are returned (samples are not read)."""
+    search = [[key, val] for key, val in (("hostname", hostname), ("ifindex", ifindex), ("metric", metric)) if val is not None]
+    if start is None and end is None:
+        return dbI.get("snmpcounters", search=search, columns=LAST_VALUE_COLUMNS)
+    out = []
+    for item in dbI.get("snmpcounters", search=search, columns=LAST_VALUE_COLUMNS + ["position", "samples"]):
+        ring = CounterRing(item.pop("samples"), item.pop("position"))
+        item["samples"] = ring.samples(start or 0, end)
+        out.append(item)
+    return out
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Vlan Set - compact 4096 bit vlan set (bitmap kept in python int).
+
+Authors:
+  Justas Balcas jbalcas (at) es (dot) net
+
+Date: 2026/10/17
+"""
+
+MAXVLAN = 4095
+
+
+class VlanSet:
+    """Set of vlans (0-4095) kept as a bitmap."""
+
+    def __init__(self, vals=None):
+        self.bits = 0
+        if vals is None:
+            return
+        if isinstance(vals, VlanSet):
+            self.bits = vals.bits
+        elif isinstance(vals, int):
+            self.add(vals)
+        elif isinstance(vals, str):
+            for val in vals.split(","):
+                self._addItem(val)
+        else:
+            for val in vals:
+                self._addItem(val)
+
+    @staticmethod
+    def _checkVlan(vlan):
+        """Check that vlan is in allowed range"""
+        vlan = int(vlan)
+        if vlan < 0 or vlan > MAXVLAN:
+            raise ValueError(f"Configuration Error. Vlan {vlan} out of range 0-{MAXVLAN}")
+        return vlan
+
+    def _addItem(self, inVal):
+        """Add vlan or vlan range (e.g. 100-200) item"""
+        if isinstance(inVal, int):
+            self.add(inVal)
+            return
+        if not str(inVal).strip():
+            return
+        tmpvals = str(inVal).strip().split("-")
+        if len(tmpvals) == 2:
+            # In case second val is bigger than 1st - raise Exception
+            if int(tmpvals[0]) >= int(tmpvals[1]):
+                raise ValueError(f"Configuration Error. Vlan Range equal or lower. Vals: {tmpvals}")
+            self.addRange(int(tmpvals[0]), int(tmpvals[1]))
+        else:
+            self.add(int(tmpvals[0]))
+
+    def add(self, vlan):
+        """Add vlan to set"""
+        self.bits |= 1 << self._checkVlan(vlan)
+
+    def addRange(self, start, end):
+        """Add all vlans from start to end (inclusive)"""
+        start, end = self._checkVlan(start), self._checkVlan(end)
+        if start <= end:
+            self.bits |= ((1 << (end - start + 1)) - 1) << start
+
+    def update(self, vals):
+        """Add all vlans from vals (VlanSet, list or range string)"""
+        self.bits |= VlanSet(vals).bits
+        return self
+
+    def discard(self, vlan):
+        """Remove vlan from set (if present)"""
+        vlan = int(vlan)
+        if 0 <= vlan <= MAXVLAN:
+            self.bits &= ~(1 << vlan)
+
+    def __contains__(self, vlan):
+        try:
+            vlan = int(vlan)
+        except (TypeError, ValueError):
+            return False
+        return 0 <= vlan <= MAXVLAN and bool((self.bits >> vlan) & 1)
+
+    def __iter__(self):
+        bits = self.bits
+        while bits:
+            lowbit = bits & -bits
+            yield lowbit.bit_length() - 1
+            bits ^= lowbit
+
+    def __len__(self):
+        return self.bits.bit_count()
+
+    def __bool__(self):
+        return self.bits != 0
+
+    def __eq__(self, other):
+        if isinstance(other, VlanSet):
+            return self.bits == other.bits
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.bits)
+
+    @staticmethod
+    def _fromBits(bits):
+        """Create new set from bitmap"""
+        newSet = VlanSet()
+        newSet.bits = bits
+        return newSet
+
+    def __or__(self, other):
+        return self._fromBits(self.bits | VlanSet(other).bits)
+
+    def __and__(self, other):
+        return self._fromBits(self.bits & VlanSet(other).bits)
+
+    def __sub__(self, other):
+        return self._fromBits(self.bits & ~VlanSet(other).bits)
+
+    def __ior__(self, other):
+        return self.update(other)
+
+    def __isub__(self, other):
+        self.bits &= ~VlanSet(other).bits
+        return self
+
+    def toList(self):
+        """Get sorted list of vlans"""
+        return list(self)
+
+    def toRanges(self):
+        """Get list of (start, end) ranges"""
+        out = []
+        bits = self.bits
+        while bits:
+            start = (bits & -bits).bit_length() - 1
+            # Length of run of set bits starting at start
+            run = (~(bits >> start) & ((bits >> start) + 1)).bit_length() - 1
+            out.append((start, start + run - 1))
+            bits &= ~(((1 << run) - 1) << start)
+        return out
+
+    def toRangeStr(self):
+        """Get range encoded string, e.g. 100-200,300"""
+        return ",".join(f"{start}-{end}" if start != end else str(start) for start, end in self.toRanges())
+
+    def __str__(self):
+        return self.toRangeStr()
+
+    def __repr__(self):
+        return f"VlanSet('{self.toRangeStr()}')"
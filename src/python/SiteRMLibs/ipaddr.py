@@ -19,7 +19,22 @@ from ipaddress import (
 
 import netifaces
 import psutil
-from SiteRMLibs.MainUtilities import externalCommand
+from pyroute2 import IPRoute
+
+# Interface flag (IFF_UP) and counters reported in interface inventory (IFLA_STATS64)
+IFF_UP = 0x1
+INTF_STATS_KEYS = (
+    "rx_packets",
+    "tx_packets",
+    "rx_bytes",
+    "tx_bytes",
+    "rx_errors",
+    "tx_errors",
+    "rx_dropped",
+    "tx_dropped",
+)
+# Duplex values as reported by psutil (NIC_DUPLEX_*)
+INTF_DUPLEX = {"full": 2, "half": 1}
 
 
 def makeUrl(baseUrl, *addons):
@@ -31,21 +46,72 @@ def makeUrl(baseUrl, *addons):
     return url
 
 
-def getMasterSlaveInterfaces():
-    """Get dictionary of slaveIntfName: MasterIntfName interfaces"""
+def readSysfs(interface, name, default=None):
+    """Read /sys/class/net/<interface>/<name> value (default if not available)"""
+    try:
+        with open(f"/sys/class/net/{interface}/{name}", "r", encoding="utf-8") as fd:
+            return fd.read().strip()
+    except OSError:
+        return default
+
+
+def getInterfaceInventory(ipr=None):
+    """Get all interfaces (addresses, link/master relations, MTU, txqueuelen, speed
+    and counters) with one netlink links and addresses dump. Link is the same as
+    shown by ip -br a (e.g. vlan100@eth0), master is bond/bridge interface.
+    Open IPRoute socket can be passed, otherwise new one is used."""
+    if ipr is None:
+        with IPRoute() as newipr:
+            return getInterfaceInventory(newipr)
+    links = ipr.get_links()
+    addrs = ipr.get_addr()
+    names = {link["index"]: link.get_attr("IFLA_IFNAME") for link in links}
     out = {}
-    nics = externalCommand("ip -br a")
-    for nicline in nics[0].split("\n"):
-        if not nicline:
+    for link in links:
+        name = names[link["index"]]
+        linkIdx = link.get_attr("IFLA_LINK")
+        masterIdx = link.get_attr("IFLA_MASTER")
+        stats = link.get_attr("IFLA_STATS64") or {}
+        speed = readSysfs(name, "speed", "0")
+        out[name] = {
+            "index": link["index"],
+            "link": names.get(linkIdx, f"if{linkIdx}") if linkIdx and linkIdx != link["index"] else "",
+            "master": names.get(masterIdx, "") if masterIdx else "",
+            "isup": bool(link["flags"] & IFF_UP),
+            "operstate": link.get_attr("IFLA_OPERSTATE"),
+            "type": link["ifi_type"],
+            "mtu": link.get_attr("IFLA_MTU"),
+            "txqueuelen": link.get_attr("IFLA_TXQLEN"),
+            "mac": link.get_attr("IFLA_ADDRESS"),
+            "macbroadcast": link.get_attr("IFLA_BROADCAST"),
+            "speed": max(int(speed), 0) if speed.lstrip("-").isdigit() else 0,
+            "duplex": INTF_DUPLEX.get(readSysfs(name, "duplex", ""), 0),
+            "stats": {key: stats.get(key, 0) for key in INTF_STATS_KEYS},
+            "addresses": [],
+        }
+    for addr in addrs:
+        name = names.get(addr["index"])
+        if name not in out:
             continue
-        nictmp = nicline.split()[0].split("@")
-        if len(nictmp) == 1:
-            out.setdefault(nictmp[0], "")
-        elif len(nictmp) == 2:
-            out.setdefault(nictmp[0], nictmp[1])
+        address = addr.get_attr("IFA_ADDRESS")
+        local = addr.get_attr("IFA_LOCAL")
+        out[name]["addresses"].append(
+            {
+                "family": addr["family"],
+                "address": local or address,
+                "prefixlen": addr["prefixlen"],
+                "broadcast": addr.get_attr("IFA_BROADCAST"),
+                "ptp": address if local and address != local else None,
+            }
+        )
     return out
 
 
+def getMasterSlaveInterfaces():
+    """Get dictionary of slaveIntfName: MasterIntfName interfaces"""
+    return {name: vals["link"] for name, vals in getInterfaceInventory().items()}
+
+
 def getInterfaces():
     """Get all interface names"""
     return netifaces.interfaces()
@@ -53,8 +119,7 @@ def getInterfaces():
 
 def getInterfaceTxQueueLen(interface):
     """Get Interface Tx Queue Length"""
-    txQueueLen = externalCommand(f"cat /sys/class/net/{interface}/tx_queue_len")
-    return int(txQueueLen[0].strip())
+    return int(readSysfs(interface, "tx_queue_len", ""))
 
 
 def getAllSubInterfaces(interface):
@@ -74,8 +139,7 @@ def getInterfaceSpeed(interface):
     interfaceSpeed = 0
     for slave in allslaves:
         try:
-            speed = externalCommand(f"cat /sys/class/net/{slave}/speed")
-            speed = int(speed[0].strip())
+            speed = int(readSysfs(slave, "speed", ""))
             if speed != -1:
                 interfaceSpeed += speed
             else:
@@ -86,15 +150,21 @@ def getInterfaceSpeed(interface):
     return interfaceSpeed if interfaceSpeed else 10000
 
 
-def getIfInterfaceReady(interface):
-    """Check if interface exists and is ready."""
-    tmpifAddr, tmpifStats = getIfAddrStats()
-    if interface not in tmpifAddr:
+def getIfInterfaceReady(interface, inventory=None):
+    """Check if interface exists and is ready (inventory from getInterfaceInventory can be passed)."""
+    if inventory is not None:
+        found = interface in inventory
+        isup = found and inventory[interface]["isup"]
+    else:
+        tmpifAddr, tmpifStats = getIfAddrStats()
+        found = interface in tmpifAddr
+        isup = found and tmpifStats[interface].isup
+    if not found:
         return (
             False,
             f"Interface {interface} was not found on the system. Misconfiguration",
         )
-    if not tmpifStats[interface].isup:
+    if not isup:
         return False, f"Interface {interface} is not up. Check why interface is down."
     return True, ""
 
@@ -0,0 +1,185 @@
+"""Test ConflictIndex gives same results as linear overlap checks over active configuration"""
+
+import random
+import tempfile
+import unittest
+
+from SiteFE.PolicyService.conflictindex import PrefixIndex
+from SiteFE.PolicyService.deltachecks import ConflictChecker
+from SiteRMLibs.CustomExceptions import OverlapException
+
+HOSTS = ["host1", "host2"]
+PORTS = ["eth0", "eth1"]
+
+
+class LogConfig:
+    """Configuration with log directory only"""
+
+    def __init__(self):
+        self.logdir = tempfile.mkdtemp()
+
+    def get(self, section, option, default=None):
+        """Get configuration value"""
+        if (section, option) == ("general", "logDir"):
+            return self.logdir
+        return default
+
+
+def linearIPOverlaps(checker, nStats, connItems, hostname, oldConfig):
+    """Vlan and IP overlap check over all active deltas (as done before ConflictIndex)"""
+    for svcitem in ["vsw", "singleport", "kube"]:
+        for oldID, oldItems in oldConfig.get(svcitem, {}).items():
+            if oldID == checker.newid:
+                continue
+            checker.oldid = oldID
+            if checker._checkIfOverlap(connItems, oldItems):
+                for oldHost, oldHostItems in oldItems.items():
+                    if hostname != oldHost:
+                        continue
+                    for item in checker._getVlanIPs(oldHostItems):
+                        checker._checkIfVlanOverlap(nStats, item)
+                        checker._checkIfIPOverlap(nStats.get("ipv6-address", ""), item.get("ipv6-address", ""), "ipv6")
+                        checker._checkIfIPOverlap(nStats.get("ipv4-address", ""), item.get("ipv4-address", ""), "ipv4")
+
+
+def linearBandwidth(checker, hostname, portName, connItems, oldConfig):
+    """Bandwidth used on port by all active deltas (as done before ConflictIndex)"""
+    usedBW = 0
+    for svcitem in ["vsw", "singleport", "kube"]:
+        for oldID, oldItems in oldConfig.get(svcitem, {}).items():
+            if oldID == checker.newid:
+                continue
+            if checker._checkIfOverlap(connItems, oldItems):
+                for oldHost, oldHostItems in oldItems.items():
+                    if hostname != oldHost:
+                        continue
+                    for item in checker._getVlanIPs(oldHostItems, bwstats=True):
+                        if portName == item.get("interface", "") and "bandwidth" in item:
+                            usedBW += item["bandwidth"]
+    return usedBW
+
+
+def linearRST(checker, nStats, connItems, hostname, oldConfig):
+    """Route overlap check over all active deltas (as done before ConflictIndex)"""
+    for oldID, oldItems in oldConfig.get("rst", {}).items():
+        checker.oldid = oldID
+        if oldID == checker.newid:
+            continue
+        if checker._checkIfOverlap(connItems, oldItems) and oldItems.get(hostname, {}):
+            oStats = checker._getRSTIPs(oldItems[hostname])
+            for key in ["ipv4", "ipv6"]:
+                checker._checkIfIPOverlap(nStats.get(key, {}).get("nextHop", ""), oStats.get(key, {}).get("nextHop", ""), key)
+                checker._checkRSTIPOverlap(nStats.get(key, {}), oStats.get(key, {}), key)
+
+
+def raises(func, *args):
+    """Check if function raises OverlapException"""
+    try:
+        func(*args)
+    except OverlapException:
+        return True
+    return False
+
+
+class TestConflictIndex(unittest.TestCase):
+    """UnitTest"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.checker = ConflictChecker(LogConfig(), "T2_US_TEST")
+
+    def setUp(self):
+        self.rand = random.Random(42)
+
+    def randTimes(self):
+        """Random existsDuring window"""
+        start = self.rand.randint(1000, 5000)
+        return {"existsDuring": {"start": start, "end": start + self.rand.randint(1, 2000)}}
+
+    def randIPv4(self):
+        """Random IPv4 network inside 10.0.0.0/16"""
+        return f"10.0.{self.rand.randint(0, 3)}.{self.rand.randint(0, 255)}/{self.rand.choice([16, 22, 24, 30, 32])}"
+
+    def randIPv6(self):
+        """Random IPv6 network inside 2001:db8::/48"""
+        return f"2001:db8:0:{self.rand.randint(0, 3):x}::{self.rand.randint(1, 255):x}/{self.rand.choice([48, 60, 64, 126, 128])}"
+
+    def randVswHost(self):
+        """Random vsw host items"""
+        out = {}
+        for port in self.rand.sample(PORTS, self.rand.randint(1, 2)):
+            item = {"hasLabel": {"value": self.rand.randint(100, 110)}}
+            addrs = {}
+            if self.rand.random() < 0.6:
+                addrs["ipv4-address"] = {"value": self.randIPv4()}
+            if self.rand.random() < 0.6:
+                addrs["ipv6-address"] = {"value": self.randIPv6()}
+            if addrs:
+                item["hasNetworkAddress"] = addrs
+            if self.rand.random() < 0.7:
+                item["hasService"] = {"type": "guaranteedCapped", "reservableCapacity": self.rand.randint(1, 1000), "unit": "mbps"}
+            out[port] = item
+        return out
+
+    def randRSTHost(self):
+        """Random rst host items"""
+        out = {}
+        for key, randip in [("ipv4", self.randIPv4), ("ipv6", self.randIPv6)]:
+            if self.rand.random() < 0.7:
+                route = {
+                    "nextHop": {f"{key}-address": {"value": randip().split("/", maxsplit=1)[0]}},
+                    "routeFrom": {f"{key}-prefix-list": {"value": randip()}},
+                    "routeTo": {f"{key}-prefix-list": {"value": randip()}},
+                }
+                out[key] = {"hasRoute": {"route1": route}}
+        return out
+
+    def randConfig(self, count):
+        """Random active configuration"""
+        out = {"vsw": {}, "kube": {}, "rst": {}}
+        for idx in range(count):
+            svcitem = self.rand.choice(["vsw", "kube", "rst"])
+            conn = {"_params": self.randTimes()}
+            for host in self.rand.sample(HOSTS, self.rand.randint(1, 2)):
+                conn[host] = self.randRSTHost() if svcitem == "rst" else self.randVswHost()
+            out[svcitem][f"conn{idx}"] = conn
+        return out
+
+    def test_prefix_index(self):
+        """Test prefix index finds all containing, contained and equal networks"""
+        index = PrefixIndex("ipv4")
+        for net in ["10.0.0.0/16", "10.0.1.0/24", "10.0.1.5/32", "10.1.0.0/24", "invalid"]:
+            index.add(net, net)
+        self.assertEqual(sorted(index.overlapping("10.0.1.0/25")), ["10.0.0.0/16", "10.0.1.0/24", "10.0.1.5/32"])
+        self.assertEqual(sorted(index.overlapping("10.0.0.0/8")), ["10.0.0.0/16", "10.0.1.0/24", "10.0.1.5/32", "10.1.0.0/24"])
+        self.assertEqual(index.overlapping("10.2.0.0/24"), [])
+        self.assertEqual(index.overlapping(""), [])
+
+    def test_same_as_linear(self):
+        """Test indexed vlan/IP, bandwidth and route checks match linear checks over all active deltas"""
+        checked = {("ip", True): 0, ("ip", False): 0, ("rst", True): 0, ("rst", False): 0}
+        for _ in range(15):
+            oldConfig = self.randConfig(40)
+            self.checker.index = None
+            self.checker.newid = "newconn"
+            for _ in range(20):
+                connItems = {"_params": self.randTimes()}
+                hostname = self.rand.choice(HOSTS)
+                for nStats in self.checker._getVlanIPs(self.randVswHost(), bwstats=True):
+                    expected = raises(linearIPOverlaps, self.checker, nStats, connItems, hostname, oldConfig)
+                    self.assertEqual(raises(self.checker._checkIPOverlaps, nStats, connItems, hostname, oldConfig), expected)
+                    checked[("ip", expected)] += 1
+                    self.assertEqual(
+                        self.checker._bwOverlapCalculation(hostname, nStats["interface"], connItems, oldConfig),
+                        linearBandwidth(self.checker, hostname, nStats["interface"], connItems, oldConfig),
+                    )
+                nStats = self.checker._getRSTIPs(self.randRSTHost())
+                expected = raises(linearRST, self.checker, nStats, connItems, hostname, oldConfig)
+                self.assertEqual(raises(self.checker._comparewithOldConfig, nStats, connItems, hostname, oldConfig), expected)
+                checked[("rst", expected)] += 1
+        # Both conflicting and not conflicting requests were compared
+        self.assertTrue(all(checked.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+"""Test that DB indexes cover query shapes used by DBBackend callers"""
+
+import unittest
+
+from SiteRMLibs.DBModels import REGISTRY
+
+# Query shapes (table: list of columns) as used by dbinterface callers.
+# Equality filter columns go first, range/order by column goes last.
+QUERY_SHAPES = {
+    "models": [["uid"], ["insertdate"]],
+    "deltas": [
+        ["uid"],
+        ["state"],
+        ["state", "insertdate"],
+        ["state", "updatedate"],
+        ["insertdate"],
+        ["updatedate"],
+    ],
+    "states": [["deltaid", "insertdate"], ["insertdate"]],
+    "hoststates": [["updatedate"]],
+    "hoststateshistory": [["insertdate"]],
+    "hosts": [["ip"], ["hostname"], ["hostname", "updatedate"], ["updatedate"]],
+    "services": [["hostname", "servicename"], ["updatedate"]],
+    "switch": [["sitename"], ["updatedate"]],
+    "servicestates": [["hostname", "servicename"], ["hostname"], ["updatedate"]],
+    "debugworkers": [["updatedate"]],
+    "debugrequests": [
+        ["hostname", "state", "updatedate"],
+        ["state", "insertdate"],
+        ["insertdate"],
+        ["updatedate"],
+    ],
+    "activeDeltas": [["insertdate"], ["updatedate"]],
+    "activeDeltasHost": [["hostname"]],
+    "snmpmon": [["hostname"], ["updatedate"]],
+    "snmpcounters": [["hostname"], ["hostname", "ifindex", "metric"], ["updatedate"]],
+    "deltatimestates": [["insertdate"]],
+    "serviceaction": [["hostname", "servicename", "serviceaction"], ["hostname", "servicename"], ["insertdate"]],
+    "instancestartend": [["insertdate"]],
+    "deltasusertracking": [["deltaid", "insertdate"], ["insertdate"]],
+    "users": [["username"]],
+    "refresh_tokens": [["token_hash"], ["expires_at"]],
+}
+
+# Tables cleaned by DBCleaner (by updatedate, or insertdate if table has no updatedate)
+CLEANER_TABLES = [
+    "debugrequests",
+    "deltas",
+    "deltatimestates",
+    "hosts",
+    "models",
+    "servicestates",
+    "states",
+    "hoststates",
+    "hoststateshistory",
+    "switch",
+    "snmpmon",
+    "snmpcounters",
+    "serviceaction",
+    "activeDeltas",
+    "instancestartend",
+    "deltasusertracking",
+    "debugworkers",
+]
+
+
+def getIndexedColumns(model):
+    """Get all column lists which are indexed (indexes, unique constraints, primary key)"""
+    table = model.__table__
+    out = [[col.name for col in table.primary_key.columns]]
+    for index in table.indexes:
+        out.append([col.name for col in index.columns])
+    for constraint in table.constraints:
+        if hasattr(constraint, "columns"):
+            out.append([col.name for col in constraint.columns])
+    for col in table.columns:
+        if col.unique or col.index:
+            out.append([col.name])
+    return out
+
+
+class TestDBIndexes(unittest.TestCase):
+    """UnitTest"""
+
+    def test_query_shapes(self):
+        """Test that each query shape is a leftmost prefix of some index"""
+        for tablename, shapes in QUERY_SHAPES.items():
+            self.assertIn(tablename, REGISTRY, msg=f"Unknown table {tablename}")
+            indexed = getIndexedColumns(REGISTRY[tablename])
+            for shape in shapes:
+                covered = any(cols[: len(shape)] == shape for cols in indexed)
+                self.assertTrue(covered, msg=f"Query shape {shape} on {tablename} is not covered by any index. Indexes: {indexed}")
+
+    def test_cleaner_columns(self):
+        """Test that timestamp column used by DBCleaner is indexed"""
+        for tablename in CLEANER_TABLES:
+            columns = REGISTRY[tablename].__table__.columns.keys()
+            timecol = "updatedate" if "updatedate" in columns else "insertdate"
+            indexed = getIndexedColumns(REGISTRY[tablename])
+            self.assertTrue(any(cols[:1] == [timecol] for cols in indexed), msg=f"Cleaner column {timecol} on {tablename} is not indexed")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+"""Test DB interface on in-memory SQLite backend"""
+
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ.setdefault("MARIA_DB_STATS_DIR", tempfile.mkdtemp())
+
+# pylint: disable=wrong-import-position
+from SiteRMLibs.DBBackend import asyncdbinterface, dbinterface
+from SiteRMLibs.DBModels import REGISTRY
+from SiteRMLibs.MainUtilities import getActiveDeltas, getUTCnow, writeActiveDeltas
+from SiteRMLibs.SNMPCounters import getSNMPCounters, writeSNMPCounters
+
+
+class TestDBSQLite(unittest.TestCase):
+    """UnitTest"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.dbI = dbinterface("test")
+
+    def setUp(self):
+        self.dbI.db.cleandb()
+
+    def test_shared_memory_db(self):
+        """Test that all dbinterface objects of the process see the same in-memory database"""
+        self.dbI.insert("hosts", [{"ip": "10.0.0.1", "hostname": "host1", "insertdate": getUTCnow(), "updatedate": getUTCnow(), "hostinfo": "{}"}])
+        self.assertEqual(len(dbinterface("test2").get("hosts", search=[["hostname", "host1"]])), 1)
+
+    def test_upsert(self):
+        """Test upsert inserts new rows and updates existing ones (insertdate kept)"""
+        self.dbI.upsert("snmpmon", [{"hostname": "sw1", "insertdate": 1, "updatedate": 1, "output": {"a": 1}}], ["hostname"])
+        self.dbI.upsert(
+            "snmpmon",
+            [
+                {"hostname": "sw1", "insertdate": 2, "updatedate": 2, "output": {"a": 2}},
+                {"hostname": "sw2", "insertdate": 2, "updatedate": 2, "output": {"b": 1}},
+            ],
+            ["hostname"],
+        )
+        out = {item["hostname"]: item for item in self.dbI.get("snmpmon")}
+        self.assertEqual(sorted(out.keys()), ["sw1", "sw2"])
+        self.assertEqual(out["sw1"]["insertdate"], 1)
+        self.assertEqual(out["sw1"]["updatedate"], 2)
+        self.assertEqual(out["sw1"]["output"], {"a": 2})
+
+    def test_delete_comp_chunked(self):
+        """Test chunked delete of old rows"""
+        self.dbI.bulk_insert("hoststateshistory", [{"deltaid": f"delta{idx}", "state": "activated", "hostname": "host1", "insertdate": idx} for idx in range(1, 11)])
+        self.dbI.delete_comp_chunked("hoststateshistory", "insertdate", "<", 6, chunksize=2)
+        self.assertEqual(sorted(item["insertdate"] for item in self.dbI.get("hoststateshistory", columns=["insertdate"])), list(range(6, 11)))
+
+    def test_delete_comp_chunked_no_autocommit(self):
+        """Test chunked delete commits each chunk when autocommit is disabled"""
+        self.dbI.bulk_insert("hoststateshistory", [{"deltaid": f"delta{idx}", "state": "activated", "hostname": "host1", "insertdate": idx} for idx in range(1, 11)])
+        self.dbI.db.autocommit = False
+        try:
+            self.assertEqual(self.dbI.delete_comp_chunked("hoststateshistory", "insertdate", "<", 6, chunksize=2), 5)
+        finally:
+            self.dbI.db.autocommit = True
+        self.assertEqual(len(self.dbI.get("hoststateshistory", columns=["insertdate"])), 5)
+
+    def test_upsert_mixed_columns(self):
+        """Test upsert refuses rows with different columns"""
+        rows = [{"hostname": "sw1", "insertdate": 1, "updatedate": 1, "output": {}}, {"hostname": "sw2", "insertdate": 1, "updatedate": 1}]
+        with self.assertRaises(ValueError):
+            self.dbI.upsert("snmpmon", rows, ["hostname"])
+        self.assertEqual(self.dbI.get("snmpmon"), [])
+
+    def test_dedup_unique_keys(self):
+        """Test duplicate rows (from before unique constraints) are removed, newest row kept"""
+        self.dbI.db.executeRaw("DROP TABLE snmpmon")
+        self.dbI.db.executeRaw("CREATE TABLE snmpmon (id INTEGER PRIMARY KEY, hostname VARCHAR(255), insertdate INTEGER, updatedate INTEGER, output JSON)")
+        try:
+            for idx, (hostname, updatedate) in enumerate([("sw1", 1), ("sw1", 3), ("sw1", 2), ("sw2", 1)], 1):
+                self.dbI.db.executeRaw(f"INSERT INTO snmpmon VALUES ({idx}, '{hostname}', 1, {updatedate}, '{{}}')")
+            self.assertEqual(self.dbI.db.dedupUniqueKeys(), 2)
+            self.assertEqual(sorted((item["hostname"], item["updatedate"]) for item in self.dbI.get("snmpmon")), [("sw1", 3), ("sw2", 1)])
+        finally:
+            self.dbI.db.executeRaw("DROP TABLE snmpmon")
+            self.dbI.db.createdb()
+
+    def test_active_deltas_items(self):
+        """Test Active Deltas are written per item and only changed items are rewritten"""
+        config = {
+            "vsw": {"conn1": {"host1": {"vlan": "b|a"}}, "conn2": {"host2": {}}},
+            "rst": {},
+            "usedVLANs": {"deltas": {"host1": [100]}, "system": {}},
+        }
+        writeActiveDeltas(self, config)
+        items = {(item["itemtype"], item["itemkey"]): item for item in self.dbI.get("activeDeltasItems")}
+        self.assertEqual(sorted(items.keys()), [("rst", ""), ("usedVLANs", "deltas"), ("usedVLANs", "system"), ("vsw", "conn1"), ("vsw", "conn2")])
+        out = getActiveDeltas(self)["output"]
+        self.assertEqual(out["vsw"]["conn1"]["host1"]["vlan"], "a|b")
+        self.assertEqual(out["rst"], {})
+        self.assertEqual(getActiveDeltas(self, ["usedVLANs"])["output"], {"usedVLANs": {"deltas": {"host1": [100]}, "system": {}}})
+        # Remove conn2 - only conn2 row is deleted, other rows are untouched
+        del config["vsw"]["conn2"]
+        writeActiveDeltas(self, config)
+        newItems = {(item["itemtype"], item["itemkey"]): item for item in self.dbI.get("activeDeltasItems")}
+        self.assertNotIn(("vsw", "conn2"), newItems)
+        self.assertEqual(newItems[("vsw", "conn1")]["id"], items[("vsw", "conn1")]["id"])
+        self.assertEqual(newItems[("vsw", "conn1")]["version"], items[("vsw", "conn1")]["version"])
+
+    def test_transaction_rollback(self):
+        """Test calls inside transaction are rolled back together when one of them fails"""
+        self.dbI.insert("activeDeltas", [{"insertdate": 1, "updatedate": 1, "output": "{}", "version": "v1"}])
+        with self.assertRaises(ValueError):
+            with self.dbI.transaction():
+                self.dbI.upsert("activeDeltasItems", [{"itemtype": "vsw", "itemkey": "conn9", "insertdate": 1, "updatedate": 1, "output": "{}", "version": "x"}], ["itemtype", "itemkey"])
+                self.dbI.update("activeDeltas", [{"id": -1, "version": "v2"}])
+        self.assertEqual(self.dbI.get("activeDeltasItems", search=[["itemkey", "conn9"]]), [])
+        self.assertEqual([item["version"] for item in self.dbI.get("activeDeltas")], ["v1"])
+
+    def test_refresh_tokens(self):
+        """Test refresh_tokens (composite primary key on MariaDB) gets autoincrement id on SQLite"""
+        self.assertEqual([col.name for col in REGISTRY["refresh_tokens"].__table__.primary_key.columns], ["id", "token_hash"])
+        for token in ["hash1", "hash2"]:
+            self.dbI.insert("refresh_tokens", [{"username": "user", "client_ip": "10.0.0.1", "token_hash": token, "session_id": "s1", "expires_at": 1, "permissions": 0}])
+        self.assertEqual(sorted((item["id"], item["token_hash"]) for item in self.dbI.get("refresh_tokens")), [(1, "hash1"), (2, "hash2")])
+
+    def test_async_waiting(self):
+        """Test async interface counts calls waiting for a free database worker"""
+        os.environ["MARIA_DB_ASYNC_WORKERS"] = "1"
+        try:
+            asyncI = asyncdbinterface("testasync")
+        finally:
+            del os.environ["MARIA_DB_ASYNC_WORKERS"]
+        release = threading.Event()
+
+        async def runCalls():
+            blocked = asyncio.ensure_future(asyncI.run(release.wait))
+            queued = asyncio.ensure_future(asyncI.get("hosts"))
+            await asyncio.sleep(0.1)
+            self.assertEqual(asyncI.waiting, 1)
+            release.set()
+            await asyncio.gather(blocked, queued)
+            self.assertEqual(asyncI.waiting, 0)
+
+        asyncio.run(runCalls())
+
+    def test_snmp_counters(self):
+        """Test SNMP counters ring buffer last value and range queries"""
+        for timestamp in range(1, 6):
+            output = {"1": {"ifDescr": "eth0", "ifType": "6", "ifHCInOctets": str(timestamp * 100)}, "macs": {"vlans": {}}}
+            writeSNMPCounters(self.dbI, "sw1", output, timestamp)
+        last = getSNMPCounters(self.dbI, hostname="sw1")
+        self.assertEqual(len(last), 1)
+        self.assertEqual(last[0]["metric"], "ifHCInOctets")
+        self.assertEqual(last[0]["lastvalue"], 500.0)
+        self.assertEqual(last[0]["labels"]["ifDescr"], "eth0")
+        self.assertNotIn("samples", last[0])
+        ranged = getSNMPCounters(self.dbI, hostname="sw1", start=2, end=4)
+        self.assertEqual(ranged[0]["samples"], [(2, 200.0), (3, 300.0), (4, 400.0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
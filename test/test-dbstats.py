@@ -0,0 +1,41 @@
+"""Test database statistics files of processes"""
+
+import os
+import tempfile
+import unittest
+
+import simplejson as json
+from SiteRMLibs import DBStats
+
+
+class TestDBStats(unittest.TestCase):
+    """UnitTest"""
+
+    def setUp(self):
+        self.statsdir = tempfile.mkdtemp()
+        os.environ["MARIA_DB_STATS_DIR"] = self.statsdir
+
+    def writeStats(self, pid, count):
+        """Write statistics file of process"""
+        query = {"service": "test", "table": "hosts", "operation": "get", "count": count, "sum": 0.1, "slow": 0, "buckets": [count]}
+        with open(os.path.join(self.statsdir, f"{pid}.json"), "w", encoding="utf-8") as fd:
+            json.dump({"queries": [query], "pools": []}, fd)
+
+    def test_dead_process_ignored(self):
+        """Test statistics of process which does not exist anymore are removed, not summed"""
+        self.writeStats(os.getpid(), 2)
+        self.writeStats(99999999, 5)
+        merged, _ = DBStats.loadStats()
+        self.assertEqual(merged[("test", "hosts", "get")]["count"], 2)
+        self.assertEqual(os.listdir(self.statsdir), [f"{os.getpid()}.json"])
+
+    def test_remove_at_exit(self):
+        """Test statistics file of this process is removed at exit"""
+        DBStats.DB_STATS.dump()
+        self.assertEqual(os.listdir(self.statsdir), [f"{os.getpid()}.json"])
+        DBStats.removeStats()
+        self.assertEqual(os.listdir(self.statsdir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
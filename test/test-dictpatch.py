@@ -0,0 +1,57 @@
+"""Test dictionary patch used for host report updates"""
+
+import copy
+import unittest
+
+from SiteRMLibs.DictPatch import applyPatch, diffDicts
+
+
+class TestDictPatch(unittest.TestCase):
+    """UnitTest"""
+
+    def assertRoundTrip(self, old, new):
+        """Check that patch from old to new converts old to new (and old is not changed by diff)"""
+        oldCopy = copy.deepcopy(old)
+        patch = diffDicts(old, new)
+        self.assertEqual(old, oldCopy)
+        self.assertEqual(applyPatch(copy.deepcopy(old), patch), new)
+        return patch
+
+    def test_nested_changes(self):
+        """Test nested add, delete and replace"""
+        old = {
+            "hostname": "host1",
+            "NetInfo": {"interfaces": {"eth0": {"mtu": 1500, "vlans": [1, 2]}, "eth1": {"mtu": 9000}}},
+            "CertInfo": {"notAfter": 1},
+        }
+        new = {
+            "hostname": "host1",
+            "NetInfo": {"interfaces": {"eth0": {"mtu": 9000, "vlans": [1, 2, 3], "speed": 100}, "eth2": {"mtu": 1500}}},
+            "KubeInfo": {"isKube": False},
+        }
+        patch = self.assertRoundTrip(old, new)
+        self.assertIn(["set", ["NetInfo", "interfaces", "eth0", "mtu"], 9000], patch)
+        self.assertIn(["del", ["NetInfo", "interfaces", "eth1"]], patch)
+        self.assertIn(["del", ["CertInfo"]], patch)
+        self.assertNotIn("hostname", [item[1][0] for item in patch])
+
+    def test_type_change(self):
+        """Test value replaced by dictionary (and back) and empty dictionaries"""
+        self.assertRoundTrip({"a": 1, "b": {"c": 1}}, {"a": {"x": 1}, "b": 2})
+        self.assertRoundTrip({}, {"a": {}})
+        self.assertRoundTrip({"a": {"b": {}}}, {})
+        self.assertEqual(diffDicts({"a": {"b": [1]}}, {"a": {"b": [1]}}), [])
+
+    def test_mismatch(self):
+        """Test patch which does not match document raises ValueError"""
+        patch = diffDicts({"a": {"b": {"c": 1}}}, {"a": {"b": {"c": 2}}})
+        for doc in [{}, {"a": 1}, {"a": {"b": "string"}}]:
+            with self.assertRaises(ValueError):
+                applyPatch(doc, patch)
+        for item in [["replace", ["a"], 1], ["set", [], 1], ["set", ["a"]], "set"]:
+            with self.assertRaises(ValueError):
+                applyPatch({"a": 1}, [item])
+
+
+if __name__ == "__main__":
+    unittest.main()
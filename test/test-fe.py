@@ -333,6 +333,41 @@ class TestUtils(unittest.TestCase):
         self.assertEqual(out[1], 200, msg=f"Failed to POST on {url}. DataIn: {dic}. Output: {out}")
         self.assertEqual(out[2], "OK", msg=f"Failed to POST on {url}. DataIn: {dic}. Output: {out}")
 
+    def test_updatehost_patch(self):
+        """Test updatehost with report patch and version mismatch (409)"""
+        dic = {
+            "hostname": "unittestpatch",
+            "ip": "1.2.3.5",
+            "insertdate": getUTCnow(),
+            "updatedate": getUTCnow(),
+            "NetInfo": {"unittest": "randomvalue"},
+        }
+        url = f"/api/{self.PARAMS['sitename']}/hosts"
+        # Add Host
+        out = makeRequest(self, url, {"verb": "POST", "data": dic})
+        self.assertEqual(out[1], 200, msg=f"Failed to POST on {url}. DataIn: {dic}. Output: {out}")
+        version = out[0]["version"]
+        hostid = {key: dic[key] for key in ["hostname", "ip", "insertdate", "updatedate"]}
+        # Patch against current version
+        patch = [["set", ["NetInfo", "unittest"], "patchedvalue"]]
+        out = makeRequest(self, url, {"verb": "PUT", "data": {**hostid, "patch": patch, "baseversion": version}})
+        self.assertEqual(out[1], 200, msg=f"Failed to PUT patch on {url}. Output: {out}")
+        self.assertEqual(out[0]["version"], version + 1, msg=f"Version not increased after patch. Output: {out}")
+        # Patch against old version, heartbeat with old version and patch with wrong path must send full report
+        for data in [
+            {**hostid, "patch": patch, "baseversion": version},
+            {**hostid, "nodatachange": True, "version": version},
+            {**hostid, "patch": [["set", ["NoSuchKey", "unittest"], 1]], "baseversion": version + 1},
+        ]:
+            out = makeRequest(self, url, {"verb": "PUT", "data": data})
+            self.assertEqual(out[1], 409, msg=f"Expected 409 on PUT {url}. DataIn: {data}. Output: {out}")
+        # Heartbeat with current version
+        out = makeRequest(self, url, {"verb": "PUT", "data": {**hostid, "nodatachange": True, "version": version + 1}})
+        self.assertEqual(out[1], 200, msg=f"Failed to PUT heartbeat on {url}. Output: {out}")
+        # Delete Host
+        out = makeRequest(self, url, {"verb": "DELETE", "data": dic})
+        self.assertEqual(out[1], 200, msg=f"Failed to DELETE on {url}. DataIn: {dic}. Output: {out}")
+
     def test_getactivedeltas(self):
         """Test getactivedeltas"""
         url = f"/api/{self.PARAMS['sitename']}/frontend/activedeltas"
@@ -340,6 +375,13 @@ class TestUtils(unittest.TestCase):
         self.assertEqual(out[1], 200, msg=f"Failed to GET on {url}. Output: {out}")
         self.assertEqual(out[2], "OK", msg=f"Failed to GET on {url}. Output: {out}")
 
+    def test_getactivedeltashost(self):
+        """Test getactivedeltashost"""
+        url = f"/api/{self.PARAMS['sitename']}/frontend/activedeltas/unittest"
+        out = makeRequest(self, url, {"verb": "GET", "data": {}})
+        self.assertEqual(out[1], 200, msg=f"Failed to GET on {url}. Output: {out}")
+        self.assertEqual(out[2], "OK", msg=f"Failed to GET on {url}. Output: {out}")
+
     def test_getswitchdata(self):
         """Test getswitchdata"""
         url = f"/api/{self.PARAMS['sitename']}/frontend/getswitchdata"
@@ -0,0 +1,65 @@
+"""Test copy-on-write overlay graph"""
+
+import unittest
+
+from rdflib import Graph, Literal, URIRef
+from SiteFE.PolicyService.overlaygraph import OverlayGraph
+
+SUB = URIRef("urn:ogf:network:example.net:2024:host1")
+PRED = URIRef("http://schemas.ogf.org/nml/2013/03/base#hasLabel")
+
+
+def triple(val):
+    """Get test triple with object val"""
+    return (SUB, PRED, Literal(val))
+
+
+class TestOverlayGraph(unittest.TestCase):
+    """UnitTest"""
+
+    def setUp(self):
+        self.base = Graph()
+        for val in ["a", "b", "c"]:
+            self.base.add(triple(val))
+        self.overlay = OverlayGraph(self.base)
+
+    def test_add_remove(self):
+        """Test changes are recorded in overlay only, base graph stays untouched"""
+        self.overlay.add(triple("d"))
+        self.overlay.add(triple("a"))
+        self.overlay.remove(triple("b"))
+        self.overlay.remove(triple("x"))
+        self.assertEqual(set(self.overlay), {triple("a"), triple("c"), triple("d")})
+        self.assertEqual(set(self.base), {triple("a"), triple("b"), triple("c")})
+        # Re-adding removed base triple and removing added triple undo the changes
+        self.overlay.add(triple("b"))
+        self.overlay.remove(triple("d"))
+        self.assertEqual(set(self.overlay), set(self.base))
+        self.assertEqual(len(self.overlay.added), 0)
+        self.assertEqual(self.overlay.removed, set())
+
+    def test_fork_isolation(self):
+        """Test fork shares base graph, but changes of fork and parent do not affect each other"""
+        self.overlay.add(triple("d"))
+        fork = self.overlay.fork()
+        self.assertIs(fork.base, self.base)
+        fork.remove(triple("d"))
+        fork.remove(triple("a"))
+        self.overlay.add(triple("e"))
+        self.assertEqual(set(fork), {triple("b"), triple("c")})
+        self.assertEqual(set(self.overlay), {triple("a"), triple("b"), triple("c"), triple("d"), triple("e")})
+
+    def test_after_remove(self):
+        """Test triples, __contains__ and __len__ after remove"""
+        self.overlay -= [triple("a"), triple("b")]
+        self.overlay += [triple("d")]
+        self.assertNotIn(triple("a"), self.overlay)
+        self.assertIn(triple("c"), self.overlay)
+        self.assertIn(triple("d"), self.overlay)
+        self.assertEqual(len(self.overlay), 2)
+        self.assertEqual(set(self.overlay.triples((SUB, PRED, None))), {triple("c"), triple("d")})
+        self.assertEqual(list(self.overlay.triples((SUB, PRED, Literal("a")))), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+"""Test LookUpService model partitions"""
+
+import unittest
+
+from rdflib import Literal, URIRef
+from SiteFE.LookUpService.modules.partitions import ModelPartitions, PartitionGraph
+
+SUB = URIRef("urn:ogf:network:example.net:2024:host1:ipv4-address")
+VAL = URIRef("http://schemas.ogf.org/mrs/2013/12/topology#value")
+TYPE = URIRef("http://www.w3.org/1999/02/22-rdf-syntax-ns#type")
+
+
+def partGraph(*triples, setTriples=()):
+    """Build partition graph (setTriples are written with Graph.set)"""
+    graph = PartitionGraph()
+    for triple in triples:
+        graph.add(triple)
+    for triple in setTriples:
+        graph.set(triple)
+    return graph
+
+
+class EffectsRecorder:
+    """Target for replayed partition effects"""
+
+    def __init__(self):
+        self.warnings = []
+
+    def addWarning(self, warning):
+        """Record warning"""
+        self.warnings.append(warning)
+
+
+class TestModelPartitions(unittest.TestCase):
+    """UnitTest"""
+
+    def setUp(self):
+        self.parts = ModelPartitions()
+
+    def test_splice(self):
+        """Test splice adds new and removes old triples of partition"""
+        tr1, tr2, tr3 = (SUB, TYPE, Literal("a")), (SUB, TYPE, Literal("b")), (SUB, TYPE, Literal("c"))
+        self.assertEqual(self.parts.splice("host:host1", "h1", partGraph(tr1, tr2)), (2, 0))
+        self.assertEqual(self.parts.splice("host:host1", "h2", partGraph(tr2, tr3)), (1, 1))
+        self.assertEqual(set(self.parts.graph), {tr2, tr3})
+        self.assertTrue(self.parts.isCurrent("host:host1", "h2"))
+        self.assertFalse(self.parts.isCurrent("host:host1", "h1"))
+
+    def test_refcount_release(self):
+        """Test triple shared by partitions stays until last partition releases it"""
+        shared = (SUB, TYPE, Literal("shared"))
+        self.parts.splice("host:host1", "h1", partGraph(shared))
+        self.parts.splice("switch:sw1", "s1", partGraph(shared))
+        self.parts.drop("host:host1")
+        self.assertIn(shared, set(self.parts.graph))
+        self.parts.drop("switch:sw1")
+        self.assertEqual(len(self.parts.graph), 0)
+        self.assertEqual(self.parts.refcount, {})
+
+    def test_prune(self):
+        """Test prune drops only partitions under prefix which were not touched"""
+        for name in ["host:host1", "host:host2", "switch:sw1"]:
+            self.parts.splice(name, "h", partGraph((URIRef(f"urn:{name}"), TYPE, Literal(name))))
+        self.parts.prune("host:")
+        self.parts.prune("switch:")
+        self.assertTrue(self.parts.isCurrent("host:host1", "h"))
+        self.assertEqual(self.parts.prune("host:"), ["host:host2"])
+        self.assertEqual({str(triple[2]) for triple in self.parts.graph}, {"host:host1", "switch:sw1"})
+
+    def test_set_last_partition_wins(self):
+        """Test single valued pair set by two partitions keeps value of partition built last"""
+        self.parts.splice("host:host1", "h", partGraph(setTriples=[(SUB, VAL, Literal("10.0.0.1/24"))]))
+        self.parts.splice("delta:uuid1", "d", partGraph(setTriples=[(SUB, VAL, Literal("10.0.0.2/24"))]))
+        self.assertEqual(set(self.parts.graph.objects(SUB, VAL)), {Literal("10.0.0.2/24")})
+        # Next cycle: host reused, delta reused - delta is built later and still wins
+        self.assertTrue(self.parts.isCurrent("host:host1", "h"))
+        self.assertTrue(self.parts.isCurrent("delta:uuid1", "d"))
+        self.assertEqual(set(self.parts.graph.objects(SUB, VAL)), {Literal("10.0.0.2/24")})
+        # Delta removed - host value is visible again
+        self.parts.drop("delta:uuid1")
+        self.assertEqual(set(self.parts.graph.objects(SUB, VAL)), {Literal("10.0.0.1/24")})
+
+    def test_set_partition_stops_setting(self):
+        """Test value of earlier partition is visible once later partition stops setting the pair"""
+        self.parts.splice("host:host1", "h", partGraph(setTriples=[(SUB, VAL, Literal("a"))]))
+        self.parts.splice("delta:uuid1", "d1", partGraph(setTriples=[(SUB, VAL, Literal("b"))]))
+        self.parts.splice("delta:uuid1", "d2", partGraph((SUB, TYPE, Literal("x"))))
+        self.assertEqual(set(self.parts.graph.objects(SUB, VAL)), {Literal("a")})
+
+    def test_reuse_replays_effects(self):
+        """Test reused partition replays side effects recorded while it was built"""
+        target = EffectsRecorder()
+        self.assertFalse(self.parts.reuse("host:host1", "h", target))
+        self.parts.splice("host:host1", "h", partGraph((SUB, TYPE, Literal("a"))), [("addWarning", "warning1")])
+        self.assertTrue(self.parts.reuse("host:host1", "h", target))
+        self.assertEqual(target.warnings, ["warning1"])
+        self.assertFalse(self.parts.reuse("host:host1", "changed", target))
+        self.assertEqual(target.warnings, ["warning1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
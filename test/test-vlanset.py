@@ -0,0 +1,69 @@
+"""Test VlanSet bitmap vlan set"""
+
+import unittest
+
+from SiteRMLibs.VlanSet import VlanSet
+
+
+class TestVlanSet(unittest.TestCase):
+    """UnitTest"""
+
+    def test_range_parsing(self):
+        """Test vlans and vlan ranges are parsed from string and list"""
+        self.assertEqual(VlanSet("100-103,200, 300").toList(), [100, 101, 102, 103, 200, 300])
+        self.assertEqual(VlanSet(["100-102", 200, "", "5"]).toList(), [5, 100, 101, 102, 200])
+        self.assertEqual(VlanSet(7).toList(), [7])
+        self.assertEqual(VlanSet().toList(), [])
+        with self.assertRaises(ValueError):
+            VlanSet("200-100")
+        with self.assertRaises(ValueError):
+            VlanSet("100-100")
+
+    def test_bounds(self):
+        """Test 0 and 4095 are valid vlans, values outside are rejected"""
+        vlans = VlanSet("0,4095")
+        self.assertEqual(vlans.toList(), [0, 4095])
+        self.assertIn(0, vlans)
+        self.assertIn("4095", vlans)
+        self.assertNotIn(4096, vlans)
+        self.assertNotIn(-1, vlans)
+        self.assertNotIn("abc", vlans)
+        self.assertEqual(len(VlanSet("0-4095")), 4096)
+        for vals in ["4096", "-1", "4000-4096"]:
+            with self.assertRaises(ValueError):
+                VlanSet(vals)
+        vlans.discard(4096)
+        vlans.discard(0)
+        self.assertEqual(vlans.toList(), [4095])
+
+    def test_set_operations(self):
+        """Test union, intersection and difference match python set operations"""
+        first, second = VlanSet("1-10,4095"), VlanSet("5-15,0")
+        for result, expected in [
+            (first | second, set(first) | set(second)),
+            (first & second, set(first) & set(second)),
+            (first - second, set(first) - set(second)),
+        ]:
+            self.assertEqual(result.toList(), sorted(expected))
+        # Operands are not changed, other operand can be list or range string
+        self.assertEqual(first.toList(), list(range(1, 11)) + [4095])
+        self.assertEqual((first & [3, "9-20"]).toList(), [3, 9, 10])
+        inplace = VlanSet("1-3")
+        inplace |= "10"
+        inplace -= [2]
+        self.assertEqual(inplace.toList(), [1, 3, 10])
+        self.assertEqual(VlanSet("1-3"), VlanSet([1, 2, 3]))
+        self.assertEqual(hash(VlanSet("1-3")), hash(VlanSet([3, 2, 1])))
+        self.assertFalse(VlanSet())
+
+    def test_to_list_and_ranges(self):
+        """Test sorted list and range string output"""
+        vlans = VlanSet([300, 5, "100-102", 104, 4095])
+        self.assertEqual(vlans.toList(), [5, 100, 101, 102, 104, 300, 4095])
+        self.assertEqual(vlans.toRanges(), [(5, 5), (100, 102), (104, 104), (300, 300), (4095, 4095)])
+        self.assertEqual(str(vlans), "5,100-102,104,300,4095")
+        self.assertEqual(VlanSet(str(vlans)), vlans)
+
+
+if __name__ == "__main__":
+    unittest.main()